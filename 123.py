@@ -1,16 +1,27 @@
+from __future__ import annotations
+
 import os
-import pandas as pd
 import asyncio
-from engine.api_client import call_llm
-from tqdm.asyncio import tqdm_asyncio
+from engine.api_client import (
+    call_llm_with_meta, configure_streaming, stream_summary, get_api_keys, STATUS_OK, DEFAULT_CONCURRENCY,
+    configure_cassette, close_cassette, cassette_summary, cassette_replaying, configure_admission, close_admission, admission_summary
+)
+from engine.admission import ADMISSION_PATH, PRIORITY_CLASSES, SUBMISSION
+from optimizer.retry_queue import drain_retries, DEAD_LETTER_PATH
+from optimizer.dataset_cache import load_dataset
 from optimizer.metrics import evaluate_correction
-from typing import List, Dict
-from dotenv import load_dotenv
-from openai import OpenAI
+from optimizer.cascade import flag_suspicious
+from optimizer.deadline import DeadlinePlanner, STATUS_DEADLINE, deadline_end
+from prompts.compact_templates import COMPACT_SYSTEM_PROMPT
+from typing import List, Dict, Tuple, TYPE_CHECKING
 
-from openai import OpenAI
+# ⚡ pandas / openai / tqdm 은 실제로 쓰는 시점에 import
+if TYPE_CHECKING:
+    import pandas as pd
 
 def get_upstage_token_count(texts: list[str], api_key: str, model: str = "embedding-passage") -> int:
+    from openai import OpenAI
+
     client = OpenAI(
         api_key=api_key,
         base_url="https://api.upstage.ai/v1"
@@ -24,8 +35,17 @@ def get_upstage_token_count(texts: list[str], api_key: str, model: str = "embedd
     return response.usage.prompt_tokens  # ✅ 여기 수정됨
 
 
+FEWSHOT_K = 8
+
 # 템플릿 적용 (Multi-turn)
 def apply_template(template_name: str, text: str) -> List[Dict]:
+    # ⚡ 캐스케이드 1단계용 짧은 템플릿
+    if template_name == "COMPACT":
+        return [
+            {"role": "system", "content": COMPACT_SYSTEM_PROMPT},
+            {"role": "user", "content": f"다음 문장을 교정해줘:\n{text}"}
+        ]
+
     rule_text = (
         "너는 한국어 문장의 오탈자, 띄어쓰기, 문장부호 오류를 정밀하게 교정하는 전문가야. "
         "입력 문장의 의미, 어투, 말투는 **절대 바꾸지 말고**, 오직 잘못된 부분만 수정해야 해.\n\n"
@@ -262,64 +282,274 @@ def apply_template(template_name: str, text: str) -> List[Dict]:
         "- 줄바꿈 없이 끝나야 하고, 반드시 종결부호(., ?, !)로 끝나야 해.\n"
     )
 
-    return [
+    messages = [
         {"role": "system", "content": rule_text},
         {"role": "user", "content": f"다음 문장을 교정해줘:\n{text}"}
     ]
 
-# 비동기 LLM 호출
-async def correct_row(template_name: str, text: str) -> str:
+    # 🔎 CHECK_DYNAMIC: 고정 예시 목록을 빼고, 입력과 비슷한 학습 예시 k개만 주입
+    if template_name == "CHECK_DYNAMIC":
+        from prompts.fewshot_index import get_fewshot_index, inject_examples, strip_fixed_examples
+
+        messages[0]["content"] = strip_fixed_examples(rule_text)
+        messages = inject_examples(messages, get_fewshot_index().query(text, k=FEWSHOT_K))
+    return messages
+
+# 🪜 CASCADE: COMPACT 결과가 의심스러울 때만 CHECK_SINGLE로 재요청
+CASCADE_STAGES = ("COMPACT", "CHECK_SINGLE")
+cascade_stats = {"stage1": 0, "stage2": 0}
+
+# 비동기 LLM 호출 → (교정문, 상태)
+async def correct_row(template_name: str, text: str) -> Tuple[str, str]:
+    if template_name == "CASCADE":
+        short_name, full_name = CASCADE_STAGES
+        pred, status, _ = await call_llm_with_meta(apply_template(short_name, text), text)
+        if status == STATUS_OK and not flag_suspicious(text, pred):
+            cascade_stats["stage1"] += 1
+            return pred, status
+        cascade_stats["stage2"] += 1
+        template_name = full_name
+
     messages = apply_template(template_name, text)
-    return await call_llm(messages)
+    pred, status, _ = await call_llm_with_meta(messages, text)
+    return pred, status
+
+# ⏰ 마감 모드 사다리: 완료 예상이 마감을 넘으면 한 단계씩 싼 경로로 전환
+DEADLINE_LADDER = {
+    "CHECK_SINGLE": ["CHECK_SINGLE", "CASCADE", "COMPACT"],
+    "CHECK_DYNAMIC": ["CHECK_DYNAMIC", "CASCADE", "COMPACT"],
+    "CASCADE": ["CASCADE", "COMPACT"],
+    "COMPACT": ["COMPACT"],
+}
+
+# 마감 안에서 한 행 교정 → (교정문, 상태). 마감이 지났거나 시간 안에 못 끝내면 STATUS_DEADLINE
+async def correct_by_deadline(planner: DeadlinePlanner, row_id: str, text: str) -> Tuple[str, str]:
+    if planner.expired():
+        return None, STATUS_DEADLINE
+    template_name = planner.current()
+    # 일정에 맞으면 기존처럼 백오프 재시도까지, 밀리면 한 번만 시도하고 슬롯을 남은 행에 양보
+    if planner.on_track():
+        attempt = correct_with_retry(template_name, row_id, text)
+    else:
+        attempt = correct_row(template_name, text)
+    try:
+        pred, status = await asyncio.wait_for(attempt, planner.time_left())
+    except asyncio.TimeoutError:
+        return None, STATUS_DEADLINE
+    planner.observe()
+    return pred, status
+
+# 원문으로 대체 제출된 행(id, status) 목록을 제출 파일 옆에 기록
+def write_fallback_ids(output_path: str, fallbacks: List[Tuple[str, str]]) -> str:
+    import csv
+
+    path = f"{os.path.splitext(output_path)[0]}_fallback.csv"
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f, lineterminator="\n")
+        writer.writerow(["id", "status"])
+        writer.writerows(fallbacks)
+    return path
+
+async def retry_failed(df: pd.DataFrame, template_name: str, outcomes: List[Tuple[str, str]],
+                       planner: DeadlinePlanner = None) -> pd.DataFrame:
+    """실패 건만 백오프 재시도 → 끝까지 실패하면 dead-letter 기록 후 원문을 그대로 제출"""
+    items = [
+        {"id": row_id, "err_sentence": text, "cor_sentence": pred, "status": status}
+        for row_id, text, (pred, status) in zip(df["id"], df["err_sentence"], outcomes)
+    ]
+    # 마감으로 건너뛴 행은 재시도하지 않음
+    failed = [item for item in items if item["status"] not in (STATUS_OK, STATUS_DEADLINE)]
+
+    async def retry(item):
+        pred, status = await correct_row(template_name, item["err_sentence"])
+        return {**item, "cor_sentence": pred, "status": status}
+
+    if failed and not (planner is not None and planner.expired()):
+        drain = drain_retries(failed, retry)
+        try:
+            recovered, _ = await (drain if planner is None else asyncio.wait_for(drain, planner.time_left()))
+        except asyncio.TimeoutError:
+            recovered = []
+        by_id = {item["id"]: item for item in recovered}
+        items = [by_id.get(item["id"], item) for item in items]
+
+    return apply_outcomes(df, [(item["cor_sentence"], item["status"]) for item in items])
+
+# (예측, 상태) 목록을 df에 반영 → 성공하지 못한 행은 원문을 그대로 제출
+def apply_outcomes(df: pd.DataFrame, outcomes: List[Tuple[str, str]]) -> pd.DataFrame:
+    df["cor_sentence"] = [
+        pred if status == STATUS_OK else text
+        for text, (pred, status) in zip(df["err_sentence"], outcomes)
+    ]
+    df["status"] = [status for _, status in outcomes]
+    return df
+
+async def run_from_queue(df: pd.DataFrame, template_name: str, queue_path: str) -> List[Tuple[str, str]]:
+    """공유 SQLite 큐에서 (template, id) 작업을 나눠 처리 (여러 머신이 같은 작업 협업)"""
+    from optimizer.work_queue import WorkQueue, drain_queue, job_key
+
+    queue = WorkQueue(queue_path, job_id=job_key(df["id"]))
+    try:
+        queue.enqueue(
+            (template_name, row_id, {"err_sentence": text})
+            for row_id, text in zip(df["id"], df["err_sentence"])
+        )
+
+        async def handler(_, row_id, payload):
+            prediction, status = await correct_row(template_name, payload["err_sentence"])
+            return {"id": row_id, "err_sentence": payload["err_sentence"], "cor_sentence": prediction, "status": status}
+
+        # 재시도는 큐의 시도 횟수로만, 최종 실패는 ack한 러너가 한 번만 dead-letter에 기록
+        await drain_queue(queue, handler, template_ids=[template_name], dead_letter_path=DEAD_LETTER_PATH)
+        by_id = {r["id"]: (r["cor_sentence"], r["status"]) for r in queue.results({template_name})}
+    finally:
+        queue.close()
+    return [by_id[row_id] for row_id in df["id"]]
+
+async def run_all(df: pd.DataFrame, template_name: str, queue_path: str = None,
+                  planner: DeadlinePlanner = None) -> pd.DataFrame:
+    if queue_path:
+        return apply_outcomes(df, await run_from_queue(df, template_name, queue_path))
+
+    from tqdm.asyncio import tqdm_asyncio
 
-async def run_all(df: pd.DataFrame, template_name: str) -> pd.DataFrame:
     inputs = df["err_sentence"].tolist()
-    cor_sentences = await tqdm_asyncio.gather(
-        *(correct_row(template_name, text) for text in inputs),
+    if planner is None:
+        rows = (correct_row(template_name, text) for text in inputs)
+    else:
+        # 호출 가능한 만큼만 디스패치 → 대기 중인 행이 템플릿 전환/마감 판정을 반영
+        gate = asyncio.Semaphore(max(1, len(get_api_keys())) * DEFAULT_CONCURRENCY)
+
+        async def guarded(row_id, text):
+            async with gate:
+                return await correct_by_deadline(planner, row_id, text)
+
+        rows = (guarded(row_id, text) for row_id, text in zip(df["id"], inputs))
+    outcomes = await tqdm_asyncio.gather(
+        *rows,
         desc=f"🔧 [{template_name}] 문장 교정 중",
         total=len(inputs)
     )
-    df["cor_sentence"] = cor_sentences
-    return df
+    return await retry_failed(df, template_name, outcomes, planner)
 
-# 실행 로직
-if __name__ == "__main__":
-    template_name = "CHECK_SINGLE"
+async def correct_with_retry(template_name: str, row_id: str, text: str) -> Tuple[str, str]:
+    pred, status = await correct_row(template_name, text)
+    if status == STATUS_OK:
+        return pred, status
+
+    async def retry(item):
+        pred, status = await correct_row(template_name, item["err_sentence"])
+        return {**item, "cor_sentence": pred, "status": status}
+
+    recovered, dead = await drain_retries(
+        [{"id": row_id, "err_sentence": text, "cor_sentence": pred, "status": status}], retry
+    )
+    item = (recovered or dead)[0]
+    return item["cor_sentence"], item["status"]
+
+# 📝 제출 모드: 완료되는 대로 입력 순서를 지켜 CSV에 바로 기록 (체크포인트로 중단 후 재개)
+# - 워커는 아직 기록되지 않은 가장 앞 행에서 window 이내의 행만 가져가 재정렬 버퍼 크기를 제한
+# - planner가 있으면 마감 모드 (템플릿 전환, 마감 이후 행은 원문 제출 + *_fallback.csv에 id 기록)
+async def stream_submission(df: pd.DataFrame, template_name: str, output_path: str, run_key: str = None,
+                            window: int = 256, planner: DeadlinePlanner = None) -> int:
+    from tqdm import tqdm
+    from optimizer.submission_writer import StreamingSubmissionWriter
+
+    ids, inputs = df["id"].tolist(), df["err_sentence"].tolist()
+    total = len(ids)
+    workers = max(1, len(get_api_keys())) * DEFAULT_CONCURRENCY
+    window = max(window, workers)
+
+    with StreamingSubmissionWriter(output_path, ["id", "err_sentence", "cor_sentence"], run_key=run_key) as writer:
+        if writer.resumed_from:
+            print(f"⏩ 체크포인트에서 재개: {writer.resumed_from}/{total}행 기록됨")
+        cursor = writer.next_index
+        # 원문 대체 행 [index, id, status]은 체크포인트에 함께 저장 → 재개 시 이미 기록된 행의 것만 이어받음
+        fallbacks = [f for f in writer.meta.get("fallbacks", []) if f[0] < writer.next_index]
+        writer.meta["fallbacks"] = fallbacks
+        cond = asyncio.Condition()
+        bar = tqdm(total=total, initial=writer.next_index, desc=f"🔧 [{template_name}] 문장 교정 중")
+
+        async def worker():
+            nonlocal cursor
+            while True:
+                async with cond:
+                    await cond.wait_for(lambda: cursor >= total or cursor < writer.next_index + window)
+                    if cursor >= total:
+                        return
+                    i = cursor
+                    cursor += 1
+
+                if planner is None:
+                    pred, status = await correct_with_retry(template_name, ids[i], inputs[i])
+                else:
+                    pred, status = await correct_by_deadline(planner, ids[i], inputs[i])
+                # 끝까지 실패한 행(마감 모드에서는 마감으로 건너뛴 행 포함)은 원문을 그대로 제출
+                cor = pred if status == STATUS_OK else inputs[i]
+                if status != STATUS_OK:
+                    fallbacks.append([i, ids[i], status])
+
+                async with cond:
+                    before = writer.next_index
+                    writer.put(i, {"id": ids[i], "err_sentence": inputs[i], "cor_sentence": cor})
+                    bar.update(writer.next_index - before)
+                    cond.notify_all()
+
+        await asyncio.gather(*(worker() for _ in range(workers)))
+        bar.close()
+        writer.close(complete=writer.next_index >= total)
+        if planner is not None and fallbacks:
+            rows = sorted((row_id, status) for _, row_id, status in fallbacks)
+            print(f"⏰ 원문 대체 제출 {len(fallbacks)}행 → {write_fallback_ids(output_path, rows)}")
+        return writer.next_index
+
+# ▶️ 실행 본문 → 종료 코드 (카세트/입장 제어 정리는 호출하는 쪽 finally에서)
+# deadline: deadline_end()로 고정한 절대 마감 (time.monotonic 기준) 또는 None
+def main(args, deadline) -> int:
+    template_name = args.template
     input_path = "data/test.csv"
     SAMPLE_SIZE = 10871
 
     load_dotenv()
     api_key = os.getenv("UPSTAGE_API_KEY_1")
 
-    test_df = pd.read_csv(input_path)
+    # 💾 이진 캐시로 로딩 (최초 1회 변환 후 mmap 재사용)
+    dataset = load_dataset(input_path)
 
     is_eval_mode = (
-        "answer" in test_df.columns or
-        "cor_sentence" in test_df.columns or
-        "cor_sentence_gt" in test_df.columns
+        "answer" in dataset.columns or
+        "cor_sentence" in dataset.columns or
+        "cor_sentence_gt" in dataset.columns
     )
 
-    if "answer" in test_df.columns:
-        test_df = test_df.rename(columns={"answer": "cor_sentence_gt"})
-    elif "cor_sentence" in test_df.columns:
-        test_df = test_df.rename(columns={"cor_sentence": "cor_sentence_gt"})
+    gt_rename = {}
+    if "answer" in dataset.columns:
+        gt_rename = {"answer": "cor_sentence_gt"}
+    elif "cor_sentence" in dataset.columns:
+        gt_rename = {"cor_sentence": "cor_sentence_gt"}
 
     if is_eval_mode:
-        sample_df = test_df.sample(n=SAMPLE_SIZE, random_state=42).reset_index(drop=True)
+        # 인덱스만 섞어서 샘플 행만 디코딩
+        sample_df = pd.DataFrame(dataset.sample(SAMPLE_SIZE, seed=42).to_columns()).rename(columns=gt_rename)
 
         # ✅ 1. 프롬프트 토큰 수 사전 확인
         first_input = sample_df["err_sentence"].iloc[0]
         messages = apply_template(template_name, first_input)
         full_text = "\n".join([msg["content"] for msg in messages])
-        token_count = get_upstage_token_count([full_text], api_key)
-
-        print(f"🔎 현재 프롬프트 토큰 수: {token_count} tokens")
+        if cassette_replaying():
+            # 📼 재생 중에는 임베딩 API도 부르지 않음 → 글자 수로 상한 추정 (한국어는 대개 글자당 1토큰 미만)
+            token_count = len(full_text)
+            print(f"🔎 현재 프롬프트 토큰 수(추정, 재생 모드): ≤{token_count} tokens")
+        else:
+            token_count = get_upstage_token_count([full_text], api_key)
+            print(f"🔎 현재 프롬프트 토큰 수: {token_count} tokens")
         if token_count > 5000:
             print(f"⛔ 프롬프트가 {token_count} 토큰으로 2000 토큰을 초과하여 실행을 중단합니다.")
-            os._exit(1)
+            return 1
 
         # ✅ 2. 정상 추론 진행
-        corrected_df = asyncio.run(run_all(sample_df, template_name))
+        planner = DeadlinePlanner(total=len(sample_df), ladder=DEADLINE_LADDER[template_name], end=deadline) if deadline else None
+        corrected_df = asyncio.run(run_all(sample_df, template_name, args.queue, planner))
 
         pred_df = corrected_df[["id", "err_sentence", "cor_sentence"]]
         true_df = sample_df[["id", "err_sentence", "cor_sentence_gt"]].rename(columns={"cor_sentence_gt": "cor_sentence"})
@@ -337,9 +567,74 @@ if __name__ == "__main__":
         print(f"❗ 틀린 샘플 {len(error_df)}개 저장됨 → {error_path}")
 
     else:
-        corrected_df = asyncio.run(run_all(test_df, template_name))
+        test_df = pd.DataFrame(dataset.view().to_columns())
         output_path = f"submission_{template_name.lower()}.csv"
-        corrected_df[["id", "err_sentence", "cor_sentence"]].to_csv(output_path, index=False)
+        if args.queue:
+            corrected_df = asyncio.run(run_all(test_df, template_name, args.queue))
+            corrected_df[["id", "err_sentence", "cor_sentence"]].to_csv(output_path, index=False)
+        else:
+            run_key = f"{template_name}:{dataset.header['source_sha256']}"
+            planner = DeadlinePlanner(total=len(test_df), ladder=DEADLINE_LADDER[template_name], end=deadline) if deadline else None
+            asyncio.run(stream_submission(test_df, template_name, output_path, run_key, planner=planner))
         print(f"\n✅ 제출 파일 저장 완료: {output_path}")
 
-    os._exit(0)
+    if template_name == "CASCADE":
+        print(f"🪜 캐스케이드: 1단계 종료 {cascade_stats['stage1']}건 / 2단계 재요청 {cascade_stats['stage2']}건")
+    if args.stream:
+        print(f"🌊 스트리밍 호출 요약: {stream_summary()}")
+    if cassette_summary():
+        print(f"📼 카세트: {cassette_summary()}")
+    if admission_summary():
+        print(f"🚦 입장 제어: {admission_summary()}")
+    if deadline and not args.queue:
+        print(f"⏰ 마감 모드: {planner.summary()}")
+    return 0
+
+# 실행 로직
+if __name__ == "__main__":
+    import argparse
+    import pandas as pd
+    from dotenv import load_dotenv
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--queue", type=str, default=None, help="공유 SQLite 작업 큐 경로 (여러 러너 협업)")
+    parser.add_argument("--template", type=str, default="CHECK_SINGLE",
+                        choices=["CHECK_SINGLE", "CHECK_DYNAMIC", "COMPACT", "CASCADE"])
+    parser.add_argument("--stream", action="store_true", help="스트리밍 호출: 첫 줄에서 중단, 입력 길이 기반 max_tokens")
+    parser.add_argument("--record", type=str, default=None, help="실제 호출을 카세트 파일로 기록")
+    parser.add_argument("--replay", type=str, default=None, help="카세트 파일로 오프라인 재생 (네트워크/키 불필요)")
+    parser.add_argument("--replay-speed", type=float, default=1.0, help="재생 지연 배율 (2.0 = 두 배 빠르게, 0 = 대기 없음)")
+    parser.add_argument("--deadline", type=str, default=None, help="마감: 5400 / 90m / 1h30m / 23:30 / 2026-10-20T09:00")
+    parser.add_argument("--priority", type=str, default=SUBMISSION, choices=list(PRIORITY_CLASSES),
+                        help="키 풀 공유 시 우선순위 클래스")
+    parser.add_argument("--admission", type=str, default=ADMISSION_PATH, help="프로세스 간 입장 제어 SQLite 경로")
+    parser.add_argument("--no-admission", action="store_true", help="프로세스 간 입장 제어 끄기")
+    args = parser.parse_args()
+
+    if args.record and args.replay:
+        parser.error("--record와 --replay는 함께 쓸 수 없습니다")
+    deadline = None
+    if args.deadline:
+        if args.queue:
+            parser.error("--deadline은 큐 모드와 함께 쓸 수 없습니다")
+        try:
+            deadline = deadline_end(args.deadline)  # 준비 시간도 마감에 포함되도록 지금 고정
+        except ValueError as e:
+            parser.error(str(e))
+    if args.stream:
+        configure_streaming()
+    if args.record:
+        configure_cassette(args.record, "record")
+    elif args.replay:
+        configure_cassette(args.replay, "replay", args.replay_speed)
+    if not args.no_admission:
+        # 🚦 같은 키 풀을 쓰는 다른 프로세스(제출/실험)와 동시 호출 수를 우선순위대로 나눔
+        configure_admission(args.priority, args.admission)
+
+    try:
+        exit_code = main(args, deadline)
+    finally:
+        close_cassette()  # 예외가 나도 기록 스레드를 비움
+        close_admission()  # 다른 프로세스가 이 프로세스 몫을 기다리지 않도록 기록 삭제
+
+    os._exit(exit_code)
@@ -0,0 +1,65 @@
+# benchmarks/bench_active_eval.py
+# 실행: python -m benchmarks.bench_active_eval --rows 3000 --templates 8 --repeats 5
+
+import argparse
+import random
+import statistics
+
+from optimizer.synthetic_corpus import make_sentence, inject_errors, jamo_typo
+from optimizer.active_eval import simulate, settle_point, full_ranking
+
+# 🧪 합성 템플릿 집단: 행마다 공통 난수를 써서 템플릿끼리 대부분의 행에서 같은 답을 내도록 구성
+# - 행 난이도 u < fix_rate 인 템플릿만 정답으로 고침 (쉬운 행은 모두 고치고, 어려운 행은 모두 못 고침)
+# - 행 v < noise 인 템플릿은 같은 위치에 불필요한 수정
+# - 무오류 행(정답 = 원문)은 누구나 0점 → 순위에 기여하지 않음
+def make_population(n_rows: int, n_templates: int, clean_rate: float = 0.3, seed: int = 0) -> list:
+    rng = random.Random(seed)
+    templates = [
+        {"id": f"t{i:02d}", "fix_rate": 0.55 + 0.03 * i + rng.uniform(-0.01, 0.01), "noise": rng.uniform(0.05, 0.2)}
+        for i in range(n_templates)
+    ]
+    results = []
+    for i in range(n_rows):
+        cor = make_sentence(rng.randint(5, 20), rng)
+        err = list(cor) if rng.random() < clean_rate else inject_errors(cor, rng.uniform(0.05, 0.4), rng)
+        u, v = rng.random(), rng.random()
+        j = rng.randrange(len(err))
+        typo = jamo_typo(err[j], rng)
+        for t in templates:
+            pred = list(cor) if u < t["fix_rate"] else list(err)
+            if v < t["noise"] and j < len(pred):
+                pred[j] = typo
+            results.append({
+                "template_id": t["id"],
+                "id": f"syn{i:06d}",
+                "input": " ".join(err),
+                "target": " ".join(cor),
+                "prediction": " ".join(pred),
+                "status": "ok",
+            })
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=3000)
+    parser.add_argument("--templates", type=int, default=8)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--seed-rows", type=int, default=100)
+    parser.add_argument("--batch-rows", type=int, default=100)
+    parser.add_argument("--patience", type=int, default=3)
+    args = parser.parse_args()
+
+    total = args.rows * args.templates
+    for uniform in (True, False):
+        settled, stopped, correct = [], [], 0
+        for seed in range(args.repeats):
+            results = make_population(args.rows, args.templates, seed=seed)
+            evaluator = simulate(results, None, args.seed_rows, args.batch_rows, args.patience, uniform, seed)
+            point = settle_point(evaluator.history, full_ranking(results), args.patience)
+            settled.append(point["settled_calls"])
+            stopped.append(point["stop_calls"])
+            correct += point["stop_correct"]
+        name = "uniform (stratified)" if uniform else "active"
+        print(f"{name:>20} | total {total} calls | ranking settled at {statistics.median(settled):.0f} "
+              f"(median of {args.repeats}) | stopped at {statistics.median(stopped):.0f}, "
+              f"correct {correct}/{args.repeats}")
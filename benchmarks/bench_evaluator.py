@@ -0,0 +1,122 @@
+# benchmarks/bench_evaluator.py
+# 실행: python -m benchmarks.bench_evaluator --sizes 1000 10000 100000
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from optimizer.synthetic_corpus import generate_corpus
+from optimizer.evaluator import find_differences_with_offsets, evaluate, extract_error_patterns
+from optimizer.token_corpus import build_token_corpus
+
+def write_results(rows: list, path: str):
+    with open(path, "w", encoding="utf-8") as f:
+        for r in rows:
+            f.write(json.dumps({
+                "template_id": "bench",
+                "id": r["id"],
+                "input": r["err_sentence"],
+                "prediction": r["prediction"],
+                "target": r["cor_sentence"],
+                "status": "ok",
+            }, ensure_ascii=False) + "\n")
+
+# ⏱️ 시간 측정 실행과 메모리 측정 실행을 분리 (tracemalloc 오버헤드가 시간에 섞이지 않도록)
+def measure(fn, n_rows: int) -> dict:
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+
+        tracemalloc.start()
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return {
+        "seconds": round(elapsed, 4),
+        "rows_per_sec": round(n_rows / elapsed, 1) if elapsed > 0 else float("inf"),
+        "peak_mb": round(peak / 1024 / 1024, 2),
+    }
+
+def bench_size(n_rows: int, workdir: str, density: float, seed: int) -> dict:
+    rows = generate_corpus(n_rows, density=density, seed=seed)
+    results_path = os.path.join(workdir, f"results_{n_rows}.jsonl")
+    write_results(rows, results_path)
+    corpus_path = os.path.join(workdir, f"corpus_{n_rows}.bin")
+    build_token_corpus(results_path, corpus_path)
+
+    def diff_only():
+        for r in rows:
+            find_differences_with_offsets(r["err_sentence"], r["cor_sentence"])
+            find_differences_with_offsets(r["err_sentence"], r["prediction"])
+
+    def metrics_eval():
+        import pandas as pd
+        from optimizer.metrics import evaluate_correction
+
+        true_df = pd.DataFrame({"err_sentence": [r["err_sentence"] for r in rows],
+                                "cor_sentence": [r["cor_sentence"] for r in rows]})
+        pred_df = pd.DataFrame({"cor_sentence": [r["prediction"] for r in rows]})
+        evaluate_correction(true_df, pred_df)
+
+    report = {
+        "find_differences_with_offsets": measure(diff_only, n_rows),
+        "evaluate": measure(lambda: evaluate(results_path, os.path.join(workdir, "memory.jsonl")), n_rows),
+        "evaluate[token_corpus]": measure(
+            lambda: evaluate(results_path, os.path.join(workdir, "memory.jsonl"), corpus_path), n_rows
+        ),
+        "extract_error_patterns": measure(
+            lambda: extract_error_patterns(results_path, os.path.join(workdir, "patterns.jsonl")), n_rows
+        ),
+        "evaluate_correction": measure(metrics_eval, n_rows),
+    }
+    return report
+
+# 🛡️ 회귀 가드: 기준 대비 처리량이 tolerance 이상 떨어진 항목 반환
+def find_regressions(report: dict, baseline: dict, tolerance: float) -> list:
+    regressions = []
+    for size, benches in report.items():
+        for name, stats in benches.items():
+            base = baseline.get(size, {}).get(name)
+            if base and stats["rows_per_sec"] < base["rows_per_sec"] * (1 - tolerance):
+                regressions.append((size, name, base["rows_per_sec"], stats["rows_per_sec"]))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--density", type=float, default=0.2, help="토큰당 오류 주입 확률")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", type=str, default=None, help="결과 JSON 저장 경로")
+    parser.add_argument("--baseline", type=str, default=None, help="비교할 기준 결과 JSON")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="허용 처리량 하락 비율")
+    args = parser.parse_args()
+
+    report = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for n in args.sizes:
+            report[str(n)] = bench_size(n, workdir, args.density, args.seed)
+            for name, stats in report[str(n)].items():
+                print(f"- {n:>7} rows | {name:<30} | {stats['rows_per_sec']:>10} rows/s | "
+                      f"{stats['seconds']:>8}s | peak {stats['peak_mb']} MB")
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = find_regressions(report, json.load(f), args.tolerance)
+        for size, name, before, after in regressions:
+            print(f"❌ 성능 회귀: {size} rows / {name}: {before} → {after} rows/s")
+        if regressions:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
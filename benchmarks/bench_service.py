@@ -0,0 +1,162 @@
+# benchmarks/bench_service.py
+# 실행: python -m benchmarks.bench_service --requests 2000 --concurrency 64
+# 가짜 OpenAI 호환 업스트림을 띄워 실제 AsyncOpenAI 클라이언트 경로로 서비스 p50/p99 지연을 측정
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import random
+import socket
+import time
+
+from engine import api_client
+from engine.service import CorrectionService, create_app, percentile, TENANT_HEADER
+from optimizer.synthetic_corpus import generate_corpus
+
+# 🧪 /v1/chat/completions 흉내: 로그정규 지연 후 마지막 user 메시지의 마지막 줄을 그대로 반환
+# - 서비스/부하 생성기와 CPU를 나눠 쓰지 않도록 별도 프로세스에서 실행, 호출 수는 /calls로 조회
+def create_mock_upstream(median_ms: float, sigma: float, seed: int):
+    from aiohttp import web
+
+    rng = random.Random(seed)
+    calls = {"count": 0}
+
+    async def count(_):
+        return web.json_response(calls)
+
+    async def completions(request):
+        body = await request.json()
+        calls["count"] += 1
+        await asyncio.sleep(median_ms / 1000 * rng.lognormvariate(0, sigma))
+        text = body["messages"][-1]["content"].splitlines()[-1]
+        return web.json_response({
+            "id": f"mock-{calls['count']}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "mock"),
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": text}}],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+        })
+
+    app = web.Application()
+    app.router.add_post("/v1/chat/completions", completions)
+    app.router.add_get("/calls", count)
+    return app
+
+def serve_mock_upstream(port: int, median_ms: float, sigma: float, seed: int):
+    from aiohttp import web
+
+    web.run_app(create_mock_upstream(median_ms, sigma, seed), host="127.0.0.1", port=port, print=None)
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+async def wait_until_up(session, url: str, timeout: float = 10.0):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            async with session.get(url) as resp:
+                return await resp.json()
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            await asyncio.sleep(0.05)
+
+async def start_site(app, port: int = 0):
+    from aiohttp import web
+
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", port)
+    await site.start()
+    return runner, runner.addresses[0][1]
+
+async def run_load(args) -> dict:
+    import aiohttp
+
+    upstream_port = free_port()
+    upstream = multiprocessing.get_context("spawn").Process(
+        target=serve_mock_upstream, args=(upstream_port, args.upstream_ms, args.sigma, args.seed), daemon=True
+    )
+    upstream.start()
+    api_client.BASE_URL = f"http://127.0.0.1:{upstream_port}/v1"
+    api_client.configure_keys([f"mock-key-{i}" for i in range(args.keys)])
+
+    service = CorrectionService(tenant_concurrency=args.tenant_concurrency,
+                                batch_window=args.batch_window_ms / 1000, max_batch=args.max_batch)
+    service_runner, service_port = await start_site(create_app(service))
+    url = f"http://127.0.0.1:{service_port}/v1/correct"
+
+    # 중복 비율만큼 이미 보낸 문장을 다시 보내 coalescing 효과 확인
+    rng = random.Random(args.seed)
+    sentences = [r["err_sentence"] for r in generate_corpus(args.requests, seed=args.seed)]
+    payloads = []
+    for i in range(args.requests):
+        text = rng.choice(payloads)[1] if payloads and rng.random() < args.duplicate_ratio else sentences[i]
+        payloads.append((f"tenant-{i % args.tenants}", text))
+
+    latencies = []
+    gate = asyncio.Semaphore(args.concurrency)
+
+    async def one(session, tenant, text):
+        async with gate:
+            start = time.perf_counter()
+            async with session.post(url, json={"text": text}, headers={TENANT_HEADER: tenant}) as resp:
+                await resp.json()
+            latencies.append(time.perf_counter() - start)
+
+    try:
+        async with aiohttp.ClientSession() as session:
+            await wait_until_up(session, f"http://127.0.0.1:{upstream_port}/calls")
+            start = time.perf_counter()
+            await asyncio.gather(*(one(session, tenant, text) for tenant, text in payloads))
+            elapsed = time.perf_counter() - start
+            upstream_calls = await wait_until_up(session, f"http://127.0.0.1:{upstream_port}/calls")
+    finally:
+        await service_runner.cleanup()
+        upstream.terminate()
+
+    stats = service.snapshot()
+    return {
+        "requests": args.requests,
+        "seconds": round(elapsed, 3),
+        "requests_per_sec": round(args.requests / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 1),
+        "upstream_calls": upstream_calls["count"],
+        "coalesced": stats["coalesced"],
+        "avg_batch": stats["avg_batch"],
+    }
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=64, help="클라이언트 동시 요청 수")
+    parser.add_argument("--tenants", type=int, default=4)
+    parser.add_argument("--tenant-concurrency", type=int, default=16)
+    parser.add_argument("--keys", type=int, default=4, help="가짜 API 키 수 (키당 동시 4건)")
+    parser.add_argument("--duplicate-ratio", type=float, default=0.2)
+    parser.add_argument("--upstream-ms", type=float, default=50.0, help="업스트림 지연 중앙값")
+    parser.add_argument("--sigma", type=float, default=0.5, help="업스트림 지연 로그정규 분산")
+    parser.add_argument("--batch-window-ms", type=float, default=5.0)
+    parser.add_argument("--max-batch", type=int, default=32)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", type=str, default=None, help="결과 JSON 저장 경로")
+    args = parser.parse_args()
+
+    report = asyncio.run(run_load(args))
+    print(f"- {report['requests']} req | {report['requests_per_sec']} req/s | "
+          f"p50 {report['p50_ms']} ms | p99 {report['p99_ms']} ms | "
+          f"upstream {report['upstream_calls']} calls (coalesced {report['coalesced']}) | "
+          f"avg batch {report['avg_batch']}")
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+if __name__ == "__main__":
+    main()
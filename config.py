@@ -1,9 +1,6 @@
 # config.py
 
-import os
-from dotenv import load_dotenv
-
-load_dotenv()  # .env 파일에서 API 키 로딩
+# ⚡ .env(API 키) 로딩은 engine.api_client가 첫 호출 시 수행 → 평가 전용 실행은 dotenv 불필요
 
 # 📁 경로 설정
 GRAPH_PATH = "data/prompt_graph.jsonl"
@@ -0,0 +1,210 @@
+# engine/admission.py
+
+import asyncio
+import math
+import os
+import socket
+import sqlite3
+import time
+import uuid
+from collections import deque
+
+# 🚦 프로세스 간 우선순위 입장 제어 (같은 UPSTAGE_API_KEY_* 풀을 쓰는 123.py 제출 / old.py 실험 조율)
+# - 각 프로세스는 SQLite 파일에 (우선순위 클래스, 대기 수, 진행 중 수)를 기록
+# - 전체 동시 호출 수(capacity)를 클래스별 최소 보장 + 가중치 비례로 나눔 (수요가 없는 클래스 몫은 다른 클래스로)
+#   → 제출 작업이 대기하기 시작하면 실험은 새 슬롯을 받지 못하고, 진행 중 호출이 끝나는 대로 제출 쪽으로 넘어감
+# - 프로세스마다 입장 루프 하나가 대기자를 모아 한 트랜잭션으로 처리 (호출마다 DB를 두드리지 않음)
+# - heartbeat가 ttl 이상 끊긴 프로세스(비정상 종료)의 기록은 정리
+# - DB 잠금 대기는 busy_timeout초까지만 (이벤트 루프를 오래 막지 않도록), 잠겨 있으면 다음 순회에서 재시도
+ADMISSION_PATH = "data/admission.sqlite"
+SUBMISSION = "submission"
+EXPERIMENT = "experiment"
+
+# 가중치는 경쟁 시 나머지 용량의 배분 비율, minimum은 수요가 있을 때 항상 보장되는 동시 호출 수
+PRIORITY_CLASSES = {
+    SUBMISSION: {"weight": 9, "minimum": 0},
+    EXPERIMENT: {"weight": 1, "minimum": 1},
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS clients (
+    client_id TEXT PRIMARY KEY,
+    priority  TEXT NOT NULL,
+    capacity  INTEGER NOT NULL,
+    waiting   INTEGER NOT NULL,
+    inflight  INTEGER NOT NULL,
+    heartbeat REAL NOT NULL
+);
+"""
+
+# 💧 water-filling: 최소 보장 → 남은 용량을 수요가 남은 클래스끼리 가중치 비례로 반복 배분
+def allocate(capacity: int, demand: dict, classes: dict = PRIORITY_CLASSES) -> dict:
+    limits = {c: min(n, classes[c]["minimum"]) for c, n in demand.items()}
+    remaining = capacity - sum(limits.values())
+    while remaining > 0:
+        active = [c for c in demand if demand[c] > limits[c]]
+        if not active:
+            break
+        total_weight = sum(classes[c]["weight"] for c in active)
+        given = 0
+        # 가중치가 큰 클래스부터 올림으로 배분 → 반올림 잔여분이 높은 우선순위 쪽으로
+        for c in sorted(active, key=lambda c: -classes[c]["weight"]):
+            share = math.ceil(remaining * classes[c]["weight"] / total_weight)
+            give = min(share, demand[c] - limits[c], remaining - given)
+            limits[c] += give
+            given += give
+        if given == 0:
+            break
+        remaining -= given
+    return limits
+
+class AdmissionController:
+    def __init__(self, priority: str, capacity: int, path: str = ADMISSION_PATH, classes: dict = PRIORITY_CLASSES,
+                 poll: float = 0.05, ttl: float = 60.0, busy_timeout: float = 0.5):
+        if priority not in classes:
+            raise ValueError(f"unknown priority class: {priority}")
+        self.priority = priority
+        self.capacity = capacity
+        self.path = path
+        self.classes = classes
+        self.poll = poll
+        self.ttl = ttl
+        self.client_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.inflight = 0
+        self.stats = {"admitted": 0, "waited": 0, "wait_seconds": 0.0}
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(path, timeout=busy_timeout, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+
+        self._waiters = deque()
+        self._wake = None
+        self._loop_task = None
+
+    def close(self):
+        if self._loop_task is not None:
+            self._loop_task.cancel()
+            self._loop_task = None
+        self.conn.execute("DELETE FROM clients WHERE client_id = ?", (self.client_id,))
+        self.conn.close()
+
+    # 🎟️ 한 트랜잭션: 자기 상태 갱신 + 입장 가능한 수만큼 승인 → 승인 수 반환
+    def _admit(self, wanted: int) -> int:
+        now = time.time()
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            self.conn.execute("DELETE FROM clients WHERE heartbeat < ?", (now - self.ttl,))
+            rows = self.conn.execute(
+                "SELECT priority, MAX(capacity), SUM(waiting), SUM(inflight) FROM clients "
+                "WHERE client_id != ? GROUP BY priority", (self.client_id,)
+            ).fetchall()
+            capacity = max([self.capacity] + [cap for _, cap, _, _ in rows])
+            demand = {c: 0 for c in self.classes}
+            inflight = {c: 0 for c in self.classes}
+            for priority, _, waiting, running in rows:
+                if priority in demand:
+                    demand[priority] += waiting + running
+                    inflight[priority] += running
+            demand[self.priority] += wanted + self.inflight
+            inflight[self.priority] += self.inflight
+
+            limits = allocate(capacity, demand, self.classes)
+            free = capacity - sum(inflight.values())
+            granted = max(0, min(wanted, limits[self.priority] - inflight[self.priority], free))
+
+            self.inflight += granted
+            self.conn.execute(
+                "INSERT OR REPLACE INTO clients VALUES (?, ?, ?, ?, ?, ?)",
+                (self.client_id, self.priority, self.capacity, wanted - granted, self.inflight, now),
+            )
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+        return granted
+
+    # 잠금 외의 DB 오류는 지금 기다리는 호출들에 그대로 전달 (루프는 계속 동작)
+    def _fail_waiters(self, error: Exception):
+        while self._waiters:
+            future = self._waiters.popleft()
+            if not future.done():
+                future.set_exception(error)
+
+    async def _admission_loop(self):
+        while True:
+            while self._waiters and self._waiters[0].done():
+                self._waiters.popleft()  # 취소된 대기자
+            try:
+                granted = self._admit(sum(1 for f in self._waiters if not f.done()))
+            except sqlite3.OperationalError as e:
+                granted = 0
+                if "locked" not in str(e) and "busy" not in str(e):
+                    self._fail_waiters(e)
+                # 다른 프로세스가 잠금 중이면 poll 후 재시도
+            except Exception as e:
+                granted = 0
+                self._fail_waiters(e)
+            while granted and self._waiters:
+                future = self._waiters.popleft()
+                if not future.done():
+                    future.set_result(None)
+                    granted -= 1
+            if granted:
+                self.inflight -= granted  # 승인 직후 취소된 대기자 몫 반환
+
+            self._wake.clear()
+            # 대기자가 있으면 다른 프로세스의 반환을 보기 위해 짧게 폴링, 없으면 heartbeat 주기로만
+            timeout = self.poll if self._waiters else self.ttl / 3
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def acquire(self):
+        if self._loop_task is None or self._loop_task.done():
+            self._wake = asyncio.Event()
+            self._loop_task = asyncio.create_task(self._admission_loop())
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append(future)
+        self._wake.set()
+        start = time.perf_counter()
+        try:
+            await future
+        except asyncio.CancelledError:
+            # 입장 루프가 승인한 직후 취소되면 __aexit__가 불리지 않으므로 받은 슬롯을 여기서 반환
+            if future.done() and not future.cancelled():
+                self.release()
+            raise
+        waited = time.perf_counter() - start
+        self.stats["admitted"] += 1
+        if waited > self.poll:
+            self.stats["waited"] += 1
+            self.stats["wait_seconds"] += waited
+
+    def release(self):
+        self.inflight -= 1
+        if self._wake is not None:
+            self._wake.set()  # 입장 루프가 다음 순회에서 DB에 반영
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, *exc):
+        self.release()
+
+    def snapshot(self) -> list:
+        cur = self.conn.execute(
+            "SELECT priority, COUNT(*), SUM(waiting), SUM(inflight) FROM clients GROUP BY priority"
+        )
+        return [{"priority": p, "clients": n, "waiting": w, "inflight": i} for p, n, w, i in cur]
+
+    def summary(self) -> dict:
+        return {
+            "priority": self.priority,
+            "capacity": self.capacity,
+            "admitted": self.stats["admitted"],
+            "waited": self.stats["waited"],
+            "avg_wait": round(self.stats["wait_seconds"] / self.stats["waited"], 3) if self.stats["waited"] else 0.0,
+        }
@@ -1,45 +1,305 @@
 # engine/api_client.py
 
 import os
+import time
+import inspect
 import asyncio
+import contextlib
+from collections import deque
 from itertools import cycle
-from openai import AsyncOpenAI
-from dotenv import load_dotenv
-
-load_dotenv()
 
+# ⚡ dotenv / openai 는 첫 호출 시점에 import (평가 전용 실행은 네트워크 스택을 로딩하지 않음)
 BASE_URL = "https://api.upstage.ai/v1"
 MODEL = "solar-pro"
+DEFAULT_CONCURRENCY = 4
+
+_api_keys = None
+_concurrency = DEFAULT_CONCURRENCY
+_clients = None
+_client_cycle = None
+_streaming = False
+_cassette = None
+_admission = None
 
 # 🔑 최대 10개 API 키 로딩
-API_KEYS = [os.getenv(f"UPSTAGE_API_KEY_{i}") for i in range(1, 11)]
-API_KEYS = [key for key in API_KEYS if key]
+def load_api_keys() -> list:
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    keys = [os.getenv(f"UPSTAGE_API_KEY_{i}") for i in range(1, 11)]
+    return [key for key in keys if key]
+
+def get_api_keys() -> list:
+    global _api_keys
+    if _api_keys is None:
+        _api_keys = load_api_keys()
+    return _api_keys
+
+# 🔁 client + semaphore 쌍은 처음 필요할 때 생성
+def get_clients() -> list:
+    global _clients, _client_cycle
+    if _clients is None:
+        from openai import AsyncOpenAI
+
+        _clients = [
+            (AsyncOpenAI(api_key=key, base_url=BASE_URL), asyncio.Semaphore(_concurrency))
+            for key in get_api_keys()
+        ]
+        # ♻️ 순환자 생성 (round-robin 방식)
+        _client_cycle = cycle(_clients)
+    return _clients
+
+def next_client() -> tuple:
+    get_clients()
+    return next(_client_cycle)
 
-# 🔁 client + semaphore 쌍 생성
-clients = [
-    (AsyncOpenAI(api_key=key, base_url=BASE_URL), asyncio.Semaphore(4))
-    for key in API_KEYS
-]
+# 🧩 사용할 키 집합 재설정 (샤딩 워커 프로세스가 자기 몫의 키만 쓰도록)
+def configure_keys(keys: list, concurrency: int = DEFAULT_CONCURRENCY):
+    global _api_keys, _concurrency, _clients, _client_cycle
+    _api_keys = [key for key in keys if key]
+    _concurrency = concurrency
+    _clients = _client_cycle = None
 
-# ♻️ 순환자 생성 (round-robin 방식)
-client_cycle = cycle(clients)
+# 기존 모듈 속성 이름(API_KEYS, clients, client_cycle) 호환
+def __getattr__(name):
+    if name == "API_KEYS":
+        return get_api_keys()
+    if name == "clients":
+        return get_clients()
+    if name == "client_cycle":
+        get_clients()
+        return _client_cycle
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-# ✅ 다중 키 기반 LLM 호출 함수 (기존과 동일한 인터페이스 유지)
+# 📌 호출 상태 (예측값에 센티널 문자열 대신 명시적 status 필드로 기록)
+STATUS_OK = "ok"
+STATUS_FAILED = "failed"
+ERROR_PREDICTION = "[ERROR] 호출 실패"
+
+# ✅ 다중 키 기반 LLM 호출 → (응답, 상태) 반환. 실패 시 응답은 None
+async def call_llm_with_status(messages: list, retries: int = 3, delay: float = 1.2) -> tuple:
+    client, semaphore = next_client()  # 다음 클라이언트/세마포어 가져오기
+
+    async with semaphore:
+        for attempt in range(retries):
+            try:
+                async with admission_slot():
+                    return await _send_chat(client, messages), STATUS_OK
+            except Exception as e:
+                if "429" in str(e):
+                    await asyncio.sleep(delay * (attempt + 1))  # 점진적 딜레이
+                else:
+                    break
+
+    return None, STATUS_FAILED
+
+# ✅ 기존과 동일한 인터페이스 유지 (실패 시 센티널 문자열)
 async def call_llm(messages: list, retries: int = 3, delay: float = 1.2) -> str:
-    client, semaphore = next(client_cycle)  # 다음 클라이언트/세마포어 가져오기
+    content, status = await call_llm_with_status(messages, retries, delay)
+    return content if status == STATUS_OK else ERROR_PREDICTION
+
+# 🌊 스트리밍 모드: 토큰을 받는 대로 읽다가 첫 줄이 끝나면 즉시 중단 (템플릿은 "교정된 문장 한 줄만" 요구)
+# - max_tokens는 입력 문장 길이에서 계산 → 장황한 응답이 수백 토큰까지 늘어지지 않도록
+# - 호출별 첫 토큰 도착 시간(TTFT), 종료 사유를 stream_log에 기록
+# - max_tokens에 걸려 끊긴 응답(finish_reason="length")은 첫 줄이 잘린 것 → 성공으로 내보내지 않고
+#   상한 없는 일반 호출로 한 번 더 요청 (반환 meta의 finish_reason은 LENGTH_FALLBACK)
+MAX_TOKENS_PER_CHAR = 1.5
+MAX_TOKENS_MARGIN = 32
+CUT_NEWLINE = "newline"
+FINISH_LENGTH = "length"
+LENGTH_FALLBACK = "length_fallback"
+
+stream_log = deque(maxlen=100000)
+
+def configure_streaming(enabled: bool = True):
+    global _streaming
+    _streaming = enabled
+
+def streaming_enabled() -> bool:
+    return _streaming
+
+def max_tokens_for(text: str) -> int:
+    return int(len(text) * MAX_TOKENS_PER_CHAR) + MAX_TOKENS_MARGIN
+
+async def call_llm_streaming(messages: list, max_tokens: int = None, retries: int = 3, delay: float = 1.2) -> tuple:
+    client, semaphore = next_client()
+    extra = {"max_tokens": max_tokens} if max_tokens else {}
 
+    truncated = None
     async with semaphore:
         for attempt in range(retries):
+            meta = {"ttft": None, "latency": None, "finish_reason": None, "max_tokens": max_tokens}
             try:
-                response = await client.chat.completions.create(
-                    model=MODEL,
-                    messages=messages
-                )
-                return response.choices[0].message.content.strip()
+                async with admission_slot():
+                    start = time.perf_counter()  # 입장 대기 시간은 TTFT/지연에서 제외
+                    received = await _send_stream(client, messages, extra, start)
+                    meta["latency"] = round(time.perf_counter() - start, 4)
+                meta["ttft"], meta["finish_reason"] = received["ttft"], received["finish_reason"]
+                text = received["text"]
+                stream_log.append(meta)
+                if meta["finish_reason"] == FINISH_LENGTH:
+                    truncated = meta
+                    break
+                return text.strip().split("\n", 1)[0].strip(), STATUS_OK, meta
             except Exception as e:
                 if "429" in str(e):
                     await asyncio.sleep(delay * (attempt + 1))  # 점진적 딜레이
                 else:
                     break
 
-    return "[ERROR] 호출 실패"
+    if truncated is not None:
+        # ✂️ 상한에 걸려 잘린 첫 줄 대신 상한 없는 일반 호출 결과 (세마포어를 놓은 뒤 다시 입장)
+        content, status = await call_llm_with_status(messages, retries, delay)
+        if status == STATUS_OK:
+            content = content.split("\n", 1)[0].strip()
+        return content, status, {**truncated, "finish_reason": LENGTH_FALLBACK}
+    return None, STATUS_FAILED, {"ttft": None, "latency": None, "finish_reason": None, "max_tokens": max_tokens}
+
+# 📖 스트림을 읽다가 내용이 있는 첫 줄이 끝나면 닫아 생성 중단 → {"text", "ttft", "finish_reason"}
+async def _read_stream(stream, start: float) -> dict:
+    received = {"text": "", "ttft": None, "finish_reason": None}
+    try:
+        async for chunk in stream:
+            if not chunk.choices:
+                continue
+            choice = chunk.choices[0]
+            delta = choice.delta.content or ""
+            if delta and received["ttft"] is None:
+                received["ttft"] = round(time.perf_counter() - start, 4)
+            received["text"] += delta
+            # 앞쪽 빈 줄은 건너뛰고, 내용이 있는 첫 줄이 끝나면 스트림을 닫아 생성 중단
+            if "\n" in delta and "\n" in received["text"].lstrip():
+                received["finish_reason"] = CUT_NEWLINE
+                break
+            if choice.finish_reason:
+                received["finish_reason"] = choice.finish_reason
+    finally:
+        await stream.close()
+    return received
+
+# openai 버전에 따라 원시 응답의 parse()가 동기/비동기
+async def _parse_raw(raw):
+    parsed = raw.parse()
+    return await parsed if inspect.isawaitable(parsed) else parsed
+
+# 🔌 실제 전송 (카세트가 설정되면 기록/재생을 거침, 기록 시에는 응답 헤더도 함께 받음)
+async def _send_chat(client, messages: list) -> str:
+    if _cassette is None:
+        response = await client.chat.completions.create(model=MODEL, messages=messages)
+        return response.choices[0].message.content.strip()
+
+    async def send():
+        raw = await client.chat.completions.with_raw_response.create(model=MODEL, messages=messages)
+        response = await _parse_raw(raw)
+        return response.choices[0].message.content.strip(), raw.headers
+
+    return await _cassette.call({"model": MODEL, "messages": messages}, send)
+
+async def _send_stream(client, messages: list, extra: dict, start: float) -> dict:
+    if _cassette is None:
+        stream = await client.chat.completions.create(model=MODEL, messages=messages, stream=True, **extra)
+        return await _read_stream(stream, start)
+
+    async def send():
+        raw = await client.chat.completions.with_raw_response.create(
+            model=MODEL, messages=messages, stream=True, **extra
+        )
+        return await _read_stream(await _parse_raw(raw), start), raw.headers
+
+    received = await _cassette.call({"model": MODEL, "messages": messages, "stream": True, **extra}, send)
+    if received["ttft"] is not None:
+        received = {**received, "ttft": _cassette.scaled(received["ttft"])}
+    return received
+
+# ✅ 스트리밍 설정에 따라 호출 → (응답, 상태, 메타). 비스트리밍이면 메타는 빈 dict
+async def call_llm_with_meta(messages: list, input_text: str = None, retries: int = 3, delay: float = 1.2) -> tuple:
+    if not _streaming:
+        content, status = await call_llm_with_status(messages, retries, delay)
+        return content, status, {}
+    max_tokens = max_tokens_for(input_text) if input_text else None
+    return await call_llm_streaming(messages, max_tokens, retries, delay)
+
+def _percentile(values: list, q: float):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+def stream_summary() -> dict:
+    ttfts = [m["ttft"] for m in stream_log if m["ttft"] is not None]
+    latencies = [m["latency"] for m in stream_log if m["latency"] is not None]
+    reasons = {}
+    for m in stream_log:
+        reasons[m["finish_reason"]] = reasons.get(m["finish_reason"], 0) + 1
+    return {
+        "calls": len(stream_log),
+        "ttft_p50": _percentile(ttfts, 0.50),
+        "ttft_p99": _percentile(ttfts, 0.99),
+        "latency_p50": _percentile(latencies, 0.50),
+        "latency_p99": _percentile(latencies, 0.99),
+        "finish_reasons": reasons,
+    }
+
+# 📼 카세트 기록/재생 설정 (engine.cassette)
+# - record: 키 수/동시성/스트리밍 여부를 헤더에 남김
+# - replay: 기록 당시와 같은 수의 가짜 키로 클라이언트 구성 (키·네트워크 불필요), 스트리밍 여부도 기록대로
+def configure_cassette(path: str, mode: str, speed: float = 1.0):
+    global _cassette
+    from engine.cassette import Cassette, RECORD
+
+    close_cassette()
+    if mode == RECORD:
+        meta = {"model": MODEL, "keys": len(get_api_keys()), "concurrency": _concurrency, "streaming": _streaming}
+        _cassette = Cassette(path, mode, speed, meta)
+        return _cassette
+
+    _cassette = Cassette(path, mode, speed)
+    header = _cassette.header
+    configure_keys([f"replay-key-{i}" for i in range(max(1, header.get("keys", 1)))],
+                   header.get("concurrency", DEFAULT_CONCURRENCY))
+    configure_streaming(header.get("streaming", False))
+    return _cassette
+
+def close_cassette():
+    global _cassette
+    if _cassette is not None:
+        _cassette.close()
+        _cassette = None
+
+def cassette_summary() -> dict:
+    return _cassette.summary() if _cassette is not None else None
+
+# 재생 중이면 LLM 외의 부가 API 호출(토큰 수 확인 등)도 건너뛰도록
+def cassette_replaying() -> bool:
+    from engine.cassette import REPLAY
+
+    return _cassette is not None and _cassette.mode == REPLAY
+
+# 🚦 프로세스 간 우선순위 입장 제어 (engine.admission)
+# - 설정되면 실제 전송(시도) 한 번마다 슬롯을 받음 (429 백오프 대기 중에는 슬롯을 반납한 상태)
+# - capacity 기본값은 전체 키 수 × 키당 동시성 (같은 .env를 읽는 프로세스끼리 같은 값)
+def configure_admission(priority: str, path: str = None, capacity: int = None):
+    global _admission
+    from engine.admission import AdmissionController, ADMISSION_PATH
+
+    close_admission()
+    capacity = capacity or max(1, len(get_api_keys())) * _concurrency
+    _admission = AdmissionController(priority, capacity, path or ADMISSION_PATH)
+    return _admission
+
+def admission_config() -> dict:
+    if _admission is None:
+        return None
+    return {"priority": _admission.priority, "path": _admission.path, "capacity": _admission.capacity}
+
+def close_admission():
+    global _admission
+    if _admission is not None:
+        _admission.close()
+        _admission = None
+
+def admission_slot():
+    return _admission if _admission is not None else contextlib.nullcontext()
+
+def admission_summary() -> dict:
+    return _admission.summary() if _admission is not None else None
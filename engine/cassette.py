@@ -0,0 +1,130 @@
+# engine/cassette.py
+
+import asyncio
+import hashlib
+import json
+import time
+from collections import defaultdict, deque
+
+# 📼 LLM 전송 계층 기록/재생 (카세트)
+# - record: 실제 호출 한 번(시도 단위)마다 요청 해시, 응답, 상태, 지연, 응답 헤더를 jsonl로 기록
+#   (429 등 오류 응답도 그대로 기록 → 재생 시 같은 오류 메시지로 재현되어 기존 재시도 로직이 똑같이 동작)
+# - replay: 네트워크 없이 같은 요청 해시의 기록을 기록 순서대로 꺼내 원래 지연(speed로 배율 조정) 후 반환
+#   · 같은 요청이 기록보다 많이 오면 마지막 성공 응답 재사용, 기록에 없는 요청은 miss(호출 실패)로 처리
+# - 스케줄러/재시도/평가 변경을 같은 트래픽으로 오프라인 벤치마크하기 위한 용도
+RECORD = "record"
+REPLAY = "replay"
+CASSETTE_VERSION = 1
+
+# 기록하지 않는 헤더 (세션/인증 정보)
+SKIPPED_HEADERS = ("set-cookie", "authorization", "cookie")
+
+class CassetteMiss(Exception):
+    pass
+
+# 재생된 오류: 원래 예외 메시지(예: "Error code: 429 - ...")를 그대로 가짐
+class ReplayedError(Exception):
+    def __init__(self, message: str, status_code: int = None, headers: dict = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.headers = headers or {}
+
+def request_key(payload: dict) -> str:
+    body = json.dumps(payload, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(body.encode("utf-8")).hexdigest()
+
+def _headers_of(headers) -> dict:
+    if not headers:
+        return {}
+    return {k.lower(): v for k, v in headers.items() if k.lower() not in SKIPPED_HEADERS}
+
+class Cassette:
+    def __init__(self, path: str, mode: str, speed: float = 1.0, meta: dict = None):
+        if mode not in (RECORD, REPLAY):
+            raise ValueError(f"unknown cassette mode: {mode}")
+        self.path = path
+        self.mode = mode
+        self.speed = speed
+        self.stats = {"calls": 0, "errors": 0, "misses": 0, "reused": 0}
+        self._t0 = time.perf_counter()
+
+        if mode == RECORD:
+            from optimizer.jsonl_io import JsonlWriter
+
+            self.header = {"cassette": CASSETTE_VERSION, "created_at": time.time(), **(meta or {})}
+            self._writer = JsonlWriter(path)
+            self._writer.put(self.header)
+        else:
+            self.header, self._events, self._last_ok = self._load(path)
+
+    @staticmethod
+    def _load(path: str) -> tuple:
+        from optimizer.jsonl_io import read_jsonl
+
+        header, events, last_ok = {}, defaultdict(deque), {}
+        for item in read_jsonl(path):
+            if "cassette" in item:
+                header = item
+                continue
+            events[item["key"]].append(item)
+            if item["status"] == "ok":
+                last_ok[item["key"]] = item
+        return header, events, last_ok
+
+    def close(self):
+        if self.mode == RECORD:
+            self._writer.close()
+
+    # send: 인자 없는 코루틴 함수 → (값, 응답 헤더). 값은 JSON 직렬화 가능해야 함
+    async def call(self, payload: dict, send):
+        self.stats["calls"] += 1
+        key = request_key(payload)
+        if self.mode == REPLAY:
+            return await self._replay(key)
+
+        start = time.perf_counter()
+        try:
+            value, headers = await send()
+        except Exception as e:
+            self.stats["errors"] += 1
+            response = getattr(e, "response", None)
+            self._writer.put({
+                "key": key, "offset": round(start - self._t0, 4),
+                "latency": round(time.perf_counter() - start, 4), "status": "error",
+                "error": str(e), "status_code": getattr(e, "status_code", None),
+                "headers": _headers_of(getattr(response, "headers", None)),
+            })
+            raise
+        self._writer.put({
+            "key": key, "offset": round(start - self._t0, 4),
+            "latency": round(time.perf_counter() - start, 4), "status": "ok",
+            "response": value, "headers": _headers_of(headers),
+        })
+        return value
+
+    # 재생 시 기록된 시간 값을 배율에 맞춰 변환 (기록 모드에서는 그대로)
+    def scaled(self, seconds: float) -> float:
+        if self.mode != REPLAY or self.speed <= 0:
+            return seconds
+        return round(seconds / self.speed, 4)
+
+    async def _replay(self, key: str):
+        queue = self._events.get(key)
+        if queue:
+            event = queue.popleft()
+        elif key in self._last_ok:
+            self.stats["reused"] += 1
+            event = self._last_ok[key]
+        else:
+            self.stats["misses"] += 1
+            raise CassetteMiss(f"no recorded response for request {key[:12]}")
+
+        if self.speed > 0:
+            await asyncio.sleep(self.scaled(event["latency"]))
+        if event["status"] != "ok":
+            self.stats["errors"] += 1
+            raise ReplayedError(event["error"], event.get("status_code"), event.get("headers"))
+        return event["response"]
+
+    def summary(self) -> dict:
+        return {"mode": self.mode, "path": self.path, **self.stats}
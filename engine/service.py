@@ -0,0 +1,242 @@
+# engine/service.py
+# 실행: python -m engine.service --port 8080
+
+import asyncio
+import time
+from collections import deque
+from engine.api_client import call_llm_with_status, STATUS_OK, STATUS_FAILED
+from optimizer.async_runner import build_messages
+from optimizer.cascade import flag_suspicious
+
+# 🌐 상주형 교정 서비스 (aiohttp)
+# - POST /v1/correct  {"text": "..."} 또는 {"texts": [...]}, 선택적으로 "template"
+# - 같은 (템플릿, 문장)이 처리 중이면 새 업스트림 호출 없이 같은 결과를 기다림 (coalescing)
+# - 요청은 batch_window 동안 모아 중복을 합친 뒤 한 번에 디스패치 (micro-batching)
+# - X-Tenant 헤더별 동시 처리 수 제한 (키 풀의 키별 세마포어 위에 추가로 적용)
+#   처리 중인 요청이 없는 테넌트의 세마포어는 바로 정리 (헤더 값마다 쌓이지 않도록)
+DEFAULT_TENANT = "default"
+TENANT_HEADER = "X-Tenant"
+
+def load_templates() -> dict:
+    from prompts.base_templates import BASE_TEMPLATES
+    from prompts.improved_templates import IMPROVED_TEMPLATES
+    from prompts.compact_templates import COMPACT_TEMPLATES, make_cascade
+
+    templates = {t["id"]: t for t in BASE_TEMPLATES + IMPROVED_TEMPLATES + COMPACT_TEMPLATES}
+    cascade = make_cascade(COMPACT_TEMPLATES[0], IMPROVED_TEMPLATES[-1])
+    templates[cascade["id"]] = cascade
+    return templates
+
+def percentile(values, q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+class CorrectionService:
+    def __init__(self, templates: dict = None, default_template: str = None, call_fn=call_llm_with_status,
+                 tenant_concurrency: int = 8, batch_window: float = 0.005, max_batch: int = 32):
+        from prompts.improved_templates import IMPROVED_TEMPLATES
+
+        self.templates = templates or load_templates()
+        self.default_template = default_template or IMPROVED_TEMPLATES[-1]["id"]
+        self.call_fn = call_fn
+        self.tenant_concurrency = tenant_concurrency
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+
+        self._tenants = {}  # tenant → [세마포어, 사용 중인 요청 수]
+        self._inflight = {}
+        self._tasks = set()  # 디스패치된 _resolve 태스크 (GC로 사라지지 않도록 참조 유지)
+        self._pending = deque()
+        self._wakeup = asyncio.Event()
+        self._batcher = None
+        self.stats = {"requests": 0, "coalesced": 0, "upstream_calls": 0, "failed": 0, "batches": 0}
+        self._upstream_latency = deque(maxlen=10000)
+
+    def start(self):
+        if self._batcher is None:
+            self._batcher = asyncio.create_task(self._batch_loop())
+
+    async def stop(self):
+        if self._batcher is not None:
+            self._batcher.cancel()
+            await asyncio.gather(self._batcher, return_exceptions=True)
+            self._batcher = None
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def template(self, template_id: str = None) -> dict:
+        template_id = template_id or self.default_template
+        if template_id not in self.templates:
+            raise KeyError(template_id)
+        return self.templates[template_id]
+
+    # 단일 문장 교정 → {"text", "corrected", "status", "coalesced"}
+    async def correct(self, text: str, template_id: str = None, tenant: str = DEFAULT_TENANT) -> dict:
+        template = self.template(template_id)
+        self.start()
+        slot = self._tenants.get(tenant)
+        if slot is None:
+            slot = self._tenants[tenant] = [asyncio.Semaphore(self.tenant_concurrency), 0]
+        slot[1] += 1
+        try:
+            async with slot[0]:
+                result = await self._submit(template, text)
+        finally:
+            slot[1] -= 1
+            if slot[1] == 0:
+                del self._tenants[tenant]
+        return result
+
+    async def _submit(self, template: dict, text: str) -> dict:
+        self.stats["requests"] += 1
+        key = (template["id"], text)
+        future = self._inflight.get(key)
+        coalesced = future is not None
+        if coalesced:
+            self.stats["coalesced"] += 1
+        else:
+            future = asyncio.get_running_loop().create_future()
+            self._inflight[key] = future
+            self._pending.append((key, template, future))
+            self._wakeup.set()
+        # shield: 한 요청이 취소돼도 같은 결과를 기다리는 다른 요청에는 영향 없음
+        pred, status = await asyncio.shield(future)
+
+        return {
+            "text": text,
+            "corrected": pred if status == STATUS_OK else text,  # 실패 시 원문 그대로
+            "status": status,
+            "coalesced": coalesced,
+        }
+
+    async def correct_many(self, texts: list, template_id: str = None, tenant: str = DEFAULT_TENANT) -> list:
+        return await asyncio.gather(*(self.correct(text, template_id, tenant) for text in texts))
+
+    # 📦 첫 요청 도착 후 batch_window만큼 더 모으거나 max_batch가 차면 한 번에 디스패치
+    async def _batch_loop(self):
+        while True:
+            await self._wakeup.wait()
+            if len(self._pending) < self.max_batch:
+                await asyncio.sleep(self.batch_window)
+            batch = [self._pending.popleft() for _ in range(min(self.max_batch, len(self._pending)))]
+            if not self._pending:
+                self._wakeup.clear()
+            if batch:
+                self.stats["batches"] += 1
+                for key, template, future in batch:
+                    task = asyncio.create_task(self._resolve(key, template, future))
+                    self._tasks.add(task)
+                    task.add_done_callback(self._tasks.discard)
+
+    async def _resolve(self, key, template, future):
+        start = time.perf_counter()
+        try:
+            result = await self._upstream(template, key[1])
+        except asyncio.CancelledError:
+            # stop() 중 취소 → 기다리던 요청도 함께 취소
+            future.cancel()
+            raise
+        except Exception:
+            result = (None, STATUS_FAILED)
+        finally:
+            self._inflight.pop(key, None)
+        self._upstream_latency.append(time.perf_counter() - start)
+        if result[1] != STATUS_OK:
+            self.stats["failed"] += 1
+        if not future.done():
+            future.set_result(result)
+
+    async def _upstream(self, template: dict, text: str) -> tuple:
+        # 🪜 캐스케이드: 짧은 템플릿 결과가 의심스러울 때만 긴 템플릿으로 재요청
+        if template.get("type") == "cascade":
+            short_template, full_template = template["stages"]
+            self.stats["upstream_calls"] += 1
+            pred, status = await self.call_fn(build_messages(short_template, text))
+            if status == STATUS_OK and not flag_suspicious(text, pred):
+                return pred, status
+            template = full_template
+        self.stats["upstream_calls"] += 1
+        return await self.call_fn(build_messages(template, text))
+
+    def snapshot(self) -> dict:
+        latency = list(self._upstream_latency)
+        return {
+            **self.stats,
+            "inflight": len(self._inflight),
+            "tenants": len(self._tenants),
+            "queued": len(self._pending),
+            "avg_batch": round(
+                (self.stats["requests"] - self.stats["coalesced"]) / self.stats["batches"], 2
+            ) if self.stats["batches"] else 0.0,
+            "upstream_p50_ms": round(percentile(latency, 0.50) * 1000, 1),
+            "upstream_p99_ms": round(percentile(latency, 0.99) * 1000, 1),
+        }
+
+# 🔌 HTTP 라우팅
+def create_app(service: CorrectionService):
+    from aiohttp import web
+
+    async def handle_correct(request):
+        try:
+            body = await request.json()
+        except ValueError:
+            return web.json_response({"error": "invalid JSON body"}, status=400)
+        if not isinstance(body, dict):
+            return web.json_response({"error": "body must be a JSON object"}, status=400)
+
+        tenant = request.headers.get(TENANT_HEADER, DEFAULT_TENANT)
+        template_id = body.get("template")
+        try:
+            service.template(template_id)
+        except KeyError:
+            return web.json_response({"error": f"unknown template: {template_id}"}, status=404)
+
+        if isinstance(body.get("text"), str):
+            return web.json_response(await service.correct(body["text"], template_id, tenant))
+        texts = body.get("texts")
+        if isinstance(texts, list) and all(isinstance(t, str) for t in texts):
+            return web.json_response({"results": await service.correct_many(texts, template_id, tenant)})
+        return web.json_response({"error": "'text' (str) or 'texts' (list of str) is required"}, status=400)
+
+    async def handle_health(_):
+        return web.json_response({"ok": True})
+
+    async def handle_stats(_):
+        return web.json_response(service.snapshot())
+
+    async def on_startup(_):
+        service.start()
+
+    async def on_cleanup(_):
+        await service.stop()
+
+    app = web.Application()
+    app.router.add_post("/v1/correct", handle_correct)
+    app.router.add_get("/healthz", handle_health)
+    app.router.add_get("/stats", handle_stats)
+    app.on_startup.append(on_startup)
+    app.on_cleanup.append(on_cleanup)
+    return app
+
+if __name__ == "__main__":
+    import argparse
+    from aiohttp import web
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", type=str, default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--template", type=str, default=None, help="기본 템플릿 id")
+    parser.add_argument("--tenant-concurrency", type=int, default=8)
+    parser.add_argument("--batch-window-ms", type=float, default=5.0)
+    parser.add_argument("--max-batch", type=int, default=32)
+    args = parser.parse_args()
+
+    async def serve():
+        service = CorrectionService(default_template=args.template, tenant_concurrency=args.tenant_concurrency,
+                                    batch_window=args.batch_window_ms / 1000, max_batch=args.max_batch)
+        return create_app(service)
+
+    web.run_app(serve(), host=args.host, port=args.port)
@@ -1,62 +1,102 @@
 import asyncio
 import os
-import json
 import argparse
 from dotenv import load_dotenv
 from config import SAMPLE_SIZE
 
 from prompts.base_templates import BASE_TEMPLATES
 from prompts.improved_templates import IMPROVED_TEMPLATES
+from prompts.compact_templates import COMPACT_TEMPLATES, make_cascade
+from engine.api_client import (
+    configure_streaming, streaming_enabled, stream_summary, configure_cassette, close_cassette, cassette_summary,
+    configure_admission, close_admission, admission_summary
+)
+from engine.admission import ADMISSION_PATH, PRIORITY_CLASSES, EXPERIMENT
 from optimizer.async_runner import run_all
+from optimizer.sharded_runner import run_sharded
+from optimizer.registry import run_registered, REGISTRY_PATH
+from optimizer.active_eval import run_active
+from optimizer.eval_subset import load_subset_ids
+from optimizer.significance import SequentialStopper
+from optimizer.deadline import DeadlinePlanner, deadline_end
 from optimizer.evaluator import evaluate
 from optimizer.error_extractor import extract_failed_cases
+from optimizer.jsonl_io import concat_jsonl
 from optimizer.summary_writer import write_summary_csv
 
 load_dotenv()
 
-async def main_loop(sample_size: int = SAMPLE_SIZE, mode: str = "auto"):
+async def run_templates(train_path, out_path, sample_size, templates, processes=1, queue_path=None, ids=None,
+                        early_stop=False, planner=None):
+    if queue_path:
+        # 🗃️ 여러 머신/컨테이너가 같은 SQLite 큐를 공유해 작업 분담
+        await run_all(train_path, out_path, sample_size, templates, queue_path=queue_path, ids=ids)
+    elif processes > 1:
+        # 🧵 다중 프로세스 샤딩: 키/행을 워커별로 나눠 각자 이벤트 루프 실행
+        await asyncio.to_thread(run_sharded, train_path, out_path, sample_size, templates, processes, ids)
+    else:
+        # ⏹️ 통계적으로 열세가 확정된 템플릿은 더 이상 호출하지 않음
+        # 최대 관측 행 수(정보 비율 1)는 이번 실행의 템플릿당 행 수
+        stopper = SequentialStopper(len(ids) if ids is not None else sample_size) if early_stop else None
+        await run_all(train_path, out_path, sample_size, templates, ids=ids, stopper=stopper, planner=planner)
+
+async def main_loop(sample_size: int = SAMPLE_SIZE, mode: str = "auto", processes: int = 1, queue_path: str = None,
+                    subset_path: str = None, early_stop: bool = False, registry_path: str = REGISTRY_PATH,
+                    deadline: float = None, budget: int = None, seed_rows: int = 100, batch_rows: int = 100):
+    # 🎯 대표 부분집합이 주어지면 SAMPLE_SIZE 랜덤 샘플 대신 고정된 소수 행만 평가
+    ids = load_subset_ids(subset_path) if subset_path else None
+    # ⏰ 마감 모드: 실험은 템플릿 간 비교가 목적이므로 더 싼 템플릿으로 바꾸지 않고, 마감 후 남은 셀만 건너뜀
+    #    (deadline은 deadline_end()로 고정한 time.monotonic 기준 절대 마감)
+    planner = DeadlinePlanner(end=deadline) if deadline is not None else None
     os.makedirs("data", exist_ok=True)
-    results_all = []
 
     base_path = "data/results_base.jsonl"
     improve_path = "data/results_improve.jsonl"
+    cascade_path = "data/results_cascade.jsonl"
     merged_path = "data/results.jsonl"
 
     if mode == "base":
         print("🚀 Running BASE_TEMPLATES only...")
-        await run_all("data/train.csv", base_path, sample_size, BASE_TEMPLATES)
+        await run_templates("data/train.csv", base_path, sample_size, BASE_TEMPLATES, processes, queue_path, ids, early_stop, planner)
 
     elif mode == "improve":
         print("🚀 Running IMPROVED_TEMPLATES only...")
-        await run_all("data/train.csv", improve_path, sample_size, IMPROVED_TEMPLATES)
+        await run_templates("data/train.csv", improve_path, sample_size, IMPROVED_TEMPLATES, processes, queue_path, ids, early_stop, planner)
 
     elif mode == "both":
         print("🚀 Running BOTH BASE and IMPROVED templates...")
-        await run_all("data/train.csv", base_path, sample_size, BASE_TEMPLATES)
-        await run_all("data/train.csv", improve_path, sample_size, IMPROVED_TEMPLATES)
+        await run_templates("data/train.csv", base_path, sample_size, BASE_TEMPLATES, processes, queue_path, ids, early_stop, planner)
+        await run_templates("data/train.csv", improve_path, sample_size, IMPROVED_TEMPLATES, processes, queue_path, ids, early_stop, planner)
+
+    elif mode == "cascade":
+        print("🪜 Running CASCADE (compact → improved)...")
+        cascade = make_cascade(COMPACT_TEMPLATES[0], IMPROVED_TEMPLATES[-1])
+        await run_templates("data/train.csv", cascade_path, sample_size, [cascade], processes, queue_path, ids, early_stop, planner)
 
     elif mode == "auto":
-        run_base = not os.path.exists(base_path)
-        run_improve = os.path.exists(base_path)
-        if run_base:
-            print("🚀 Running BASE_TEMPLATES...")
-            await run_all("data/train.csv", base_path, sample_size, BASE_TEMPLATES)
-        if run_improve:
-            print("🚀 Running IMPROVED_TEMPLATES...")
-            await run_all("data/train.csv", improve_path, sample_size, IMPROVED_TEMPLATES)
-        if not run_base and not run_improve:
-            print("⚠️ Skip: 이미 두 결과가 모두 있음")
+        # 🧾 템플릿 내용 해시 기준으로 결과가 없는 (템플릿, 행) 셀만 실행 → 수정한 템플릿만 다시 호출
+        print("🚀 Running BASE + IMPROVED templates (missing registry cells only)...")
+        await run_registered("data/train.csv", base_path, sample_size, BASE_TEMPLATES, registry_path, ids, planner)
+        await run_registered("data/train.csv", improve_path, sample_size, IMPROVED_TEMPLATES, registry_path, ids, planner)
+
+    elif mode == "active":
+        # 🎯 시드 행에 전체 실행 후, 템플릿끼리 답이 갈리는 층에만 추가 호출 (층 가중 F1로 순위)
+        # 과표집된 결과라 evaluate()의 단순 평균과는 맞지 않으므로 병합/평가 단계는 건너뜀
+        print("🎯 Running BASE + IMPROVED templates (active evaluation)...")
+        summary = await run_active("data/train.csv", BASE_TEMPLATES + IMPROVED_TEMPLATES, sample_size, budget,
+                                   seed_rows, batch_rows, registry_path=registry_path, ids=ids)
+        print(f"\n📋 템플릿 순위 (층 가중 F1, {summary['rows']}/{summary['pool']}행, "
+              f"{summary['calls']}/{summary['uniform_calls']}호출, 안정: {summary['stable']}):")
+        for rank, tid in enumerate(summary["ranking"], 1):
+            mark = " (고정)" if tid in summary["frozen"] else ""
+            print(f"{rank}. {tid} | f1={summary['f1'][tid]}{mark}")
+        return
 
     # 병합
     print("📎 Merging results...")
-    for path in [base_path, improve_path]:
-        if os.path.exists(path):
-            with open(path, encoding="utf-8") as f:
-                results_all.extend(json.loads(line) for line in f)
-
-    with open(merged_path, "w", encoding="utf-8") as f:
-        for item in results_all:
-            f.write(json.dumps(item, ensure_ascii=False) + "\n")
+    # 파싱/재직렬화 없이 파일을 이어 붙이고, 이벤트 루프 밖(스레드)에서 실행
+    paths = [path for path in [base_path, improve_path, cascade_path] if os.path.exists(path)]
+    await asyncio.to_thread(concat_jsonl, paths, merged_path)
 
     # 평가 및 후처리
     print("\n📊 Evaluating results...")
@@ -72,11 +112,74 @@ async def main_loop(sample_size: int = SAMPLE_SIZE, mode: str = "auto"):
     extract_failed_cases()
     write_summary_csv()
 
+    if streaming_enabled():
+        print(f"🌊 스트리밍 호출 요약: {stream_summary()}")
+    if cassette_summary():
+        print(f"📼 카세트: {cassette_summary()}")
+    if admission_summary():
+        print(f"🚦 입장 제어: {admission_summary()}")
+    if planner is not None:
+        skipped = planner.total - planner.done
+        print(f"⏰ 마감 모드: {planner.done}/{planner.total}셀 완료, {skipped}셀은 status=deadline(채점 제외)로 기록")
+
     print("\n✅ 실험 완료. improved_templates.py에 복붙하세요.")
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
-    parser.add_argument("--mode", type=str, default="auto", choices=["base", "improve", "both", "auto"])
+    parser.add_argument("--mode", type=str, default="auto", choices=["base", "improve", "both", "auto", "cascade", "active"])
+    parser.add_argument("--processes", type=int, default=1, help="워커 프로세스 수 (키/행 샤딩)")
+    parser.add_argument("--queue", type=str, default=None, help="공유 SQLite 작업 큐 경로")
+    parser.add_argument("--subset", type=str, default=None, help="대표 평가 부분집합 경로 (optimizer.eval_subset)")
+    parser.add_argument("--early-stop", action="store_true", help="열세가 확정된 템플릿 호출 조기 중단 (단일 프로세스)")
+    parser.add_argument("--registry", type=str, default=REGISTRY_PATH, help="auto 모드 실험 레지스트리 경로")
+    parser.add_argument("--stream", action="store_true", help="스트리밍 호출: 첫 줄에서 중단, 입력 길이 기반 max_tokens")
+    parser.add_argument("--record", type=str, default=None, help="실제 호출을 카세트 파일로 기록")
+    parser.add_argument("--replay", type=str, default=None, help="카세트 파일로 오프라인 재생 (네트워크/키 불필요)")
+    parser.add_argument("--replay-speed", type=float, default=1.0, help="재생 지연 배율 (2.0 = 두 배 빠르게, 0 = 대기 없음)")
+    parser.add_argument("--budget", type=int, default=None, help="active 모드 총 호출 수 상한")
+    parser.add_argument("--seed-rows", type=int, default=100, help="active 모드: 모든 템플릿을 실행할 시드 행 수")
+    parser.add_argument("--batch-rows", type=int, default=100, help="active 모드: 라운드당 추가 행 수")
+    parser.add_argument("--deadline", type=str, default=None, help="마감: 5400 / 90m / 1h30m / 23:30 / 2026-10-20T09:00")
+    parser.add_argument("--priority", type=str, default=EXPERIMENT, choices=list(PRIORITY_CLASSES),
+                        help="키 풀 공유 시 우선순위 클래스")
+    parser.add_argument("--admission", type=str, default=ADMISSION_PATH, help="프로세스 간 입장 제어 SQLite 경로")
+    parser.add_argument("--no-admission", action="store_true", help="프로세스 간 입장 제어 끄기")
     args = parser.parse_args()
 
-    asyncio.run(main_loop(mode=args.mode))
+    if args.record and args.replay:
+        parser.error("--record와 --replay는 함께 쓸 수 없습니다")
+    if (args.record or args.replay) and args.processes > 1:
+        parser.error("카세트 기록/재생은 단일 프로세스에서만 지원합니다 (--processes 1)")
+
+    deadline = None
+    if args.deadline:
+        if args.processes > 1 or args.queue:
+            parser.error("--deadline은 단일 프로세스, 비큐 모드에서만 지원합니다")
+        try:
+            deadline = deadline_end(args.deadline)  # 준비 시간도 마감에 포함되도록 지금 고정
+        except ValueError as e:
+            parser.error(str(e))
+    if args.mode == "auto" and (args.processes > 1 or args.queue or args.early_stop):
+        # 레지스트리 플래너는 빈 셀만 단일 프로세스로 실행 → 샤딩/큐/조기 종료는 base/improve/both 모드에서
+        parser.error("auto(레지스트리) 모드는 --processes/--queue/--early-stop을 지원하지 않습니다 "
+                     "(--mode base/improve/both 사용)")
+    if args.mode == "active" and (args.processes > 1 or args.queue or args.deadline):
+        parser.error("active 모드는 단일 프로세스, 비큐, 비마감 실행만 지원합니다")
+
+    if args.stream:
+        configure_streaming()
+    if args.record:
+        configure_cassette(args.record, "record")
+    elif args.replay:
+        configure_cassette(args.replay, "replay", args.replay_speed)
+    if not args.no_admission:
+        # 🚦 같은 키 풀을 쓰는 다른 프로세스(제출/실험)와 동시 호출 수를 우선순위대로 나눔
+        configure_admission(args.priority, args.admission)
+
+    try:
+        asyncio.run(main_loop(mode=args.mode, processes=args.processes, queue_path=args.queue, subset_path=args.subset,
+                              early_stop=args.early_stop, registry_path=args.registry, deadline=deadline,
+                              budget=args.budget, seed_rows=args.seed_rows, batch_rows=args.batch_rows))
+    finally:
+        close_cassette()
+        close_admission()
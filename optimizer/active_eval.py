@@ -0,0 +1,369 @@
+# optimizer/active_eval.py
+
+import heapq
+import math
+import random
+from collections import defaultdict
+from config import SAMPLE_SIZE
+from optimizer.evaluator import find_differences_with_offsets, score_row, is_scorable, tokenize, summarize_scores
+from optimizer.eval_subset import row_stratum, allocate, spearman
+from optimizer.registry import REGISTRY_PATH
+
+# 🎯 능동 평가: 템플릿 순위를 가르는 행에만 호출을 씀
+# - 모든 후보를 작은 시드 집합(층화 추출)에 먼저 실행
+# - 이후 행은 층(오류 유형 × 정답 diff 수 × 길이, eval_subset.row_stratum)별로 배정
+#   · 층의 몫 ∝ 층 크기 × 템플릿 간 행 점수 불일치(표준편차) (Neyman 배분)
+#     → 모든 템플릿이 같은 답을 내는 층(예: 무오류 문장은 누구나 0점)에는 더 호출하지 않음
+#   · 관측이 적은 층의 불일치는 정답 diff 밀도(토큰당 정답 수정 수)에 비례한 사전값으로 보정
+# - 선택된 행에는 아직 순위가 갈리지 않은 템플릿만 실행 (paired 비교)
+#   · 위/아래 이웃 템플릿과의 점수 차이 z값이 모두 freeze_z 이상이면 그 템플릿은 더 호출하지 않음
+# - 점수는 층 크기 가중 평균 → 불일치 층을 과표집해도 F1 추정이 치우치지 않음
+#   (모든 템플릿이 관측된 층만 사용 → 템플릿마다 같은 층 가중치)
+# - 라운드마다 순위 안정성(직전 대비 Spearman, 1위 유지, 인접 순위 분리도) 보고,
+#   순위가 patience 라운드 연속 그대로이거나 모든 템플릿의 순위가 갈리면 종료
+ACTIVE_RESULTS_PATH = "data/results_active.jsonl"
+
+def gold_density(err: str, cor: str) -> float:
+    return len(find_differences_with_offsets(err, cor)) / max(1, len(tokenize(err)))
+
+def _f1(recall: float, precision: float) -> float:
+    return 2 * recall * precision / (recall + precision) if (recall + precision) > 0 else 0.0
+
+# 행 점수 불일치: 템플릿 간 recall/precision 분산의 합 (모두 같은 답이면 0)
+def _spread(values) -> float:
+    values = list(values)
+    total = 0.0
+    for k in (0, 1):
+        mean = sum(v[k] for v in values) / len(values)
+        total += sum((v[k] - mean) ** 2 for v in values) / len(values)
+    return total
+
+class ActiveEvaluator:
+    # rows: {"id", "input", "target"} 목록 (정답이 없는 행은 제외)
+    # uniform=True면 불일치를 보지 않고 층 크기 비례로만 추출 (비교 기준선)
+    def __init__(self, rows: list, template_ids: list, seed_size: int = 100, batch_size: int = 100,
+                 prior_strength: float = 5.0, patience: int = 3, freeze_z: float = 3.0, min_rows: int = 100,
+                 uniform: bool = False, seed: int = 0):
+        self.template_ids = list(template_ids)
+        self.rows = {row["id"]: row for row in rows if row.get("target")}
+        self.seed_size = seed_size
+        self.batch_size = batch_size
+        self.prior_strength = prior_strength
+        self.patience = patience
+        self.freeze_z = freeze_z
+        self.min_rows = min_rows  # 템플릿을 고정하기 전 최소 관측 행 수
+        self.uniform = uniform
+        self.rng = random.Random(seed)
+
+        self.cluster_of = {}
+        self.pending = defaultdict(list)  # 층별 아직 실행하지 않은 행 id (무작위 순서, 뒤에서 꺼냄)
+        density = defaultdict(list)
+        for row_id, row in self.rows.items():
+            cluster = "|".join(row_stratum(row["input"], row["target"]))
+            self.cluster_of[row_id] = cluster
+            self.pending[cluster].append(row_id)
+            density[cluster].append(gold_density(row["input"], row["target"]))
+        for ids in self.pending.values():
+            self.rng.shuffle(ids)
+        self.sizes = {c: len(ids) for c, ids in self.pending.items()}
+        self.density = {c: sum(d) / len(d) for c, d in density.items()}
+
+        self.scores = {}  # row_id → {template_id: (recall, precision)} (실행한 템플릿만)
+        self.disagreement = {}  # row_id → 템플릿 간 점수 불일치
+        self.observed = defaultdict(list)  # 층 → 채점된 행 id
+        self.frozen = {}  # 순위가 갈려 더 호출하지 않는 템플릿 → 고정 시점 보고
+        self.requeued = set()
+        self.calls = 0
+        self.history = []
+        self._stable = 0
+
+    # 아직 호출 대상인 템플릿 (균등 추출 기준선은 고정하지 않음)
+    def live(self) -> list:
+        return [t for t in self.template_ids if t not in self.frozen]
+
+    # 층별 불일치 표준편차 추정 (관측값 + 정답 diff 밀도 기반 사전값을 prior_strength 행 분량으로 섞음)
+    def spreads(self) -> dict:
+        if self.uniform:
+            return {c: 1.0 for c in self.sizes}
+        observed = {c: [self.disagreement[r] for r in ids] for c, ids in self.observed.items() if ids}
+        rows = [d for values in observed.values() for d in values]
+        if not rows:
+            return {c: 1.0 for c in self.sizes}
+        base = sum(rows) / len(rows)
+        mean_density = sum(self.density[self.cluster_of[r]] for ids in self.observed.values() for r in ids) / len(rows)
+
+        spreads = {}
+        k = self.prior_strength
+        for c in self.sizes:
+            prior = base * self.density[c] / mean_density if mean_density else base
+            values = observed.get(c, [])
+            spreads[c] = math.sqrt((sum(values) + k * prior) / (len(values) + k))
+        return spreads
+
+    # 다음에 실행할 행 (첫 호출은 층화 시드, 이후에는 분산 감소가 가장 큰 층부터 한 행씩)
+    def next_batch(self, limit: int = None) -> list:
+        available = {c: len(ids) for c, ids in self.pending.items() if ids}
+        if not available:
+            return []
+        if not self.history:
+            size = min(self.seed_size, sum(available.values()), limit or self.seed_size)
+            picks = allocate(available, size)
+        else:
+            size = min(self.batch_size, limit or self.batch_size)
+            picks = defaultdict(int)
+            spreads = self.spreads()
+            # N_c·σ_c / √((n_c+1)(n_c+2)): 층에 한 행을 더할 때의 분산 감소량 → 반복 적용하면 Neyman 비율
+            heap = []
+            for c in available:
+                n = len(self.observed[c])
+                heap.append((-self.sizes[c] * spreads[c] / math.sqrt((n + 1) * (n + 2)), c))
+            heapq.heapify(heap)
+            while heap and size > 0:
+                _, c = heapq.heappop(heap)
+                picks[c] += 1
+                size -= 1
+                if picks[c] < available[c]:
+                    n = len(self.observed[c]) + picks[c]
+                    heapq.heappush(heap, (-self.sizes[c] * spreads[c] / math.sqrt((n + 1) * (n + 2)), c))
+        return [self.rows[self.pending[c].pop()] for c in sorted(picks) for _ in range(picks[c])]
+
+    # results: 선택한 행들의 실행 결과 (template_id는 현재 템플릿 id), calls: 이번 라운드에 실제로 보낸 호출 수
+    # 일부 템플릿이 실패한 행은 한 번만 다시 대기열 맨 뒤로 (끝까지 실패하면 제외)
+    def observe(self, results: list, calls: int) -> dict:
+        self.calls += calls
+        by_row = defaultdict(dict)
+        seen = {}  # (행, 예측) → 점수: 템플릿끼리 같은 답이면 한 번만 채점
+        for r in results:
+            if r.get("target") and is_scorable(r):
+                key = (r["id"], r["prediction"])
+                if key not in seen:
+                    seen[key] = score_row(r["input"], r["target"], r["prediction"])
+                by_row[r["id"]][r["template_id"]] = seen[key]
+
+        live = self.live()
+        for row_id in dict.fromkeys(r["id"] for r in results):
+            scored = by_row.get(row_id, {})
+            if all(tid in scored for tid in live):
+                self.scores[row_id] = {tid: scored[tid] for tid in live}
+                self.disagreement[row_id] = _spread(self.scores[row_id].values())
+                self.observed[self.cluster_of[row_id]].append(row_id)
+            elif row_id not in self.requeued:
+                self.requeued.add(row_id)
+                self.pending[self.cluster_of[row_id]].insert(0, row_id)
+        return self._report()
+
+    # 모든 템플릿이 한 행 이상 관측된 층 → 크기 비례 가중치
+    def _weights(self) -> dict:
+        counts = defaultdict(lambda: defaultdict(int))
+        for c, ids in self.observed.items():
+            for r in ids:
+                for tid in self.scores[r]:
+                    counts[c][tid] += 1
+        common = {c: self.sizes[c] for c in counts if len(counts[c]) == len(self.template_ids)}
+        total = sum(common.values())
+        return {c: n / total for c, n in common.items()} if total else {}
+
+    # 층 가중 평균 recall/precision → F1 (템플릿마다 자기가 실행된 행으로)
+    def estimate(self) -> dict:
+        weights = self._weights()
+        estimates = {}
+        for tid in self.template_ids:
+            recall = precision = 0.0
+            for c, w in weights.items():
+                values = [self.scores[r][tid] for r in self.observed[c] if tid in self.scores[r]]
+                recall += w * sum(v[0] for v in values) / len(values)
+                precision += w * sum(v[1] for v in values) / len(values)
+            estimates[tid] = {"recall": recall, "precision": precision, "f1": _f1(recall, precision)}
+        return estimates
+
+    # 인접 순위 쌍의 (recall + precision) 차이 z값 (두 템플릿이 함께 실행된 행, 층화 분산 근사)
+    # → 작을수록 아직 순위가 뒤집힐 수 있음
+    def separation(self, ranking: list) -> list:
+        weights = self._weights()
+        z = []
+        for a, b in zip(ranking, ranking[1:]):
+            mean = var = 0.0
+            for c, w in weights.items():
+                diffs = [sum(self.scores[r][a]) - sum(self.scores[r][b])
+                         for r in self.observed[c] if a in self.scores[r] and b in self.scores[r]]
+                if not diffs:
+                    continue
+                m = sum(diffs) / len(diffs)
+                mean += w * m
+                if len(diffs) > 1:
+                    var += w ** 2 * sum((d - m) ** 2 for d in diffs) / (len(diffs) - 1) / len(diffs)
+            z.append(mean / math.sqrt(var) if var > 0 else (float("inf") if mean else 0.0))
+        return z
+
+    # 위/아래 이웃과 모두 충분히 갈린 템플릿은 고정 (1위와 2위가 갈리지 않으면 둘 다 계속 호출)
+    def _freeze(self, ranking: list, z: list):
+        if self.uniform or len(self.scores) < self.min_rows:
+            return
+        for i, tid in enumerate(ranking):
+            if tid in self.frozen:
+                continue
+            above = z[i - 1] if i > 0 else float("inf")
+            below = z[i] if i < len(z) else float("inf")
+            if min(above, below) >= self.freeze_z:
+                self.frozen[tid] = {"rank": i + 1, "rows": len(self.scores), "calls": self.calls}
+
+    # 고정된 템플릿은 고정 당시 순위 자리에 두고, 나머지 자리를 호출 중인 템플릿이 점수순으로 채움
+    # (고정 후에는 점수가 갱신되지 않으므로 점수로 다시 정렬하면 이미 갈린 순위가 흔들림)
+    def ranking(self, estimates: dict) -> list:
+        pinned = {info["rank"] - 1: tid for tid, info in self.frozen.items()}
+        live = iter(sorted(self.live(), key=lambda t: -estimates[t]["f1"]))
+        return [pinned[i] if i in pinned else next(live) for i in range(len(self.template_ids))]
+
+    def _report(self) -> dict:
+        estimates = self.estimate()
+        ranking = self.ranking(estimates)
+        previous = self.history[-1] if self.history else None
+        if previous is not None and previous["ranking"] == ranking:
+            self._stable += 1
+        else:
+            self._stable = 0
+        z = self.separation(ranking)
+        self._freeze(ranking, z)
+        report = {
+            "round": len(self.history) + 1,
+            "rows": len(self.scores),
+            "calls": self.calls,
+            "ranking": ranking,
+            "f1": {t: round(estimates[t]["f1"], 4) for t in ranking},
+            "spearman": spearman([previous["f1"][t] for t in ranking], [estimates[t]["f1"] for t in ranking])
+                        if previous is not None else float("nan"),
+            "top1_same": previous is not None and previous["ranking"][0] == ranking[0],
+            "stable_rounds": self._stable,
+            "min_z": round(min(z), 2) if z else float("inf"),
+            "live": len(self.live()),
+        }
+        self.history.append(report)
+        return report
+
+    def stable(self) -> bool:
+        return self._stable >= self.patience or len(self.live()) == 0
+
+    def exhausted(self) -> bool:
+        return not any(self.pending.values())
+
+    def summary(self) -> dict:
+        last = self.history[-1] if self.history else {}
+        return {
+            "rows": len(self.scores),
+            "pool": len(self.rows),
+            "calls": self.calls,
+            "uniform_calls": len(self.rows) * len(self.template_ids),
+            "rounds": len(self.history),
+            "stable": self.stable(),
+            "ranking": last.get("ranking", []),
+            "f1": last.get("f1", {}),
+            "frozen": self.frozen,
+            "clusters": {c: len(ids) for c, ids in sorted(self.observed.items()) if ids},
+        }
+
+def format_report(report: dict, top: int = 3) -> str:
+    leaders = ", ".join(f"{t}={report['f1'][t]}" for t in report["ranking"][:top])
+    rho = "-" if math.isnan(report["spearman"]) else f"{report['spearman']:.3f}"
+    return (f"🎯 round {report['round']} | rows={report['rows']} calls={report['calls']} | {leaders} | "
+            f"ρ(prev)={rho} top1 유지={report['top1_same']} 연속 안정={report['stable_rounds']} "
+            f"min z={report['min_z']} | 호출 대상 {report['live']}개")
+
+# ▶️ 레지스트리로 실행 (이미 결과가 있는 셀은 호출하지 않음 → 호출 수에서도 제외)
+# budget: 총 호출 수 상한 (None이면 순위가 안정되거나 행이 바닥날 때까지)
+async def run_active(train_path: str, templates: list, sample_size: int = SAMPLE_SIZE, budget: int = None,
+                     seed_size: int = 100, batch_size: int = 100, patience: int = 3,
+                     registry_path: str = REGISTRY_PATH, ids=None, out_path: str = ACTIVE_RESULTS_PATH,
+                     uniform: bool = False) -> dict:
+    from optimizer.async_runner import load_train_csv, write_results
+    from optimizer.dataset_cache import load_dataset
+    from optimizer.registry import ExperimentRegistry, fill_missing
+
+    data = load_train_csv(train_path, sample_size, seed=0, ids=ids)
+    dataset_hash = load_dataset(train_path).header["source_sha256"]
+    evaluator = ActiveEvaluator(data, [t["id"] for t in templates], seed_size, batch_size,
+                                patience=patience, uniform=uniform)
+
+    registry = ExperimentRegistry(registry_path)
+    collected = []
+    try:
+        while not evaluator.stable():
+            limit = None
+            live = set(evaluator.live())
+            round_templates = [t for t in templates if t["id"] in live]
+            if budget is not None:
+                limit = (budget - evaluator.calls) // len(round_templates)
+                if limit <= 0:
+                    break
+            batch = evaluator.next_batch(limit)
+            if not batch:
+                break
+            calls = len(registry.plan(round_templates, dataset_hash, batch))
+            failed = await fill_missing(registry, round_templates, dataset_hash, batch,
+                                        desc=f"🎯 round {len(evaluator.history) + 1}")
+            results = registry.collect(round_templates, dataset_hash, batch)
+            print(format_report(evaluator.observe(results + failed, calls)))
+            collected.extend(results + failed)
+    finally:
+        registry.close()
+
+    write_results(collected, out_path)
+    return evaluator.summary()
+
+# 🧪 모든 (템플릿, 행) 결과가 이미 있는 파일로 오프라인 재현 → 호출 없이 능동/균등 추출 비교
+def simulate(results: list, template_ids: list = None, seed_size: int = 100, batch_size: int = 100,
+             patience: int = 3, uniform: bool = False, seed: int = 0) -> ActiveEvaluator:
+    by_cell = {(r["template_id"], r["id"]): r for r in results}
+    template_ids = template_ids or sorted({r["template_id"] for r in results})
+    rows = {}
+    for r in results:
+        if all((tid, r["id"]) in by_cell for tid in template_ids):
+            rows[r["id"]] = {"id": r["id"], "input": r["input"], "target": r.get("target")}
+
+    evaluator = ActiveEvaluator(list(rows.values()), template_ids, seed_size, batch_size,
+                                patience=patience, uniform=uniform, seed=seed)
+    while not evaluator.exhausted() and evaluator.live():
+        live = evaluator.live()
+        batch = evaluator.next_batch()
+        evaluator.observe([by_cell[(tid, row["id"])] for row in batch for tid in live], len(batch) * len(live))
+    return evaluator
+
+# 전체 행 단순 평균 F1 순위 (simulate 비교 기준)
+def full_ranking(results: list) -> list:
+    scores = defaultdict(list)
+    for r in results:
+        if r.get("target") and is_scorable(r):
+            recall, precision = score_row(r["input"], r["target"], r["prediction"])
+            scores[r["template_id"]].append({"recall": recall, "precision": precision})
+    return sorted(scores, key=lambda t: -summarize_scores(scores[t])[2])
+
+# 순위가 최종(전체 행) 순위와 같아진 뒤 다시 바뀌지 않은 첫 라운드의 호출 수 / 안정 판정 시점
+def settle_point(history: list, truth: list = None, patience: int = 3) -> dict:
+    truth = truth or history[-1]["ranking"]
+    settled = history[-1]["calls"]
+    for report in reversed(history):
+        if report["ranking"] != truth:
+            break
+        settled = report["calls"]
+    stop = next((r for r in history if r["stable_rounds"] >= patience), history[-1])
+    return {"settled_calls": settled, "stop_calls": stop["calls"], "stop_correct": stop["ranking"] == truth}
+
+if __name__ == "__main__":
+    import argparse
+    from optimizer.records import read_records
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--results", type=str, required=True, help="모든 템플릿이 같은 행에 실행된 결과 파일")
+    parser.add_argument("--seed-rows", type=int, default=100)
+    parser.add_argument("--batch-rows", type=int, default=100)
+    parser.add_argument("--patience", type=int, default=3)
+    args = parser.parse_args()
+
+    results = [r.to_dict() for r in read_records(args.results)]
+    truth = full_ranking(results)
+    print(f"📋 전체 행 순위: {truth}")
+    for uniform in (False, True):
+        evaluator = simulate(results, None, args.seed_rows, args.batch_rows, args.patience, uniform)
+        point = settle_point(evaluator.history, truth, args.patience)
+        name = "균등(층 비례)" if uniform else "능동"
+        print(f"- {name} | 전체 {evaluator.summary()['uniform_calls']}호출 | 순위 수렴 {point['settled_calls']}호출 | "
+              f"안정 판정 {point['stop_calls']}호출 (최종 순위와 일치: {point['stop_correct']})")
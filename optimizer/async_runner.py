@@ -1,27 +1,38 @@
 # optimizer/async_runner.py
 
 import asyncio
-import aiohttp
 import random
-import csv
-import json
 from tqdm import tqdm
 from config import SAMPLE_SIZE
-from engine.api_client import call_llm
+from engine.api_client import call_llm_with_meta, STATUS_OK
+from optimizer.retry_queue import drain_retries, DEAD_LETTER_PATH
+from optimizer.dataset_cache import load_dataset
+from optimizer.cascade import flag_suspicious
+from optimizer.deadline import STATUS_DEADLINE
+from optimizer.jsonl_io import JsonlWriter
+from optimizer.records import write_records
 
-def load_train_csv(filepath: str, limit: int = 100, shuffle: bool = True):
-    with open(filepath, newline='', encoding='utf-8-sig') as f:
-        reader = list(csv.DictReader(f))
-        if shuffle:
-            random.shuffle(reader)
+def load_train_csv(filepath: str, limit: int = 100, shuffle: bool = True, seed=None, ids=None):
+    # 💾 이진 캐시로 로딩 (최초 1회 변환, 원본 해시가 바뀌면 재생성)
+    dataset = load_dataset(filepath)
+    if ids is not None:
+        # 🎯 고정 평가 부분집합 (optimizer.eval_subset) → 지정된 id만 그 순서대로
+        rows = (dataset.get(row_id) for row_id in ids)
         return [
-            {
-                "id": row["id"],
-                "input": row["err_sentence"],
-                "target": row.get("cor_sentence")
-            }
-            for row in reader[:limit]
+            {"id": row["id"], "input": row["err_sentence"], "target": row.get("cor_sentence")}
+            for row in rows if row is not None
         ]
+    indices = list(range(len(dataset)))
+    if shuffle:
+        random.Random(seed).shuffle(indices)
+    return [
+        {
+            "id": row["id"],
+            "input": row["err_sentence"],
+            "target": row.get("cor_sentence")
+        }
+        for row in dataset.view(indices[:limit])
+    ]
 
 def format_prompt(template, input_text):
     if isinstance(template, str):  # single-turn
@@ -36,34 +47,178 @@ def format_prompt(template, input_text):
     else:
         raise ValueError(f"Unsupported template format: {type(template)}")
 
+# 🔎 템플릿에 "fewshot": {"k": 5} 설정이 있으면 고정 예시 대신 유사 예시 k개를 검색해 주입
+def build_messages(template_obj, input_text):
+    messages = format_prompt(template_obj["template"], input_text)
+    fewshot = template_obj.get("fewshot")
+    if not fewshot:
+        return messages
+
+    from prompts.fewshot_index import get_fewshot_index, inject_examples, strip_fixed_examples, FEWSHOT_INDEX_PATH
+
+    index = get_fewshot_index(fewshot.get("index_path", FEWSHOT_INDEX_PATH))
+    if fewshot.get("strip_fixed", True):
+        messages = [{**m, "content": strip_fixed_examples(m["content"])} for m in messages]
+    return inject_examples(messages, index.query(input_text, fewshot.get("k", 5)))
+
 async def run_single(template_obj, row):
-    messages = format_prompt(template_obj["template"], row["input"])
+    if template_obj.get("type") == "cascade":
+        return await run_cascade(template_obj, row)
+
+    messages = build_messages(template_obj, row["input"])
     await asyncio.sleep(0.3)  # 속도 조절
-    result = await call_llm(messages)
+    result, status, meta = await call_llm_with_meta(messages, row["input"])
 
     return {
         "template_id": template_obj["id"],
         "id": row["id"],
         "input": row["input"],
         "prediction": result,
-        "target": row.get("target")
+        "target": row.get("target"),
+        "status": status,
+        **meta  # 스트리밍 모드면 ttft / latency / finish_reason / max_tokens
+    }
+
+# 🪜 캐스케이드: 짧은 템플릿 먼저, 의심스러운 출력만 긴 템플릿으로 재요청
+async def run_cascade(template_obj, row):
+    short_template, full_template = template_obj["stages"]
+    first = await run_single(short_template, row)
+    flags = flag_suspicious(row["input"], first["prediction"]) if first["status"] == STATUS_OK else ["failed"]
+
+    final, stage = first, 1
+    if flags:
+        final, stage = await run_single(full_template, row), 2
+
+    return {**final, "template_id": template_obj["id"], "stage": stage, "flags": flags}
+
+# 🔁 호출 실패 건은 본 실행 후 재시도 큐로 (끝까지 실패하면 dead-letter + status="failed")
+# - 마감 모드(planner)에서는 마감으로 건너뛴 행은 재시도하지 않고, 재시도 자체도 남은 시간 안에서만
+async def retry_failed(results, templates, planner=None):
+    # 모든 반환 경로에서 (성공분 + 마감 건너뜀 + 복구분 + 최종 실패분) 순서 유지 (run_rows가 앞부분을 성공분으로 가정)
+    ok = [r for r in results if r.get("status") == STATUS_OK]
+    skipped = [r for r in results if r.get("status") == STATUS_DEADLINE]
+    failed = [r for r in results if r.get("status") not in (STATUS_OK, STATUS_DEADLINE)]
+    if not failed or (planner is not None and planner.expired()):
+        return ok + skipped + failed
+
+    templates_by_id = {t["id"]: t for t in templates}
+
+    async def retry(item):
+        row = {"id": item["id"], "input": item["input"], "target": item.get("target")}
+        return await run_single(templates_by_id[item["template_id"]], row)
+
+    drain = drain_retries(failed, retry)
+    if planner is None:
+        recovered, dead = await drain
+    else:
+        try:
+            recovered, dead = await asyncio.wait_for(drain, planner.time_left())
+        except asyncio.TimeoutError:
+            recovered, dead = [], failed
+    return ok + skipped + recovered + dead
+
+# ⏰ 마감 모드에서 디스패치하지 못했거나 시간 안에 끝나지 않은 행: 원문을 예측으로 두고 status로 표시
+# (evaluator는 status가 ok가 아닌 행을 채점하지 않음)
+def deadline_result(template_obj, row):
+    return {
+        "template_id": template_obj["id"],
+        "id": row["id"],
+        "input": row["input"],
+        "prediction": row["input"],
+        "target": row.get("target"),
+        "status": STATUS_DEADLINE,
     }
 
-async def run_all(train_path="data/test_with_answer.csv", out_path="data/results.jsonl", limit=100, templates=None):
-    data = load_train_csv(train_path, limit)
+# ⏹️ stopper(optimizer.significance.SequentialStopper)가 있으면 디스패치 직전에 열세 확정 여부 확인
+# ⏰ planner(optimizer.deadline.DeadlinePlanner)가 있으면 마감이 지난 뒤에는 디스패치하지 않고, 진행 중인 호출도 마감에서 끊음
+async def run_guarded(template, row, stopper, dispatch, planner=None):
+    async with dispatch:
+        if stopper is not None and stopper.is_dominated(template["id"]):
+            return None
+        if planner is None:
+            result = await run_single(template, row)
+        else:
+            if planner.expired():
+                return deadline_result(template, row)
+            try:
+                result = await asyncio.wait_for(run_single(template, row), planner.time_left())
+            except asyncio.TimeoutError:
+                return deadline_result(template, row)
+            planner.observe()
+    if stopper is not None:
+        stopper.observe(result)
+    return result
+
+# sink(JsonlWriter)가 있으면 성공한 결과를 완료 즉시 writer 스레드로 넘기고, 재시도분은 마지막에 넘김
+# cells가 주어지면 (template, row) 전체 조합 대신 그 쌍만 실행 (optimizer.registry 플래너)
+# planner가 있으면 행 우선 순서(행마다 모든 템플릿)로 디스패치 → 마감 시 템플릿별 완료 행 수가 고르게 남음
+async def run_rows(data, templates, desc=None, position=0, stopper=None, sink=None, cells=None, planner=None):
     results = []
+    if cells is None:
+        cells = [(template, row) for row in data for template in (templates or [])]
 
-    tasks = [
-        run_single(template, row)
-        for row in data
-        for template in (templates or [])
-    ]
+    if stopper is None and planner is None:
+        tasks = [run_single(template, row) for template, row in cells]
+    else:
+        from engine.api_client import get_api_keys, DEFAULT_CONCURRENCY
 
-    for f in tqdm(asyncio.as_completed(tasks), total=len(tasks)):
+        # 호출 가능한 만큼만 동시에 디스패치 → 대기 중인 작업은 조기 종료/마감 판정을 반영
+        dispatch = asyncio.Semaphore(max(1, len(get_api_keys())) * DEFAULT_CONCURRENCY)
+        if planner is not None:
+            planner.add_work(len(cells))
+        tasks = [run_guarded(template, row, stopper, dispatch, planner) for template, row in cells]
+
+    for f in tqdm(asyncio.as_completed(tasks), total=len(tasks), desc=desc, position=position):
         result = await f
         if result:
             results.append(result)
+            if sink is not None and result.get("status") == STATUS_OK:
+                sink.put(result)
+
+    final = await retry_failed(results, templates or [], planner)
+    if sink is not None:
+        # 성공분은 이미 기록됨 → 나머지(마감 건너뜀, 재시도 결과)만 명시적으로 골라서 기록
+        emitted = {id(r) for r in results if r.get("status") == STATUS_OK}
+        sink.put_many([r for r in final if id(r) not in emitted])
+    return final
+
+def write_results(results, out_path):
+    write_records(results, out_path)
+
+async def run_from_queue(queue_path, data, templates, batch_size=32):
+    from optimizer.work_queue import WorkQueue, drain_queue, job_key
+
+    templates_by_id = {t["id"]: t for t in (templates or [])}
+    # 같은 샘플을 처리하는 러너끼리만 작업 공유 (이전 실행이 남긴 다른 샘플의 결과는 섞이지 않음)
+    queue = WorkQueue(queue_path, job_id=job_key(row["id"] for row in data))
+    try:
+        queue.enqueue(
+            (template["id"], row["id"], row)
+            for row in data
+            for template in templates_by_id.values()
+        )
+
+        async def handler(template_id, row_id, row):
+            return await run_single(templates_by_id[template_id], row)
+
+        # 재시도는 큐의 시도 횟수로만 (retry_failed를 다시 돌리면 러너마다 작업 전체의 실패 건을 또 호출)
+        await drain_queue(queue, handler, batch_size=batch_size, template_ids=list(templates_by_id),
+                          dead_letter_path=DEAD_LETTER_PATH)
+        return queue.results(set(templates_by_id))
+    finally:
+        queue.close()
 
-    with open(out_path, "w", encoding="utf-8") as fout:
-        for r in results:
-            fout.write(json.dumps(r, ensure_ascii=False) + "\n")
\ No newline at end of file
+async def run_all(train_path="data/test_with_answer.csv", out_path="data/results.jsonl", limit=100, templates=None,
+                  queue_path=None, ids=None, stopper=None, planner=None):
+    # 큐 모드에서는 모든 러너가 같은 샘플을 등록하도록 고정 시드 사용
+    data = load_train_csv(train_path, limit, seed=0 if queue_path else None, ids=ids)
+    # 🧵 결과 직렬화/파일 쓰기는 writer 스레드에서 (디스패치 루프와 경쟁하지 않도록)
+    writer = JsonlWriter(out_path)
+    try:
+        if queue_path:
+            # 🗃️ 공유 SQLite 큐에서 (template_id, row id) 작업을 나눠 처리
+            writer.put_many(await run_from_queue(queue_path, data, templates))
+        else:
+            await run_rows(data, templates, stopper=stopper, sink=writer, planner=planner)
+    finally:
+        await writer.aclose()
\ No newline at end of file
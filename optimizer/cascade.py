@@ -0,0 +1,34 @@
+# optimizer/cascade.py
+
+import re
+from config import FORBIDDEN_PHRASES
+
+# 🚩 1단계 출력에 대한 저비용 로컬 검사 → 하나라도 걸리면 긴 템플릿으로 재요청
+TERMINAL_CHARS = (".", "?", "!", "…", "~")
+META_PREFIX = re.compile(r"^\s*(결과|수정|교정|출력|답변|정답|수정된\s*문장|교정된\s*문장|교정\s*결과)\s*[:：]")
+MIN_LENGTH_RATIO = 0.7
+MAX_LENGTH_RATIO = 1.4
+
+def _compact_len(text: str) -> int:
+    return len("".join(text.split()))
+
+def flag_suspicious(input_text: str, output: str) -> list:
+    if not output or not output.strip():
+        return ["empty"]
+
+    flags = []
+    stripped = output.strip()
+    if not stripped.endswith(TERMINAL_CHARS):
+        flags.append("no_terminal_punct")
+    if "\n" in stripped:
+        flags.append("multi_line")
+    if META_PREFIX.match(stripped):
+        flags.append("meta_prefix")
+
+    ratio = _compact_len(stripped) / max(1, _compact_len(input_text))
+    if not MIN_LENGTH_RATIO <= ratio <= MAX_LENGTH_RATIO:
+        flags.append("length_ratio")
+
+    if any(p in stripped and p not in input_text for p in FORBIDDEN_PHRASES):
+        flags.append("forbidden_phrase")
+    return flags
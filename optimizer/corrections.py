@@ -0,0 +1,149 @@
+# optimizer/corrections.py
+# 사용 예:
+#     async for row_id, prediction in stream_corrections(rows, "best_single_05"):
+#         ...
+
+import asyncio
+from collections import OrderedDict
+from engine.api_client import get_api_keys, DEFAULT_CONCURRENCY, STATUS_OK
+from optimizer.async_runner import run_single
+from optimizer.retry_queue import drain_retries
+
+# 🌊 라이브러리용 스트리밍 교정 API (CSV 없이 ETL 파이프라인에 바로 끼워 쓰기)
+# - rows: 동기/비동기 iterable 모두 가능. 항목은 dict({"id", "input"} 또는 {"id", "err_sentence"}),
+#   (id, 문장) 튜플, 문자열(순번이 id) 중 하나
+# - 입력/출력 큐 크기를 제한해 역압 적용 → 소비가 느리면 워커가 멈추고, 워커가 멈추면 rows를 더 읽지 않음
+# - 완료되는 순서대로 (row_id, prediction) 반환 (입력 순서 보장 없음)
+# - 호출은 run_single 그대로 (키 풀 라운드로빈, 429 백오프, 캐스케이드, 스트리밍 모드 공용)
+# - 같은 (템플릿, 문장)은 LRU 캐시 재사용 + 처리 중이면 같은 결과를 기다림
+# - 실패 건은 retry_queue로 짧게 재시도(기본 2회, 0.5s→1s), 끝까지 실패하면 원문을 그대로 반환
+#   (with_status=True면 상태도 함께). 출력은 하지 않고, dead-letter 파일은 경로를 줄 때만 기록
+_DONE = object()
+
+async def _aiter(rows):
+    if hasattr(rows, "__aiter__"):
+        async for item in rows:
+            yield item
+    else:
+        for item in rows:
+            yield item
+
+def _as_row(item, index: int) -> dict:
+    if isinstance(item, str):
+        return {"id": index, "input": item, "target": None}
+    if isinstance(item, dict):
+        return {
+            "id": item.get("id", index),
+            "input": item["input"] if "input" in item else item["err_sentence"],
+            "target": item.get("target", item.get("cor_sentence")),
+        }
+    row_id, text = item
+    return {"id": row_id, "input": text, "target": None}
+
+def resolve_template(template) -> dict:
+    if isinstance(template, dict):
+        return template
+    from engine.service import load_templates
+
+    templates = load_templates()
+    if template not in templates:
+        raise KeyError(template)
+    return templates[template]
+
+async def stream_corrections(rows, template, concurrency: int = None, buffer: int = None,
+                             cache_size: int = 10000, retry: bool = True, with_status: bool = False,
+                             retry_rounds: int = 2, retry_delay: float = 0.5, dead_letter_path: str = None):
+    template_obj = resolve_template(template)
+    workers = concurrency or max(1, len(get_api_keys())) * DEFAULT_CONCURRENCY
+    buffer = buffer or workers * 2
+    inbox = asyncio.Queue(buffer)
+    outbox = asyncio.Queue(buffer)
+    cache = OrderedDict()
+    inflight = {}
+
+    async def correct(row) -> tuple:
+        result = await run_single(template_obj, row)
+        if result["status"] != STATUS_OK and retry:
+            recovered, dead = await drain_retries(
+                [result], lambda _: run_single(template_obj, row), rounds=retry_rounds, base_delay=retry_delay,
+                dead_letter_path=dead_letter_path, verbose=False,
+            )
+            result = (recovered or dead)[0]
+        return result["prediction"], result["status"]
+
+    async def cached(row) -> tuple:
+        key = row["input"]
+        if key in cache:
+            cache.move_to_end(key)
+            return cache[key], STATUS_OK
+        future = inflight.get(key)
+        if future is not None:
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        inflight[key] = future
+        try:
+            outcome = await correct(row)
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # 기다리는 쪽이 없어도 경고가 나지 않도록 회수
+            raise
+        finally:
+            inflight.pop(key, None)
+        future.set_result(outcome)
+        if outcome[1] == STATUS_OK and cache_size:
+            cache[key] = outcome[0]
+            if len(cache) > cache_size:
+                cache.popitem(last=False)
+        return outcome
+
+    async def feed():
+        try:
+            index = 0
+            async for item in _aiter(rows):
+                await inbox.put(_as_row(item, index))
+                index += 1
+        except Exception as e:
+            await outbox.put(e)  # 입력 쪽 오류는 소비자에게 그대로 전달
+        finally:
+            for _ in range(workers):
+                await inbox.put(_DONE)
+
+    async def work():
+        try:
+            while True:
+                row = await inbox.get()
+                if row is _DONE:
+                    break
+                pred, status = await cached(row)
+                if status != STATUS_OK:
+                    pred = row["input"]
+                await outbox.put((row["id"], pred, status) if with_status else (row["id"], pred))
+        except Exception as e:
+            await outbox.put(e)
+        finally:
+            await outbox.put(_DONE)
+
+    tasks = [asyncio.create_task(feed())] + [asyncio.create_task(work()) for _ in range(workers)]
+    try:
+        finished = 0
+        while finished < workers:
+            item = await outbox.get()
+            if item is _DONE:
+                finished += 1
+            elif isinstance(item, Exception):
+                raise item
+            else:
+                yield item
+    finally:
+        # 소비자가 중간에 빠져나가도(break, 예외) 남은 작업은 정리
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+# 📦 전체 결과를 {row_id: prediction} 으로 모으는 편의 함수 (with_status=True면 {row_id: (prediction, status)})
+async def correct_all(rows, template, **kwargs) -> dict:
+    results = {}
+    async for item in stream_corrections(rows, template, **kwargs):
+        results[item[0]] = item[1] if len(item) == 2 else item[1:]
+    return results
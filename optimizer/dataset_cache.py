@@ -0,0 +1,154 @@
+# optimizer/dataset_cache.py
+
+import csv
+import hashlib
+import json
+import mmap
+import os
+import random
+import struct
+from array import array
+
+# 💾 train/test CSV 이진 캐시
+# - 최초 1회 CSV를 파싱해 (오프셋 인덱스 + UTF-8 문자열 blob) 형태로 저장
+# - 이후에는 mmap으로 열어 행 단위 O(1) 접근, 샘플링은 인덱스만 다룸
+# - 원본 CSV의 해시가 바뀌면 자동으로 다시 생성
+# 파일 구조: MAGIC | header_len(u64) | header(JSON) | offsets(u64 × n_rows·n_cols + 1) | blob
+MAGIC = b"MXDSET01"
+CACHE_DIR = "data/.cache"
+
+def file_sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+# 이름이 같은 다른 경로의 CSV끼리 캐시가 겹치지 않도록 절대 경로 해시를 붙임
+def cache_path_for(csv_path: str, cache_dir: str = CACHE_DIR) -> str:
+    path_tag = hashlib.sha1(os.path.abspath(csv_path).encode("utf-8")).hexdigest()[:8]
+    return os.path.join(cache_dir, f"{os.path.basename(csv_path)}.{path_tag}.bin")
+
+def build_cache(csv_path: str, cache_path: str, source_hash: str = None):
+    offsets = array("Q", [0])
+    blob = bytearray()
+    with open(csv_path, newline="", encoding="utf-8-sig") as f:
+        reader = csv.reader(f)
+        columns = next(reader)
+        n_rows = 0
+        for row in reader:
+            row = (row + [""] * len(columns))[:len(columns)]
+            for cell in row:
+                blob += cell.encode("utf-8")
+                offsets.append(len(blob))
+            n_rows += 1
+
+    stat = os.stat(csv_path)
+    header = json.dumps({
+        "source_sha256": source_hash or file_sha256(csv_path),
+        "source_size": stat.st_size,
+        "source_mtime": stat.st_mtime,
+        "columns": columns,
+        "n_rows": n_rows,
+    }, ensure_ascii=False).encode("utf-8")
+    header += b" " * (-len(header) % 8)
+
+    os.makedirs(os.path.dirname(cache_path) or ".", exist_ok=True)
+    tmp_path = cache_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<Q", len(header)))
+        f.write(header)
+        f.write(offsets.tobytes())
+        f.write(blob)
+    os.replace(tmp_path, cache_path)  # 원자적 교체 → 동시에 읽는 프로세스 보호
+
+class DatasetCache:
+    def __init__(self, cache_path: str):
+        with open(cache_path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mm[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"Not a dataset cache file: {cache_path}")
+        (header_len,) = struct.unpack_from("<Q", self._mm, len(MAGIC))
+        pos = len(MAGIC) + 8
+        self.header = json.loads(bytes(self._mm[pos:pos + header_len]))
+        pos += header_len
+
+        self.columns = self.header["columns"]
+        self.n_rows = self.header["n_rows"]
+        n_cells = self.n_rows * len(self.columns)
+        self._offsets = memoryview(self._mm)[pos:pos + 8 * (n_cells + 1)].cast("Q")
+        self._blob_start = pos + 8 * (n_cells + 1)
+        self._col_index = {c: i for i, c in enumerate(self.columns)}
+        self._row_by_id = None
+
+    def __len__(self):
+        return self.n_rows
+
+    def cell(self, i: int, column: str) -> str:
+        k = i * len(self.columns) + self._col_index[column]
+        start, end = self._offsets[k], self._offsets[k + 1]
+        return self._mm[self._blob_start + start:self._blob_start + end].decode("utf-8")
+
+    def row(self, i: int) -> dict:
+        return {c: self.cell(i, c) for c in self.columns}
+
+    # 🔑 id → 행 (id 인덱스는 첫 조회 시 한 번만 생성)
+    def get(self, row_id: str) -> dict:
+        if self._row_by_id is None:
+            self._row_by_id = {self.cell(i, "id"): i for i in range(self.n_rows)}
+        i = self._row_by_id.get(row_id)
+        return None if i is None else self.row(i)
+
+    def view(self, indices=None):
+        return DatasetView(self, range(self.n_rows) if indices is None else indices)
+
+    # 🎲 샘플링은 인덱스만 섞고, 행 문자열은 접근할 때 디코딩
+    def sample(self, n: int, seed=None):
+        indices = list(range(self.n_rows))
+        random.Random(seed).shuffle(indices)
+        return self.view(indices[:n])
+
+class DatasetView:
+    def __init__(self, cache: DatasetCache, indices):
+        self.cache = cache
+        self.indices = indices
+
+    def __len__(self):
+        return len(self.indices)
+
+    def __getitem__(self, k):
+        return self.cache.row(self.indices[k])
+
+    def __iter__(self):
+        return (self.cache.row(i) for i in self.indices)
+
+    def column(self, name: str) -> list:
+        return [self.cache.cell(i, name) for i in self.indices]
+
+    # pandas.DataFrame(view.to_columns()) 형태로 사용
+    def to_columns(self) -> dict:
+        return {c: self.column(c) for c in self.cache.columns}
+
+# ✅ 캐시가 유효하면 열고, 원본이 바뀌었으면 다시 생성
+def load_dataset(csv_path: str, cache_dir: str = CACHE_DIR) -> DatasetCache:
+    cache_path = cache_path_for(csv_path, cache_dir)
+    if os.path.exists(cache_path):
+        try:
+            cache = DatasetCache(cache_path)
+        except ValueError:
+            cache = None
+        if cache is not None:
+            stat = os.stat(csv_path)
+            header = cache.header
+            # 크기/수정 시각이 같으면 해시 계산 생략, 다르면 해시로 최종 판단
+            if header["source_size"] == stat.st_size and header["source_mtime"] == stat.st_mtime:
+                return cache
+            source_hash = file_sha256(csv_path)
+            if header["source_sha256"] == source_hash:
+                return cache
+            build_cache(csv_path, cache_path, source_hash)
+            return DatasetCache(cache_path)
+
+    build_cache(csv_path, cache_path)
+    return DatasetCache(cache_path)
@@ -0,0 +1,128 @@
+# optimizer/deadline.py
+
+import re
+import time
+from collections import deque
+from datetime import datetime, timedelta
+
+# ⏰ 마감 시각 기반 실행 (--deadline)
+# - 최근 window초 동안의 완료 속도로 남은 행의 완료 예상 시간을 추정
+# - 예상이 남은 시간을 넘으면 사다리(ladder)의 다음(더 싼) 템플릿으로 전환 (되돌아가지 않음)
+# - 마감(reserve 만큼 앞당김)이 지나면 새 행을 디스패치하지 않고, 미완료 행은 STATUS_DEADLINE + 원문으로 기록
+STATUS_DEADLINE = "deadline"
+DURATION_PATTERN = re.compile(r"^(?:(\d+(?:\.\d+)?)h)?(?:(\d+(?:\.\d+)?)m)?(?:(\d+(?:\.\d+)?)s?)?$")
+
+# "5400", "90m", "1h30m", "45s" → 지금부터의 초 / "23:30", "2026-10-20T09:00(+09:00)" → 그 시각까지 남은 초
+# - 시각은 로컬 시간대 기준 aware datetime으로 맞춰 비교 (오프셋이 붙은 ISO 시각도 허용)
+# - 이미 지났거나 0 이하인 마감은 ValueError
+def parse_deadline(value: str, now: datetime = None) -> float:
+    now = now or datetime.now()
+    if now.tzinfo is None:
+        now = now.astimezone()
+    value = value.strip()
+    match = DURATION_PATTERN.match(value.lower())
+    if value and match and any(match.groups()):
+        h, m, s = (float(g) if g else 0.0 for g in match.groups())
+        seconds = h * 3600 + m * 60 + s
+        if seconds <= 0:
+            raise ValueError(f"deadline must be positive: {value!r}")
+        return seconds
+
+    if re.match(r"^\d{1,2}:\d{2}$", value):
+        hour, minute = map(int, value.split(":"))
+        target = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+        if target <= now:
+            target += timedelta(days=1)  # 이미 지난 시각이면 다음 날
+    else:
+        try:
+            target = datetime.fromisoformat(value).astimezone()
+        except ValueError:
+            raise ValueError(f"invalid deadline: {value!r} (예: 5400, 90m, 1h30m, 23:30, 2026-10-20T09:00)")
+    seconds = (target - now).total_seconds()
+    if seconds <= 0:
+        raise ValueError(f"deadline already passed: {value!r} ({target.isoformat(timespec='minutes')})")
+    return seconds
+
+# 파싱 시점에 고정한 절대 마감 (time.monotonic 기준)
+# → 데이터 로딩/토큰 수 확인 등 planner를 만들기 전 준비 시간도 마감 안에 포함
+def deadline_end(value: str, now: datetime = None) -> float:
+    return time.monotonic() + parse_deadline(value, now)
+
+# seconds: 지금부터 남은 초 / end: deadline_end()로 미리 고정한 마감 (주어지면 seconds 대신 사용)
+class DeadlinePlanner:
+    def __init__(self, seconds: float = None, total: int = 0, ladder: list = None, reserve: float = None,
+                 window: float = 120.0, min_samples: int = 20, end: float = None):
+        self.start = time.monotonic()
+        self.end = end if end is not None else self.start + seconds
+        seconds = max(0.0, self.end - self.start)
+        # 결과를 기록/정리할 시간은 남겨 둠
+        self.reserve = min(30.0, seconds * 0.05) if reserve is None else reserve
+        self.total = total
+        self.done = 0
+        self.ladder = list(ladder or [None])
+        self.level = 0
+        self.window = window
+        self.min_samples = min_samples
+        self.switches = []
+        self._times = deque()
+        self._window_start = self.start
+        self._since_switch = 0
+
+    def add_work(self, n: int):
+        self.total += n
+
+    def time_left(self) -> float:
+        return max(0.0, self.end - self.reserve - time.monotonic())
+
+    def expired(self) -> bool:
+        return self.time_left() <= 0
+
+    def observe(self, n: int = 1):
+        self.done += n
+        self._since_switch += n
+        self._times.extend([time.monotonic()] * n)
+
+    def throughput(self) -> float:
+        now = time.monotonic()
+        while self._times and self._times[0] < now - self.window:
+            self._times.popleft()
+        span = min(self.window, now - self._window_start)
+        return len(self._times) / span if span > 0 else 0.0
+
+    def projected_seconds(self) -> float:
+        rate = self.throughput()
+        remaining = max(0, self.total - self.done)
+        return remaining / rate if rate else float("inf")
+
+    # 표본이 충분할 때만 판단 (시작 직후/전환 직후의 속도는 믿지 않음)
+    def on_track(self) -> bool:
+        if self._since_switch < self.min_samples:
+            return True
+        return self.projected_seconds() <= self.time_left()
+
+    # 현재 써야 할 템플릿 (밀리면 한 단계 싼 쪽으로 전환하고 속도 추정을 새로 시작)
+    def current(self):
+        if self.level < len(self.ladder) - 1 and not self.on_track():
+            self.switches.append({
+                "elapsed": round(time.monotonic() - self.start, 1),
+                "from": self.ladder[self.level],
+                "to": self.ladder[self.level + 1],
+                "done": self.done,
+                "projected": round(self.projected_seconds(), 1),
+                "time_left": round(self.time_left(), 1),
+            })
+            self.level += 1
+            self._times.clear()
+            self._window_start = time.monotonic()
+            self._since_switch = 0
+        return self.ladder[self.level]
+
+    def summary(self) -> dict:
+        return {
+            "done": self.done,
+            "total": self.total,
+            "elapsed": round(time.monotonic() - self.start, 1),
+            "time_left": round(self.time_left(), 1),
+            "template": self.ladder[self.level],
+            "switches": self.switches,
+        }
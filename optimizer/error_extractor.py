@@ -1,14 +1,10 @@
-import json
+from optimizer.records import iter_records, write_records
 
 def extract_failed_cases(input_path="data/results.jsonl", output_path="data/errors.jsonl"):
-    with open(input_path, encoding="utf-8") as f:
-        lines = [json.loads(line) for line in f]
-
     failed = [
-        item for item in lines
-        if item.get("target") and item.get("prediction") != item.get("target")
+        item for item in iter_records(input_path)
+        if item.target and item.get("status", "ok") == "ok"
+        and item.prediction != item.target
     ]
 
-    with open(output_path, "w", encoding="utf-8") as f:
-        for item in failed:
-            f.write(json.dumps(item, ensure_ascii=False) + "\n")
+    write_records(failed, output_path)
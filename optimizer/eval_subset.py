@@ -0,0 +1,150 @@
+# optimizer/eval_subset.py
+
+import json
+import random
+from collections import Counter, defaultdict
+from optimizer.dataset_cache import load_dataset
+from optimizer.evaluator import find_differences_with_offsets, load_row_scores, summarize_scores
+from optimizer.substitution_index import classify_substitution
+
+# 🎯 대표 평가 부분집합
+# - train.csv 전체를 (주요 오류 유형, diff 개수, 문장 길이)로 층화
+# - 층별 비율대로 고정 시드 추출 → 매번 같은 소수 행으로 템플릿 스크리닝
+# - 기존 결과로 "부분집합 점수 순위 ↔ 전체 점수 순위" 상관을 보고해 충실도 확인
+EVAL_SUBSET_PATH = "data/eval_subset.json"
+NO_ERROR = "무오류"
+
+def _bucket(value: int, edges: tuple) -> str:
+    for edge in edges:
+        if value <= edge:
+            return f"≤{edge}"
+    return f">{edges[-1]}"
+
+def row_stratum(err: str, cor: str) -> tuple:
+    diffs = find_differences_with_offsets(err, cor)
+    if diffs:
+        types = Counter(classify_substitution(d[0], d[1]) for d in diffs)
+        error_type = types.most_common(1)[0][0]
+    else:
+        error_type = NO_ERROR
+    return error_type, _bucket(len(diffs), (0, 1, 2, 4)), _bucket(len(err.split()), (5, 10, 20))
+
+# 최대 잉여 방식 비례 배분 (합계가 정확히 size가 되도록)
+def allocate(strata_sizes: dict, size: int) -> dict:
+    total = sum(strata_sizes.values())
+    quotas = {k: size * n / total for k, n in strata_sizes.items()}
+    alloc = {k: min(int(q), strata_sizes[k]) for k, q in quotas.items()}
+    remainder = size - sum(alloc.values())
+    for k in sorted(quotas, key=lambda k: (quotas[k] - int(quotas[k]), k), reverse=True):
+        if remainder <= 0:
+            break
+        if alloc[k] < strata_sizes[k]:
+            alloc[k] += 1
+            remainder -= 1
+    return alloc
+
+def select_subset(train_path: str = "data/train.csv", size: int = 300, seed: int = 42) -> dict:
+    dataset = load_dataset(train_path)
+    view = dataset.view()
+    ids, errs, cors = view.column("id"), view.column("err_sentence"), view.column("cor_sentence")
+
+    groups = defaultdict(list)
+    for row_id, err, cor in zip(ids, errs, cors):
+        groups[row_stratum(err, cor)].append(row_id)
+
+    rng = random.Random(seed)
+    alloc = allocate({k: len(v) for k, v in groups.items()}, min(size, len(ids)))
+    chosen, strata = [], {}
+    for key in sorted(groups):
+        picked = rng.sample(groups[key], alloc[key])
+        chosen.extend(picked)
+        strata.update({row_id: "|".join(key) for row_id in picked})
+
+    return {
+        "train_path": train_path,
+        "source_sha256": dataset.header["source_sha256"],
+        "seed": seed,
+        "size": len(chosen),
+        "ids": chosen,
+        "strata": strata,
+    }
+
+def save_subset(subset: dict, path: str = EVAL_SUBSET_PATH):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(subset, f, ensure_ascii=False, indent=2)
+
+def load_subset_ids(path: str = EVAL_SUBSET_PATH) -> list:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)["ids"]
+
+# 📈 평균 순위 기반 스피어만 상관
+def _ranks(values: list) -> list:
+    order = sorted(range(len(values)), key=lambda i: values[i])
+    ranks = [0.0] * len(values)
+    i = 0
+    while i < len(order):
+        j = i
+        while j + 1 < len(order) and values[order[j + 1]] == values[order[i]]:
+            j += 1
+        for k in range(i, j + 1):
+            ranks[order[k]] = (i + j) / 2 + 1
+        i = j + 1
+    return ranks
+
+def spearman(xs: list, ys: list) -> float:
+    if len(xs) < 2:
+        return float("nan")
+    rx, ry = _ranks(xs), _ranks(ys)
+    mx, my = sum(rx) / len(rx), sum(ry) / len(ry)
+    cov = sum((a - mx) * (b - my) for a, b in zip(rx, ry))
+    var = (sum((a - mx) ** 2 for a in rx) * sum((b - my) ** 2 for b in ry)) ** 0.5
+    return cov / var if var else float("nan")
+
+# 🔬 기존 결과 파일로 부분집합 충실도 측정
+def subset_fidelity(results_path: str, subset_ids) -> dict:
+    subset_ids = set(subset_ids)
+    scores = load_row_scores(results_path)
+
+    rows = []
+    for tid, results in scores.items():
+        sub = [r for r in results if r["id"] in subset_ids]
+        if not sub:
+            continue
+        rows.append({
+            "template_id": tid,
+            "full_f1": round(summarize_scores(results)[2], 4),
+            "subset_f1": round(summarize_scores(sub)[2], 4),
+            "full_count": len(results),
+            "subset_count": len(sub),
+        })
+
+    def best(key):
+        return max(rows, key=lambda r: r[key])["template_id"] if rows else None
+
+    return {
+        "templates": rows,
+        "spearman": spearman([r["full_f1"] for r in rows], [r["subset_f1"] for r in rows]),
+        "top1_agree": best("full_f1") == best("subset_f1"),
+    }
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--train", type=str, default="data/train.csv")
+    parser.add_argument("--size", type=int, default=300)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", type=str, default=EVAL_SUBSET_PATH)
+    parser.add_argument("--results", type=str, default=None, help="충실도 측정에 쓸 기존 결과 파일")
+    args = parser.parse_args()
+
+    subset = select_subset(args.train, args.size, args.seed)
+    save_subset(subset, args.out)
+    print(f"✅ {subset['size']}행 / {len(set(subset['strata'].values()))}개 층 → {args.out}")
+
+    if args.results:
+        report = subset_fidelity(args.results, subset["ids"])
+        for r in report["templates"]:
+            print(f"- {r['template_id']} | full f1={r['full_f1']} ({r['full_count']}) | "
+                  f"subset f1={r['subset_f1']} ({r['subset_count']})")
+        print(f"📈 Spearman ρ = {report['spearman']:.3f} | 1위 일치: {report['top1_agree']}")
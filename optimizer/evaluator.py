@@ -1,9 +1,9 @@
 # optimizer/evaluator.py
 
-import json
 from collections import defaultdict
 import os
 from config import RESULTS_PATH, MEMORY_PATH, RECALL_THRESHOLD
+from optimizer.records import MemoryRecord, PatternRecord, iter_records, write_records
 
 def tokenize(text):
     if not text:
@@ -36,27 +36,27 @@ def find_lcs(X, Y):
             j -= 1
     return lcs[::-1]
 
-def find_differences_with_offsets(original, corrected):
-    original_tokens = tokenize(original)
-    corrected_tokens = tokenize(corrected)
+# 🔢 토큰 시퀀스 간 차이 구간 (문자열 토큰/정수 토큰 모두 사용 가능)
+def diff_token_spans(original_tokens, corrected_tokens):
     lcs = find_lcs(original_tokens, corrected_tokens)
 
     orig_index = corr_index = lcs_index = 0
     differences = []
 
     while orig_index < len(original_tokens) or corr_index < len(corrected_tokens):
-        orig_diff, corr_diff = [], []
         orig_start, corr_start = orig_index, corr_index
 
         while orig_index < len(original_tokens) and (lcs_index >= len(lcs) or original_tokens[orig_index] != lcs[lcs_index]):
-            orig_diff.append(original_tokens[orig_index])
             orig_index += 1
         while corr_index < len(corrected_tokens) and (lcs_index >= len(lcs) or corrected_tokens[corr_index] != lcs[lcs_index]):
-            corr_diff.append(corrected_tokens[corr_index])
             corr_index += 1
 
-        if orig_diff or corr_diff:
-            differences.append((' '.join(orig_diff), ' '.join(corr_diff), orig_start, orig_index, corr_start, corr_index))
+        if orig_index > orig_start or corr_index > corr_start:
+            differences.append((
+                tuple(original_tokens[orig_start:orig_index]),
+                tuple(corrected_tokens[corr_start:corr_index]),
+                orig_start, orig_index, corr_start, corr_index
+            ))
 
         if lcs_index < len(lcs):
             lcs_index += 1
@@ -65,126 +65,170 @@ def find_differences_with_offsets(original, corrected):
 
     return differences
 
-def evaluate(results_path=RESULTS_PATH, memory_path=MEMORY_PATH):
+def find_differences_with_offsets(original, corrected):
+    return [
+        (' '.join(orig), ' '.join(corr), os_, oe, cs, ce)
+        for orig, corr, os_, oe, cs, ce in diff_token_spans(tokenize(original), tokenize(corrected))
+    ]
+
+# 📐 정답 diff vs 예측 diff 매칭 → (tp, fp, fm, fr)
+def score_diffs(diffs_og, diffs_op):
+    og_idx = op_idx = 0
+    tp = fp = fm = fr = 0
+
+    while True:
+        if og_idx >= len(diffs_og) and op_idx >= len(diffs_op):
+            break
+        if og_idx >= len(diffs_og):
+            fr += 1
+            op_idx += 1
+            continue
+        if op_idx >= len(diffs_op):
+            fm += 1
+            og_idx += 1
+            continue
+        if diffs_og[og_idx][2] == diffs_op[op_idx][2]:
+            if diffs_og[og_idx][1] == diffs_op[op_idx][1]:
+                tp += 1
+            else:
+                fp += 1
+            og_idx += 1
+            op_idx += 1
+        elif diffs_og[og_idx][2] < diffs_op[op_idx][2]:
+            fm += 1
+            og_idx += 1
+        else:
+            fr += 1
+            op_idx += 1
+
+    return tp, fp, fm, fr
+
+def recall_precision(tp, fp, fm, fr):
+    recall = tp / (tp + fp + fm) if (tp + fp + fm) > 0 else 0.0
+    precision = tp / (tp + fp + fr) if (tp + fp + fr) > 0 else 0.0
+    return recall, precision
+
+# 한 행 채점 (corpus가 있으면 정수 토큰으로 diff 계산)
+def score_row(original, target, pred, corpus=None):
+    to_tokens = corpus.tokens_of if corpus is not None else tokenize
+    original_tokens = to_tokens(original)
+    diffs_og = diff_token_spans(original_tokens, to_tokens(target))
+    diffs_op = diff_token_spans(original_tokens, to_tokens(pred))
+    return recall_precision(*score_diffs(diffs_og, diffs_op))
+
+# ⛔ 호출 실패 건은 오답으로 채점하지 않음 (status 필드 + 구버전 센티널 문자열 모두 처리)
+def is_scorable(item):
+    if item.get("status", "ok") != "ok":
+        return False
+    pred = item.get("prediction")
+    return pred is not None and not pred.startswith("[ERROR]")
+
+# 📄 결과 파일 → 템플릿별 행 단위 점수 {template_id: [{"id", "recall", "precision"}, ...]}
+def load_row_scores(results_path=RESULTS_PATH, corpus_path=None):
     scores_by_template = defaultdict(list)
 
-    with open(results_path, encoding="utf-8") as f:
-        for line in f:
-            item = json.loads(line)
-            pred = item["prediction"]
-            target = item.get("target")
-            original = item["input"]
-            if not target:
-                continue
-
-            diffs_og = find_differences_with_offsets(original, target)
-            diffs_op = find_differences_with_offsets(original, pred)
-
-            og_idx = op_idx = 0
-            tp = fp = fm = fr = 0
-
-            while True:
-                if og_idx >= len(diffs_og) and op_idx >= len(diffs_op):
-                    break
-                if og_idx >= len(diffs_og):
-                    fr += 1
-                    op_idx += 1
-                    continue
-                if op_idx >= len(diffs_op):
-                    fm += 1
-                    og_idx += 1
-                    continue
-                if diffs_og[og_idx][2] == diffs_op[op_idx][2]:
-                    if diffs_og[og_idx][1] == diffs_op[op_idx][1]:
-                        tp += 1
-                    else:
-                        fp += 1
-                    og_idx += 1
-                    op_idx += 1
-                elif diffs_og[og_idx][2] < diffs_op[op_idx][2]:
-                    fm += 1
-                    og_idx += 1
-                else:
-                    fr += 1
-                    op_idx += 1
-
-            recall = tp / (tp + fp + fm) if (tp + fp + fm) > 0 else 0.0
-            precision = tp / (tp + fp + fr) if (tp + fp + fr) > 0 else 0.0
-
-            scores_by_template[item["template_id"]].append({
-                "recall": recall,
-                "precision": precision,
-                "id": item["id"]
-            })
+    # 🔢 정수 토큰 말뭉치가 있으면 사용 (build_token_corpus로 미리 생성)
+    corpus = None
+    if corpus_path:
+        from optimizer.token_corpus import TokenCorpus
+        corpus = TokenCorpus.open(corpus_path)
+
+    for item in iter_records(results_path):
+        pred = item.prediction
+        target = item.target
+        original = item.input
+        if not target or not is_scorable(item):
+            continue
+
+        recall, precision = score_row(original, target, pred, corpus)
+
+        scores_by_template[item.template_id].append({
+            "recall": recall,
+            "precision": precision,
+            "id": item.id
+        })
+
+    return scores_by_template
+
+# 행 점수 평균 → (avg_recall, avg_precision, f1)
+def summarize_scores(results):
+    recall_avg = sum(r["recall"] for r in results) / len(results)
+    precision_avg = sum(r["precision"] for r in results) / len(results)
+    f1 = 2 * recall_avg * precision_avg / (recall_avg + precision_avg) if (recall_avg + precision_avg) > 0 else 0.0
+    return recall_avg, precision_avg, f1
+
+def evaluate(results_path=RESULTS_PATH, memory_path=MEMORY_PATH, corpus_path=None):
+    scores_by_template = load_row_scores(results_path, corpus_path)
 
     memory = []
     for tid, results in scores_by_template.items():
-        recall_avg = sum(r["recall"] for r in results) / len(results)
-        precision_avg = sum(r["precision"] for r in results) / len(results)
-        f1 = 2 * recall_avg * precision_avg / (recall_avg + precision_avg) if (recall_avg + precision_avg) > 0 else 0.0
-
-        memory.append({
-            "template_id": tid,
-            "eval_count": len(results),
-            "avg_recall": round(recall_avg, 4),
-            "avg_precision": round(precision_avg, 4),
-            "f1": round(f1, 4)  # ✅ 추가!
-        })
+        recall_avg, precision_avg, f1 = summarize_scores(results)
 
-    with open(memory_path, "w", encoding="utf-8") as fout:
-        for m in memory:
-            fout.write(json.dumps(m, ensure_ascii=False) + "\n")
+        memory.append(MemoryRecord(
+            template_id=tid,
+            eval_count=len(results),
+            avg_recall=round(recall_avg, 4),
+            avg_precision=round(precision_avg, 4),
+            f1=round(f1, 4)  # ✅ 추가!
+        ))
+
+    write_records(memory, memory_path)
 
     return memory
 
 def extract_error_patterns(
     results_path=RESULTS_PATH,
     output_path="data/prompt_error_patterns.jsonl",
-    recall_threshold=RECALL_THRESHOLD
+    recall_threshold=RECALL_THRESHOLD,
+    index=None
 ):
+    # 🗂️ 놓친 치환을 유형별로 집계하는 인덱스 (classify_error 휴리스틱 대체)
+    from optimizer.substitution_index import SubstitutionIndex, MISSED, mine_row
+
+    index = index if index is not None else SubstitutionIndex()
     patterns = []
 
-    with open(results_path, encoding="utf-8") as f:
-        for line in f:
-            item = json.loads(line)
-            pred = item["prediction"]
-            target = item.get("target")
-            if not target or pred.startswith("[ERROR]"):
-                continue
-
-            diffs_og = find_differences_with_offsets(item["input"], target)
-            diffs_op = find_differences_with_offsets(item["input"], pred)
-
-            og_idx = op_idx = 0
-            tp = 0
-
-            while og_idx < len(diffs_og) and op_idx < len(diffs_op):
-                if diffs_og[og_idx][2] == diffs_op[op_idx][2] and diffs_og[og_idx][1] == diffs_op[op_idx][1]:
-                    tp += 1
-                og_idx += 1
-                op_idx += 1
-
-            recall = tp / len(diffs_og) if diffs_og else 0
-            if recall < recall_threshold:
-                error_type = classify_error(item["input"], pred)
-                patterns.append({
-                    "template_id": item["template_id"],
-                    "source_id": item["id"],
-                    "recall": round(recall, 3),
-                    "error_type": error_type,
-                    "example": f"{item['input']} → {target}"
-                })
-
-    with open(output_path, "w", encoding="utf-8") as fout:
-        for p in patterns:
-            fout.write(json.dumps(p, ensure_ascii=False) + "\n")
-
-def classify_error(src: str, pred: str) -> str:
-    if "은 " in src or "는 " in src or "이 " in src:
-        return "조사 오류"
-    elif any(p in src for p in [".", "?", "!", ","]) and not any(p in pred for p in [".", "?", "!", ","]):
-        return "문장 부호 누락"
-    elif "  " in src or " " not in src:
-        return "띄어쓰기 오류"
-    else:
-        return "기타"
+    for item in iter_records(results_path):
+        pred = item.prediction
+        target = item.target
+        if not target or not is_scorable(item):
+            continue
+
+        diffs_og = find_differences_with_offsets(item.input, target)
+        diffs_op = find_differences_with_offsets(item.input, pred)
+
+        og_idx = op_idx = 0
+        tp = 0
+
+        while og_idx < len(diffs_og) and op_idx < len(diffs_op):
+            if diffs_og[og_idx][2] == diffs_op[op_idx][2] and diffs_og[og_idx][1] == diffs_op[op_idx][1]:
+                tp += 1
+            og_idx += 1
+            op_idx += 1
+
+        recall = tp / len(diffs_og) if diffs_og else 0
+        if recall < recall_threshold:
+            missed = [
+                (orig, corr, index.classify(orig, corr))
+                for kind, orig, corr in mine_row(item.input, target, pred, diffs_og, diffs_op)
+                if kind == MISSED
+            ]
+            for orig, corr, _ in missed:
+                index.add(item.template_id, MISSED, orig, corr)
+            type_counts = defaultdict(int)
+            for _, _, t in missed:
+                type_counts[t] += 1
+            patterns.append(PatternRecord(
+                template_id=item.template_id,
+                source_id=item.id,
+                recall=round(recall, 3),
+                error_type=max(type_counts, key=type_counts.get) if type_counts else "기타",
+                substitutions=[
+                    {"orig": orig, "corr": corr, "error_type": t} for orig, corr, t in missed
+                ],
+                example=f"{item.input} → {target}"
+            ))
+
+    write_records(patterns, output_path)
+
+    return index
@@ -0,0 +1,32 @@
+# optimizer/hangul.py
+
+# 🔤 한글 음절 ↔ 자모 분해/조합 (유니코드 산술)
+SYLLABLE_BASE = 0xAC00
+SYLLABLE_LAST = 0xD7A3
+N_CHO, N_JUNG, N_JONG = 19, 21, 28
+
+def is_syllable(ch: str) -> bool:
+    return SYLLABLE_BASE <= ord(ch) <= SYLLABLE_LAST
+
+# '각' → (0, 0, 1) : (초성, 중성, 종성) 인덱스
+def decompose(ch: str):
+    if not is_syllable(ch):
+        return None
+    code = ord(ch) - SYLLABLE_BASE
+    return code // (N_JUNG * N_JONG), (code % (N_JUNG * N_JONG)) // N_JONG, code % N_JONG
+
+def compose(cho: int, jung: int, jong: int = 0) -> str:
+    return chr(SYLLABLE_BASE + (cho * N_JUNG + jung) * N_JONG + jong)
+
+# 문자열 → 자모 인덱스 시퀀스 (한글 외 문자는 그대로)
+def to_jamo(text: str) -> list:
+    out = []
+    for ch in text:
+        parts = decompose(ch)
+        if parts is None:
+            out.append(ch)
+        else:
+            out.extend((("L", parts[0]), ("V", parts[1])))
+            if parts[2]:
+                out.append(("T", parts[2]))
+    return out
@@ -0,0 +1,121 @@
+# optimizer/jsonl_io.py
+
+import asyncio
+import json
+import queue
+import shutil
+import threading
+import time
+
+# ⚡ orjson이 설치돼 있으면 사용 (없으면 표준 json, 어느 쪽이든 한글은 이스케이프 없이 UTF-8)
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# to_dict()가 있는 객체(optimizer.records의 레코드)는 dict로 바꿔 직렬화
+def _default(obj):
+    to_dict = getattr(obj, "to_dict", None)
+    if to_dict is None:
+        raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+    return to_dict()
+
+def dumps_line(record) -> bytes:
+    if orjson is not None:
+        try:
+            return orjson.dumps(record, default=_default, option=orjson.OPT_APPEND_NEWLINE)
+        except TypeError:  # orjson이 못 다루는 타입은 표준 json으로
+            pass
+    return (json.dumps(record, ensure_ascii=False, default=_default) + "\n").encode("utf-8")
+
+def loads(line):
+    return orjson.loads(line) if orjson is not None else json.loads(line)
+
+def read_jsonl(path: str) -> list:
+    with open(path, "rb") as f:
+        return [loads(line) for line in f if line.strip()]
+
+# 📎 여러 jsonl 파일을 파싱 없이 이어 붙임 (마지막 줄 개행 누락만 보정)
+def concat_jsonl(paths, out_path: str):
+    with open(out_path, "wb") as fout:
+        for path in paths:
+            with open(path, "rb") as fin:
+                shutil.copyfileobj(fin, fout, 1 << 20)
+                if fin.tell() > 0:
+                    fin.seek(-1, 2)
+                    if fin.read(1) != b"\n":
+                        fout.write(b"\n")
+
+_CLOSE = object()
+
+# 🧵 직렬화 + 파일 쓰기를 전담하는 writer 스레드
+# - put()은 큐에 넣기만 하므로 이벤트 루프를 막지 않음
+# - batch_size개가 모이거나 flush_seconds가 지나면 한 번에 write
+# - close()에서 남은 레코드를 모두 기록하고, 스레드에서 난 예외는 여기서 다시 발생
+class JsonlWriter:
+    def __init__(self, path: str, mode: str = "w", batch_size: int = 256, flush_seconds: float = 1.0):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.count = 0
+        self._queue = queue.SimpleQueue()
+        self._error = None
+        self._file = open(path, mode.replace("b", "") + "b")
+        self._thread = threading.Thread(target=self._run, name=f"jsonl-writer:{path}", daemon=True)
+        self._thread.start()
+
+    def put(self, record):
+        self._queue.put(record)
+
+    def put_many(self, records):
+        for record in records:
+            self._queue.put(record)
+
+    def _write(self, batch: list):
+        self._file.write(b"".join(batch))
+        self._file.flush()
+        self.count += len(batch)
+
+    def _run(self):
+        batch = []
+        deadline = time.monotonic() + self.flush_seconds
+        try:
+            while True:
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    item = None
+                if item is _CLOSE:
+                    break
+                if item is not None:
+                    batch.append(dumps_line(item))
+                    if len(batch) < self.batch_size and time.monotonic() < deadline:
+                        continue
+                if batch:
+                    self._write(batch)
+                    batch = []
+                deadline = time.monotonic() + self.flush_seconds
+            if batch:
+                self._write(batch)
+        except BaseException as e:
+            self._error = e
+        finally:
+            self._file.close()
+
+    def close(self):
+        if self._thread.is_alive():
+            self._queue.put(_CLOSE)
+            self._thread.join()
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+    # 이벤트 루프 안에서는 join을 스레드로 넘겨서 대기
+    async def aclose(self):
+        await asyncio.to_thread(self.close)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
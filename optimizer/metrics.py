@@ -1,9 +1,16 @@
-import pandas as pd
-from typing import Dict, List, Tuple
+import math
+from typing import Dict, List, Tuple, TYPE_CHECKING
+
+if TYPE_CHECKING:  # ⚡ pandas는 타입 힌트용으로만 참조 (import 비용 회피)
+    import pandas as pd
+
+def is_missing(text) -> bool:
+    """None / NaN 여부 (pd.isna 대체)"""
+    return text is None or (isinstance(text, float) and math.isnan(text))
 
 def tokenize(text: str) -> List[str]:
     """텍스트를 토큰으로 분리"""
-    if pd.isna(text):
+    if is_missing(text):
         return []
     return str(text).split()
 
@@ -88,7 +95,7 @@ def find_differences_with_offsets(original: str, corrected: str) -> List[Tuple[s
             
     return new_differences
 
-def evaluate_correction(true_df: pd.DataFrame, pred_df: pd.DataFrame, n_samples: int = 5) -> Dict:
+def evaluate_correction(true_df: "pd.DataFrame", pred_df: "pd.DataFrame", n_samples: int = 5) -> Dict:
     """교정 결과 평가 및 점수 계산"""
     total_tp = 0
     total_fp = 0
@@ -0,0 +1,226 @@
+# optimizer/prompt_minimizer.py
+# 실행: python -m optimizer.prompt_minimizer --template best_single_05 --subset data/eval_subset.json
+
+import json
+import re
+from optimizer.evaluator import score_row, summarize_scores
+from optimizer.registry import ExperimentRegistry, REGISTRY_PATH, fill_missing
+
+# ✂️ 델타 디버깅(ddmin) 프롬프트 최소화
+# - 템플릿을 줄 단위 규칙/예시 유닛으로 쪼갬 (제목·빈 줄·{text} 줄은 고정)
+# - 완전히 같은 유닛(중복 예시 등)은 한 번에 먼저 제거해 보고 시작
+# - 유닛을 묶음으로 빼 보고, 고정 부분집합 F1이 기준 대비 tolerance 이내면 그 축소를 채택
+# - 응답은 실험 레지스트리(template_hash, dataset_hash, row id)에 캐시 → 같은 후보는 다시 호출하지 않음
+EXAMPLE = "example"
+RULE = "rule"
+FIXED = "fixed"
+
+EXAMPLE_LINE = re.compile(r"^\s*-?\s*'[^']*'\s*(→|=)\s*'[^']*'\s*$")
+HEADER_LINE = re.compile(r"^\s*(📌|✅|\*\*[^*]+\*\*\s*$|\d+\.\s*\*\*)")
+TOKEN_PATTERN = re.compile(r"[가-힣]|[A-Za-z]+|\d+|[^\sA-Za-z\d가-힣]")
+
+# 🔢 로컬 토큰 수 추정 (한글 음절 1개, 영단어/숫자 묶음 1개, 기호 1개)
+def estimate_tokens(text: str) -> int:
+    return len(TOKEN_PATTERN.findall(text))
+
+def _messages_of(template_obj: dict) -> list:
+    template = template_obj["template"]
+    if isinstance(template, str):
+        return [{"role": "user", "content": template}]
+    return template
+
+def classify_line(line: str) -> str:
+    if not line.strip() or "{text}" in line or HEADER_LINE.match(line):
+        return FIXED
+    return EXAMPLE if EXAMPLE_LINE.match(line) else RULE
+
+# 유닛: {"message": 메시지 번호, "kind": 종류, "text": 줄(들)}
+# - 들여쓴 줄은 바로 앞 규칙 유닛에 이어 붙임 (예: "- 다음 단어는 띄어 써:" 아래 "  · ..." 목록)
+# - multi-turn 템플릿의 user 메시지(입력 문장 자리)는 통째로 고정
+def split_units(template_obj: dict) -> list:
+    units = []
+    messages = _messages_of(template_obj)
+    for m_idx, message in enumerate(messages):
+        for line in message["content"].split("\n"):
+            fixed_message = len(messages) > 1 and message["role"] == "user"
+            kind = FIXED if fixed_message else classify_line(line)
+            prev = units[-1] if units else None
+            if (kind == RULE and line[:1].isspace() and prev is not None
+                    and prev["message"] == m_idx and prev["kind"] == RULE):
+                prev["text"] += "\n" + line
+                continue
+            units.append({"message": m_idx, "kind": kind, "text": line})
+    return units
+
+def build_template(template_obj: dict, units: list, suffix: str = "min") -> dict:
+    contents = {}
+    for unit in units:
+        contents.setdefault(unit["message"], []).append(unit["text"])
+
+    messages = [
+        {**message, "content": "\n".join(contents.get(i, []))}
+        for i, message in enumerate(_messages_of(template_obj))
+    ]
+    template = messages[0]["content"] if isinstance(template_obj["template"], str) else messages
+    return {**template_obj, "id": f"{template_obj['id']}__{suffix}", "template": template}
+
+# 같은 메시지 안에서 앞에 이미 나온 규칙/예시와 똑같은 유닛의 번호
+def duplicate_units(units: list) -> set:
+    seen, duplicates = set(), set()
+    for i, unit in enumerate(units):
+        key = (unit["message"], unit["kind"], unit["text"].strip())
+        if unit["kind"] != FIXED and key in seen:
+            duplicates.add(i)
+        seen.add(key)
+    return duplicates
+
+def template_tokens(template_obj: dict) -> int:
+    return sum(estimate_tokens(m["content"]) for m in _messages_of(template_obj))
+
+# 📏 고정 부분집합 F1 (레지스트리에 없는 셀만 호출)
+class SubsetScorer:
+    def __init__(self, train_path: str, ids: list, registry_path: str = REGISTRY_PATH):
+        from optimizer.async_runner import load_train_csv
+        from optimizer.dataset_cache import load_dataset
+
+        self.data = load_train_csv(train_path, len(ids), ids=ids)
+        self.dataset_hash = load_dataset(train_path).header["source_sha256"]
+        self.registry = ExperimentRegistry(registry_path)
+        self.calls = 0
+
+    def close(self):
+        self.registry.close()
+
+    async def f1(self, template_obj: dict) -> float:
+        self.calls += len(self.registry.plan([template_obj], self.dataset_hash, self.data))
+        await fill_missing(self.registry, [template_obj], self.dataset_hash, self.data, desc=template_obj["id"])
+        results = self.registry.collect([template_obj], self.dataset_hash, self.data)
+        scores = []
+        for r in results:
+            if r.get("target"):
+                recall, precision = score_row(r["input"], r["target"], r["prediction"])
+                scores.append({"recall": recall, "precision": precision})
+        return summarize_scores(scores)[2] if scores else 0.0
+
+# 🔍 ddmin: 제거 가능한 유닛을 n개 묶음으로 나눠 한 묶음씩 빼 보고, 통과하면 채택
+async def minimize(template_obj: dict, scorer: SubsetScorer, tolerance: float = 0.005,
+                   max_evals: int = 40, token_budget: int = None) -> dict:
+    units = split_units(template_obj)
+    duplicates = duplicate_units(units)
+    fixed = [i for i, u in enumerate(units) if u["kind"] == FIXED]
+    removable = [i for i, u in enumerate(units) if u["kind"] != FIXED]
+
+    def candidate(kept: list) -> dict:
+        keep = set(fixed) | set(kept)
+        return build_template(template_obj, [u for i, u in enumerate(units) if i in keep])
+
+    base_f1 = best_f1 = await scorer.f1(template_obj)
+    evals, history = 1, []
+    if duplicates:
+        deduped = [i for i in removable if i not in duplicates]
+        f1 = await scorer.f1(candidate(deduped))
+        evals += 1
+        history.append({"units": len(deduped), "f1": round(f1, 4), "accepted": f1 >= base_f1 - tolerance})
+        if f1 >= base_f1 - tolerance:
+            removable, best_f1 = deduped, f1
+
+    n = 2
+    while len(removable) >= 2 and evals < max_evals:
+        if token_budget is not None and template_tokens(candidate(removable)) <= token_budget:
+            break
+        chunk = max(1, len(removable) // n)
+        groups = [removable[i:i + chunk] for i in range(0, len(removable), chunk)]
+        reduced = False
+        for group in groups:
+            if evals >= max_evals:
+                break
+            kept = [i for i in removable if i not in set(group)]
+            f1 = await scorer.f1(candidate(kept))
+            evals += 1
+            accepted = f1 >= base_f1 - tolerance
+            history.append({"units": len(kept), "f1": round(f1, 4), "accepted": accepted})
+            if accepted:
+                removable, best_f1, reduced = kept, f1, True
+                n = max(n - 1, 2)
+                break
+        if not reduced:
+            if n >= len(removable):
+                break
+            n = min(len(removable), n * 2)
+
+    minimized = candidate(removable)
+    removed = [units[i] for i in range(len(units)) if units[i]["kind"] != FIXED and i not in set(removable)]
+    before, after = template_tokens(template_obj), template_tokens(minimized)
+    return {
+        "template": minimized,
+        "base_f1": round(base_f1, 4),
+        "f1": round(best_f1, 4),
+        "tokens_before": before,
+        "tokens_after": after,
+        "duplicates_removed": len(duplicates & set(i for i, u in enumerate(units) if i not in removable)),
+        "removed_rules": sum(1 for u in removed if u["kind"] == RULE),
+        "removed_examples": sum(1 for u in removed if u["kind"] == EXAMPLE),
+        "evals": evals,
+        "history": history,
+    }
+
+def load_template(template_id: str) -> dict:
+    from prompts.base_templates import BASE_TEMPLATES
+    from prompts.improved_templates import IMPROVED_TEMPLATES
+    from prompts.compact_templates import COMPACT_TEMPLATES
+
+    if template_id == "CHECK_SINGLE":
+        return template_from_123(template_id)
+    for template in BASE_TEMPLATES + IMPROVED_TEMPLATES + COMPACT_TEMPLATES:
+        if template["id"] == template_id:
+            return template
+    raise KeyError(template_id)
+
+# 123.py의 apply_template 결과를 템플릿 객체로 변환 ({text} 자리 표시자 복원, 나머지 중괄호는 이스케이프)
+def template_from_123(template_name: str) -> dict:
+    import importlib
+
+    marker = "\x00TEXT\x00"
+    messages = importlib.import_module("123").apply_template(template_name, marker)
+    return {
+        "id": template_name.lower(),
+        "type": "multi-turn",
+        "template": [
+            {**m, "content": m["content"].replace("{", "{{").replace("}", "}}").replace(marker, "{text}")}
+            for m in messages
+        ],
+    }
+
+if __name__ == "__main__":
+    import argparse
+    import asyncio
+    from optimizer.eval_subset import load_subset_ids, EVAL_SUBSET_PATH
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--template", type=str, required=True, help="템플릿 id 또는 CHECK_SINGLE (123.py)")
+    parser.add_argument("--train", type=str, default="data/train.csv")
+    parser.add_argument("--subset", type=str, default=EVAL_SUBSET_PATH)
+    parser.add_argument("--tolerance", type=float, default=0.005, help="허용 F1 하락폭")
+    parser.add_argument("--max-evals", type=int, default=40, help="후보 평가 횟수 상한")
+    parser.add_argument("--token-budget", type=int, default=None, help="추정 토큰이 이 이하가 되면 중단")
+    parser.add_argument("--registry", type=str, default=REGISTRY_PATH)
+    parser.add_argument("--requests", type=int, default=10871, help="절감량 환산용 요청 수")
+    args = parser.parse_args()
+
+    template = load_template(args.template)
+    scorer = SubsetScorer(args.train, load_subset_ids(args.subset), args.registry)
+    try:
+        report = asyncio.run(minimize(template, scorer, args.tolerance, args.max_evals, args.token_budget))
+    finally:
+        scorer.close()
+
+    out_path = f"data/minimized_{template['id']}.json"
+    with open(out_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    saved = report["tokens_before"] - report["tokens_after"]
+    print(f"✂️ {template['id']}: F1 {report['base_f1']} → {report['f1']} | "
+          f"추정 토큰 {report['tokens_before']} → {report['tokens_after']} (-{saved}, "
+          f"{saved * args.requests:,} tokens / {args.requests}건)")
+    print(f"   중복 {report['duplicates_removed']}개, 규칙 {report['removed_rules']}개, "
+          f"예시 {report['removed_examples']}개 제거 | 평가 {report['evals']}회, 신규 호출 {scorer.calls}건 → {out_path}")
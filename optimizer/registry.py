@@ -0,0 +1,183 @@
+# optimizer/registry.py
+
+import hashlib
+import json
+import sqlite3
+import time
+import unicodedata
+from engine.api_client import MODEL, STATUS_OK, streaming_enabled
+
+# 🧾 내용 주소 기반 실험 레지스트리
+# - 템플릿은 id가 아니라 (정규화된 내용 + 모델) 해시로 식별 → 한 글자만 바뀌어도 새 템플릿
+# - 결과는 (template_hash, dataset_hash, row id) 셀 단위로 저장
+# - 플래너는 비어 있는 셀만 실행 대상으로 돌려줌 → 템플릿 10개 중 1개 수정 시 1개 분량만 호출
+REGISTRY_PATH = "data/registry.sqlite"
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS templates (
+    template_hash TEXT PRIMARY KEY,
+    template_id   TEXT NOT NULL,
+    model         TEXT NOT NULL,
+    content       TEXT NOT NULL,
+    created_at    REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS results (
+    template_hash TEXT NOT NULL,
+    dataset_hash  TEXT NOT NULL,
+    row_id        TEXT NOT NULL,
+    result        TEXT NOT NULL,
+    created_at    REAL NOT NULL,
+    PRIMARY KEY (template_hash, dataset_hash, row_id)
+);
+"""
+
+# 결과에 영향이 없는 필드(id, 설명)는 제외, 줄끝 공백/개행 형식/유니코드 정규화 차이는 무시
+IGNORED_FIELDS = ("id", "description")
+
+def normalize_template(obj):
+    if isinstance(obj, str):
+        lines = obj.replace("\r\n", "\n").split("\n")
+        return unicodedata.normalize("NFC", "\n".join(line.rstrip() for line in lines).strip())
+    if isinstance(obj, dict):
+        return {k: normalize_template(v) for k, v in sorted(obj.items()) if k not in IGNORED_FIELDS}
+    if isinstance(obj, (list, tuple)):
+        return [normalize_template(v) for v in obj]
+    return obj
+
+# 스트리밍 모드는 첫 줄에서 응답을 자르므로 다른 "모델 설정"으로 취급
+def model_signature() -> str:
+    return f"{MODEL}+stream" if streaming_enabled() else MODEL
+
+def template_hash(template_obj: dict, model: str = None) -> str:
+    payload = json.dumps(
+        {"model": model or model_signature(), "template": normalize_template(template_obj)},
+        ensure_ascii=False, sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+class ExperimentRegistry:
+    def __init__(self, path: str = REGISTRY_PATH):
+        self.path = path
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def register(self, template_obj: dict) -> str:
+        h = template_hash(template_obj)
+        self.conn.execute(
+            "INSERT OR IGNORE INTO templates VALUES (?, ?, ?, ?, ?)",
+            (h, template_obj["id"], model_signature(),
+             json.dumps(normalize_template(template_obj), ensure_ascii=False), time.time()),
+        )
+        return h
+
+    def known_rows(self, t_hash: str, dataset_hash: str) -> set:
+        cur = self.conn.execute(
+            "SELECT row_id FROM results WHERE template_hash = ? AND dataset_hash = ?", (t_hash, dataset_hash)
+        )
+        return {row_id for (row_id,) in cur}
+
+    # 📋 비어 있는 (template, row) 셀 목록
+    # - 셀의 템플릿 id는 내용 해시로 바꿔 둠 (id가 겹치는 서로 다른 템플릿도 결과를 구분)
+    # - 내용이 같은 템플릿은 한 번만 실행
+    def plan(self, templates: list, dataset_hash: str, data: list) -> list:
+        cells = []
+        planned = set()
+        for template in templates:
+            h = self.register(template)
+            if h in planned:
+                continue
+            planned.add(h)
+            known = self.known_rows(h, dataset_hash)
+            keyed = {**template, "id": h}
+            cells.extend((keyed, row) for row in data if row["id"] not in known)
+        return cells
+
+    # plan()의 셀을 실행한 결과 중 성공분만 저장 (실패 셀은 다음 실행에서 다시 계획됨)
+    def record(self, dataset_hash: str, results: list) -> int:
+        rows = [
+            (r["template_id"], dataset_hash, r["id"], json.dumps(r, ensure_ascii=False), time.time())
+            for r in results
+            if r.get("status") == STATUS_OK
+        ]
+        self.conn.execute("BEGIN IMMEDIATE")
+        self.conn.executemany("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)", rows)
+        self.conn.execute("COMMIT")
+        return len(rows)
+
+    # 현재 템플릿 id로 바꿔서 반환 (내용이 같으면 이름을 바꿔도 기존 결과 재사용)
+    def collect(self, templates: list, dataset_hash: str, data: list) -> list:
+        results = []
+        row_ids = {row["id"] for row in data}
+        for template in templates:
+            cur = self.conn.execute(
+                "SELECT row_id, result FROM results WHERE template_hash = ? AND dataset_hash = ?",
+                (template_hash(template), dataset_hash),
+            )
+            by_row = {row_id: result for row_id, result in cur if row_id in row_ids}
+            results.extend(
+                {**json.loads(by_row[row["id"]]), "template_id": template["id"]}
+                for row in data if row["id"] in by_row
+            )
+        return results
+
+    def stats(self) -> list:
+        cur = self.conn.execute(
+            "SELECT t.template_id, t.template_hash, t.model, COUNT(r.row_id) "
+            "FROM templates t LEFT JOIN results r ON r.template_hash = t.template_hash "
+            "GROUP BY t.template_hash ORDER BY t.created_at"
+        )
+        return [{"template_id": tid, "template_hash": h, "model": m, "rows": n} for tid, h, m, n in cur]
+
+# ▶️ 빈 셀만 호출해 레지스트리를 채우고, 끝까지 실패한 결과를 (현재 템플릿 id로) 반환
+# 마감 모드(planner)에서 건너뛴 셀은 기록되지 않으므로 다음 실행에서 다시 계획됨
+async def fill_missing(registry: ExperimentRegistry, templates: list, dataset_hash: str, data: list,
+                       desc: str = None, planner=None) -> list:
+    from optimizer.async_runner import run_rows
+
+    cells = registry.plan(templates, dataset_hash, data)
+    if not cells:
+        return []
+    keyed_templates = list({template["id"]: template for template, _ in cells}.values())
+    fresh = await run_rows(data, keyed_templates, desc=desc, cells=cells, planner=planner)
+    registry.record(dataset_hash, fresh)
+    ids_by_hash = {template_hash(t): t["id"] for t in templates}
+    return [{**r, "template_id": ids_by_hash[r["template_id"]]} for r in fresh if r.get("status") != STATUS_OK]
+
+# 캐시된 결과와 합쳐 out_path에 기록
+# - 같은 행을 다시 고르도록 샘플링 시드 고정 (레지스트리 적중의 전제)
+async def run_registered(train_path: str, out_path: str, sample_size: int, templates: list,
+                         registry_path: str = REGISTRY_PATH, ids=None, planner=None) -> list:
+    from optimizer.async_runner import load_train_csv, write_results
+    from optimizer.dataset_cache import load_dataset
+
+    data = load_train_csv(train_path, sample_size, seed=0, ids=ids)
+    dataset_hash = load_dataset(train_path).header["source_sha256"]
+
+    registry = ExperimentRegistry(registry_path)
+    try:
+        total = len(templates) * len(data)
+        missing = len(registry.plan(templates, dataset_hash, data))
+        print(f"🧾 레지스트리: 전체 {total}셀 중 {total - missing}셀 재사용, {missing}셀 실행")
+
+        failed = await fill_missing(registry, templates, dataset_hash, data, planner=planner)
+        results = registry.collect(templates, dataset_hash, data) + failed
+    finally:
+        registry.close()
+
+    write_results(results, out_path)
+    return results
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--registry", type=str, default=REGISTRY_PATH)
+    args = parser.parse_args()
+
+    registry = ExperimentRegistry(args.registry)
+    for s in registry.stats():
+        print(f"- {s['template_id']} | {s['template_hash']} | {s['model']} | {s['rows']} rows")
+    registry.close()
@@ -0,0 +1,31 @@
+# optimizer/rescore.py
+# 평가 전용 진입점: python -m optimizer.rescore --results data/results.jsonl
+# ⚡ openai / dotenv / pandas 를 import 하지 않음 → 재채점 작업이 즉시 시작
+
+import argparse
+from config import RESULTS_PATH, MEMORY_PATH, ERROR_PATTERN_PATH
+from optimizer.evaluator import evaluate, extract_error_patterns
+from optimizer.error_extractor import extract_failed_cases
+from optimizer.summary_writer import write_summary_csv
+
+def rescore(results_path=RESULTS_PATH, memory_path=MEMORY_PATH, corpus_path=None,
+            patterns_path=ERROR_PATTERN_PATH, errors_path="data/errors.jsonl", summary_path="data/summary.csv"):
+    memory = evaluate(results_path, memory_path, corpus_path)
+    extract_error_patterns(results_path, patterns_path)
+    extract_failed_cases(results_path, errors_path)
+    if memory:
+        write_summary_csv(memory_path, summary_path)
+    return memory
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--results", type=str, default=RESULTS_PATH)
+    parser.add_argument("--memory", type=str, default=MEMORY_PATH)
+    parser.add_argument("--corpus", type=str, default=None, help="정수 토큰 말뭉치 경로 (optimizer.token_corpus)")
+    args = parser.parse_args()
+
+    for m in rescore(args.results, args.memory, args.corpus):
+        print(
+            f"- {m['template_id']} | eval_count={m['eval_count']} | "
+            f"recall={m['avg_recall']} | precision={m['avg_precision']} | f1={m['f1']}"
+        )
@@ -0,0 +1,42 @@
+# optimizer/retry_queue.py
+
+import asyncio
+import json
+import os
+
+DEAD_LETTER_PATH = "data/dead_letter.jsonl"
+
+# 🔁 본 실행이 끝난 뒤 실패 건만 모아 백오프를 두고 재시도
+# - retry_fn(item) → 재시도 결과 item (status 필드 포함)
+# - 끝까지 실패한 건은 dead-letter 파일에 기록 (dead_letter_path=None이면 기록하지 않음)
+# - verbose=False면 진행 상황을 출력하지 않음 (라이브러리에서 호출할 때)
+async def drain_retries(failed: list, retry_fn, rounds: int = 3, base_delay: float = 5.0,
+                        dead_letter_path: str = DEAD_LETTER_PATH, is_ok=None, verbose: bool = True):
+    is_ok = is_ok or (lambda item: item.get("status") == "ok")
+    recovered = []
+    pending = list(failed)
+
+    for attempt in range(rounds):
+        if not pending:
+            break
+        delay = base_delay * (2 ** attempt)  # 지수 백오프
+        if verbose:
+            print(f"🔁 재시도 {attempt + 1}/{rounds}: {len(pending)}건 ({delay:.0f}s 대기)")
+        await asyncio.sleep(delay)
+
+        retried = await asyncio.gather(*(retry_fn(item) for item in pending))
+        recovered.extend(item for item in retried if is_ok(item))
+        pending = [item for item in retried if not is_ok(item)]
+
+    if pending and dead_letter_path:
+        write_dead_letters(pending, dead_letter_path)
+        if verbose:
+            print(f"☠️ 재시도 후에도 실패한 {len(pending)}건 → {dead_letter_path}")
+
+    return recovered, pending
+
+def write_dead_letters(items: list, path: str = DEAD_LETTER_PATH):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        for item in items:
+            f.write(json.dumps(item, ensure_ascii=False) + "\n")
@@ -0,0 +1,59 @@
+# optimizer/sharded_runner.py
+
+import asyncio
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+from optimizer.async_runner import load_train_csv, run_rows, write_results
+
+# 🔀 키와 행을 P개 샤드로 분할 (각 워커는 서로 겹치지 않는 키/행만 담당)
+def partition(items: list, n: int) -> list:
+    return [items[i::n] for i in range(n)]
+
+# 👷 워커 프로세스 진입점: 자기 몫의 키로 클라이언트를 다시 만들고 독립 이벤트 루프 실행
+def _run_shard(shard_index: int, keys: list, rows: list, templates: list, streaming: bool = False,
+               admission: dict = None) -> list:
+    from engine import api_client
+    api_client.configure_keys(keys)
+    api_client.configure_streaming(streaming)  # spawn 워커는 부모의 모듈 상태를 물려받지 않음
+    if admission:
+        # 용량은 부모가 전체 키 기준으로 계산한 값을 그대로 사용 (워커별 키 부분집합 기준이 아님)
+        api_client.configure_admission(**admission)
+    try:
+        return asyncio.run(
+            run_rows(rows, templates, desc=f"🧵 shard {shard_index}", position=shard_index)
+        )
+    finally:
+        api_client.close_admission()
+
+# 📎 결정적 병합: (입력 행 순서, 템플릿 순서) 기준 정렬
+def merge_shards(shard_results: list, data: list, templates: list) -> list:
+    row_order = {row["id"]: i for i, row in enumerate(data)}
+    template_order = {t["id"]: i for i, t in enumerate(templates)}
+    merged = [r for results in shard_results for r in results]
+    merged.sort(key=lambda r: (row_order[r["id"]], template_order[r["template_id"]]))
+    return merged
+
+def run_sharded(train_path="data/test_with_answer.csv", out_path="data/results.jsonl",
+                limit=100, templates=None, processes=2, ids=None):
+    from engine.api_client import get_api_keys, streaming_enabled, admission_config
+
+    templates = templates or []
+    data = load_train_csv(train_path, limit, ids=ids)
+
+    # 키가 프로세스 수보다 적으면 키 개수만큼만 워커 생성
+    api_keys = get_api_keys()
+    processes = max(1, min(processes, len(api_keys)))
+    key_shards = partition(api_keys, processes)
+    row_shards = partition(data, processes)
+
+    ctx = mp.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=processes, mp_context=ctx) as pool:
+        futures = [
+            pool.submit(_run_shard, i, key_shards[i], row_shards[i], templates, streaming_enabled(), admission_config())
+            for i in range(processes)
+        ]
+        shard_results = [f.result() for f in futures]
+
+    results = merge_shards(shard_results, data, templates)
+    write_results(results, out_path)
+    return results
@@ -0,0 +1,144 @@
+# optimizer/significance.py
+
+import math
+import numpy as np
+from collections import defaultdict
+from statistics import NormalDist
+from optimizer.evaluator import load_row_scores, score_row, is_scorable
+
+# 📊 템플릿 간 F1 차이의 paired bootstrap 신뢰구간
+# - 두 템플릿이 공통으로 채점된 행만 사용 (같은 행을 같이 재표집 → paired)
+# - F1은 evaluate()와 동일하게 (평균 recall, 평균 precision)의 조화평균
+def _f1(recall, precision):
+    denom = recall + precision
+    return np.divide(2 * recall * precision, denom, out=np.zeros_like(denom), where=denom > 0)
+
+def paired_arrays(scores_a: list, scores_b: list):
+    b_by_id = {r["id"]: r for r in scores_b}
+    common = [(r, b_by_id[r["id"]]) for r in scores_a if r["id"] in b_by_id]
+    a = np.array([[ra["recall"], ra["precision"]] for ra, _ in common], dtype=np.float64).reshape(-1, 2)
+    b = np.array([[rb["recall"], rb["precision"]] for _, rb in common], dtype=np.float64).reshape(-1, 2)
+    return a, b
+
+# a, b: (n, 2) 배열 [recall, precision] → F1(a) - F1(b) 분포
+def paired_bootstrap(a: np.ndarray, b: np.ndarray, n_boot: int = 2000, alpha: float = 0.05,
+                     seed: int = 0, chunk: int = 256) -> dict:
+    n = len(a)
+    if n == 0:
+        return {"n": 0, "diff": 0.0, "low": float("nan"), "high": float("nan"), "se": float("nan"),
+                "p_le_zero": float("nan")}
+
+    rng = np.random.default_rng(seed)
+    diffs = np.empty(n_boot)
+    # 재표집 인덱스 행렬을 chunk 단위로 만들어 메모리 사용량 제한
+    for start in range(0, n_boot, chunk):
+        size = min(chunk, n_boot - start)
+        idx = rng.integers(0, n, size=(size, n))
+        ma = a[idx].mean(axis=1)  # (size, 2)
+        mb = b[idx].mean(axis=1)
+        diffs[start:start + size] = _f1(ma[:, 0], ma[:, 1]) - _f1(mb[:, 0], mb[:, 1])
+
+    point_a, point_b = a.mean(axis=0), b.mean(axis=0)
+    diff = float(_f1(point_a[:1], point_a[1:])[0] - _f1(point_b[:1], point_b[1:])[0])
+    low, high = np.quantile(diffs, [alpha / 2, 1 - alpha / 2])
+    return {
+        "n": n,
+        "diff": round(diff, 4),
+        "low": round(float(low), 4),
+        "high": round(float(high), 4),
+        "se": float(diffs.std(ddof=1)) if n_boot > 1 else float("nan"),
+        "p_le_zero": round(float((diffs <= 0).mean()), 4),
+    }
+
+# 🏆 최고 F1 템플릿 대비 나머지 템플릿의 차이 신뢰구간
+def compare_templates(scores_by_template: dict, n_boot: int = 2000, alpha: float = 0.05, seed: int = 0) -> list:
+    def f1_of(results):
+        a = np.array([[r["recall"], r["precision"]] for r in results]).mean(axis=0)
+        return float(_f1(a[:1], a[1:])[0])
+
+    leader = max(scores_by_template, key=lambda t: f1_of(scores_by_template[t]))
+    report = []
+    for tid, results in scores_by_template.items():
+        if tid == leader:
+            continue
+        a, b = paired_arrays(results, scores_by_template[leader])
+        stats = paired_bootstrap(a, b, n_boot, alpha, seed)
+        report.append({"template_id": tid, "leader": leader, **stats, "dominated": stats["high"] < 0})
+    return report
+
+_NORMAL = NormalDist()
+
+# O'Brien-Fleming형 alpha 소비 함수 (Lan-DeMets): 정보 비율 t까지 쓸 수 있는 누적 alpha
+# 초반 확인에는 거의 쓰지 않고 t=1에서 정확히 alpha
+def obrien_fleming_spent(t: float, alpha: float) -> float:
+    if t <= 0:
+        return 0.0
+    return 2 * (1 - _NORMAL.cdf(_NORMAL.inv_cdf(1 - alpha / 2) / math.sqrt(min(t, 1.0))))
+
+# ⏹️ 순차 검정 조기 종료: 리더 대비 F1 차이가 유의하게 0 미만이면 해당 템플릿 호출 중단
+# - 확인 시점의 정보 비율 t = (살아 있는 템플릿 중 최소 관측 행 수) / max_rows
+#   · 확인마다 alpha 소비 함수의 증가분만 사용 → 확인 횟수와 상관없이 전체 1종 오류 ≤ alpha
+#   · t가 늘지 않은 확인은 건너뛰고, t=1(max_rows)에 도달하면 더 확인하지 않음
+# - 리더는 데이터로 고르므로 "i가 j보다 나쁘다"는 모든 순서쌍(m(m-1)개, m = 살아 있는 템플릿 수)에
+#   Bonferroni 보정 → 실제로 리더보다 나쁘지 않은 템플릿이 하나라도 잘못 중단될 확률 ≤ alpha
+# - 판정 경계: ΔF1 + z(1 - 수준) × bootstrap 표준오차 < 0
+#   (수준이 1/n_boot보다 작아도 분위수 꼬리가 아니라 표준오차만 추정하므로 안정적)
+class SequentialStopper:
+    def __init__(self, max_rows: int, min_rows: int = 100, check_every: int = 50, n_boot: int = 2000,
+                 alpha: float = 0.05, seed: int = 0):
+        self.max_rows = max_rows
+        self.min_rows = min_rows
+        self.check_every = check_every
+        self.n_boot = n_boot
+        self.alpha = alpha
+        self.seed = seed
+        self.scores = defaultdict(list)
+        self.dominated = {}
+        self.spent = 0.0  # 지금까지 소비한 누적 alpha
+        self.looks = []
+
+    def is_dominated(self, template_id: str) -> bool:
+        return template_id in self.dominated
+
+    def observe(self, result: dict):
+        if not result or not result.get("target") or not is_scorable(result):
+            return
+        tid = result["template_id"]
+        recall, precision = score_row(result["input"], result["target"], result["prediction"])
+        self.scores[tid].append({"id": result["id"], "recall": recall, "precision": precision})
+        if len(self.scores[tid]) >= self.min_rows and len(self.scores[tid]) % self.check_every == 0:
+            self.check()
+
+    def check(self):
+        live = {t: s for t, s in self.scores.items() if t not in self.dominated and len(s) >= self.min_rows}
+        if len(live) < 2:
+            return
+        t = min(1.0, min(len(s) for s in live.values()) / self.max_rows)
+        spent = obrien_fleming_spent(t, self.alpha)
+        if spent <= self.spent:
+            return
+        level = (spent - self.spent) / (len(live) * (len(live) - 1))
+        self.spent = spent
+        z = _NORMAL.inv_cdf(1 - level)
+        self.looks.append({"t": round(t, 4), "level": level, "z": round(z, 3), "templates": len(live)})
+
+        for row in compare_templates(live, self.n_boot, self.alpha, self.seed):
+            bound = row["diff"] + z * row["se"]
+            if bound < 0 and row["n"] >= self.min_rows:
+                self.dominated[row["template_id"]] = {**row, "bound": round(bound, 4), "z": round(z, 3)}
+                print(f"⏹️ {row['template_id']} 조기 종료: {row['leader']} 대비 ΔF1={row['diff']} "
+                      f"(상한 {bound:.4f}, z={z:.2f}, t={t:.2f}, n={row['n']})")
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--results", type=str, default="data/results.jsonl")
+    parser.add_argument("--n-boot", type=int, default=2000)
+    parser.add_argument("--alpha", type=float, default=0.05)
+    args = parser.parse_args()
+
+    for r in compare_templates(load_row_scores(args.results), args.n_boot, args.alpha):
+        mark = "❌ 열세 확정" if r["dominated"] else "➖ 판정 보류"
+        print(f"- {r['template_id']} vs {r['leader']} | ΔF1={r['diff']} "
+              f"[{r['low']}, {r['high']}] n={r['n']} | {mark}")
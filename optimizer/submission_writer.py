@@ -0,0 +1,115 @@
+# optimizer/submission_writer.py
+
+import csv
+import io
+import json
+import os
+import time
+
+# 📝 순서 보존 스트리밍 제출 파일 작성기
+# - 완료 순서와 상관없이 put(index, row)로 넣으면, 0번부터 연속으로 채워진 구간만 CSV에 바로 기록
+# - 기록된 위치(next_index, 파일 바이트 오프셋)를 사이드카 체크포인트에 주기적으로 저장
+# - 중단 후 다시 열면 체크포인트 이후의 불완전한 꼬리를 잘라내고 next_index부터 이어서 작성
+# - 재정렬 버퍼에는 아직 앞 행을 기다리는 결과만 남으므로 메모리는 동시 실행 수에 비례
+# - meta: 호출하는 쪽 상태(예: 원문 대체 행 목록, JSON 직렬화 가능)를 체크포인트에 함께 저장 → 재개 시 복원
+class StreamingSubmissionWriter:
+    def __init__(self, path: str, fieldnames: list, checkpoint_path: str = None, run_key: str = None,
+                 checkpoint_every: int = 64, checkpoint_seconds: float = 5.0):
+        self.path = path
+        self.fieldnames = list(fieldnames)
+        self.checkpoint_path = checkpoint_path or path + ".ckpt.json"
+        self.run_key = run_key
+        self.checkpoint_every = checkpoint_every
+        self.checkpoint_seconds = checkpoint_seconds
+
+        self.pending = {}
+        self.next_index = 0
+        self.meta = {}
+        self._since_checkpoint = 0
+        self._last_checkpoint = time.monotonic()
+        self._buf = io.StringIO()
+        self._csv = csv.DictWriter(self._buf, fieldnames=self.fieldnames, extrasaction="ignore",
+                                   lineterminator="\n")
+
+        state = self._load_checkpoint()
+        if state is not None and os.path.exists(path) and os.path.getsize(path) >= state["offset"]:
+            self.next_index = state["next_index"]
+            self.meta = state.get("meta", {})
+            self._file = open(path, "r+b")
+            self._file.truncate(state["offset"])  # 체크포인트 이후에 쓰다 만 부분 제거
+            self._file.seek(state["offset"])
+        else:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self._file = open(path, "wb")
+            self._csv.writeheader()
+            self._write_buffer()
+            self._save_checkpoint()
+        self.resumed_from = self.next_index
+
+    def _load_checkpoint(self):
+        if not os.path.exists(self.checkpoint_path):
+            return None
+        try:
+            with open(self.checkpoint_path, encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if state.get("fieldnames") != self.fieldnames or state.get("run_key") != self.run_key:
+            return None
+        return state
+
+    def _save_checkpoint(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        state = {
+            "run_key": self.run_key,
+            "fieldnames": self.fieldnames,
+            "next_index": self.next_index,
+            "offset": self._file.tell(),
+            "meta": self.meta,
+        }
+        tmp_path = self.checkpoint_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f, ensure_ascii=False)
+        os.replace(tmp_path, self.checkpoint_path)
+        self._since_checkpoint = 0
+        self._last_checkpoint = time.monotonic()
+
+    def _write_buffer(self):
+        self._file.write(self._buf.getvalue().encode("utf-8"))
+        self._buf.seek(0)
+        self._buf.truncate()
+
+    # 이미 기록된 행(index < next_index)은 무시 → 재개 시 중복 호출 결과도 안전
+    def put(self, index: int, row: dict):
+        if index < self.next_index:
+            return
+        self.pending[index] = row
+        if index != self.next_index:
+            return
+
+        while self.next_index in self.pending:
+            self._csv.writerow(self.pending.pop(self.next_index))
+            self.next_index += 1
+            self._since_checkpoint += 1
+        self._write_buffer()
+
+        if (self._since_checkpoint >= self.checkpoint_every
+                or time.monotonic() - self._last_checkpoint >= self.checkpoint_seconds):
+            self._save_checkpoint()
+
+    def close(self, complete: bool = False):
+        if self._file.closed:
+            return
+        self._save_checkpoint()
+        self._file.close()
+        # 전체 작성이 끝났으면 체크포인트 삭제 (다음 실행은 새로 시작)
+        if complete and not self.pending and os.path.exists(self.checkpoint_path):
+            os.remove(self.checkpoint_path)
+
+    def __enter__(self):
+        return self
+
+    # 예외로 빠져나가면 체크포인트를 남겨 두어 다음 실행에서 재개
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,154 @@
+# optimizer/substitution_index.py
+
+import heapq
+import json
+import string
+from collections import Counter, defaultdict
+from optimizer.hangul import to_jamo
+from optimizer.evaluator import find_differences_with_offsets, is_scorable
+
+# 🏷️ 치환 유형
+SPACING = "띄어쓰기 오류"
+PUNCTUATION = "문장 부호 오류"
+JAMO = "자모 오타"
+LEXICAL = "어휘 오류"
+
+MISSED = "missed"  # 정답에는 있는데 모델이 못 고친 치환
+WRONG = "wrong"    # 모델이 잘못/불필요하게 한 치환
+
+PUNCT_CHARS = set(string.punctuation) | set("…·‘’“”")
+
+def _strip_punct(text: str) -> str:
+    return "".join(ch for ch in text if ch not in PUNCT_CHARS and not ch.isspace())
+
+def _edit_distance(a, b, limit: int) -> int:
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    prev = list(range(len(b) + 1))
+    for i, x in enumerate(a, 1):
+        cur = [i]
+        for j, y in enumerate(b, 1):
+            cur.append(min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (x != y)))
+        prev = cur
+    return prev[-1]
+
+# 🔍 (orig → corr) 치환 한 건의 유형 분류
+def classify_substitution(orig: str, corr: str, max_jamo_edits: int = 2) -> str:
+    if orig.replace(" ", "") == corr.replace(" ", ""):
+        return SPACING
+    if _strip_punct(orig) == _strip_punct(corr):
+        return PUNCTUATION
+    a, b = orig.replace(" ", ""), corr.replace(" ", "")
+    if a and b and len(a) == len(b) and _edit_distance(to_jamo(a), to_jamo(b), max_jamo_edits) <= max_jamo_edits:
+        return JAMO
+    return LEXICAL
+
+# 한 행에서 놓친 치환 / 잘못된 치환 추출 (이미 계산한 diff가 있으면 재사용)
+def mine_row(original: str, target: str, pred: str, diffs_og=None, diffs_op=None):
+    if diffs_og is None:
+        diffs_og = find_differences_with_offsets(original, target)
+    if diffs_op is None:
+        diffs_op = find_differences_with_offsets(original, pred)
+    golden = {d[2]: d for d in diffs_og}
+    predicted = {d[2]: d for d in diffs_op}
+
+    for start, (orig, corr, *_) in golden.items():
+        p = predicted.get(start)
+        if p is None or p[1] != corr:
+            yield MISSED, orig, corr
+    for start, (orig, corr, *_) in predicted.items():
+        g = golden.get(start)
+        if g is None or g[1] != corr:
+            yield WRONG, orig, corr
+
+class SubstitutionIndex:
+    def __init__(self):
+        self.counts = Counter()                      # (kind, type, orig, corr) → 빈도
+        self.by_template = defaultdict(Counter)      # template_id → 같은 키의 빈도
+        self.classify_cache = {}
+
+    def classify(self, orig: str, corr: str) -> str:
+        key = (orig, corr)
+        if key not in self.classify_cache:
+            self.classify_cache[key] = classify_substitution(orig, corr)
+        return self.classify_cache[key]
+
+    def add(self, template_id: str, kind: str, orig: str, corr: str, count: int = 1):
+        key = (kind, self.classify(orig, corr), orig, corr)
+        self.counts[key] += count
+        self.by_template[template_id][key] += count
+
+    def add_row(self, template_id: str, original: str, target: str, pred: str):
+        for kind, orig, corr in mine_row(original, target, pred):
+            self.add(template_id, kind, orig, corr)
+
+    # 📊 상위 N개 조회 (kind / 유형 / 템플릿으로 필터)
+    def top(self, n: int = 20, kind: str = None, error_type: str = None, template_id: str = None) -> list:
+        counts = self.by_template.get(template_id, Counter()) if template_id else self.counts
+        hits = (
+            (key, c) for key, c in counts.items()
+            if (kind is None or key[0] == kind) and (error_type is None or key[1] == error_type)
+        )
+        return [
+            {"kind": k, "error_type": t, "orig": o, "corr": c_, "count": c}
+            for (k, t, o, c_), c in heapq.nlargest(n, hits, key=lambda x: x[1])
+        ]
+
+    def type_totals(self, kind: str = None) -> Counter:
+        totals = Counter()
+        for (k, t, _, _), c in self.counts.items():
+            if kind is None or k == kind:
+                totals[t] += c
+        return totals
+
+    def save(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            for tid, counts in self.by_template.items():
+                for (kind, error_type, orig, corr), c in counts.items():
+                    f.write(json.dumps({
+                        "template_id": tid, "kind": kind, "error_type": error_type,
+                        "orig": orig, "corr": corr, "count": c
+                    }, ensure_ascii=False) + "\n")
+
+    @classmethod
+    def load(cls, path: str):
+        index = cls()
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                r = json.loads(line)
+                key = (r["kind"], r["error_type"], r["orig"], r["corr"])
+                index.classify_cache[(r["orig"], r["corr"])] = r["error_type"]
+                index.counts[key] += r["count"]
+                index.by_template[r["template_id"]][key] += r["count"]
+        return index
+
+# 📦 결과 파일 전체(모든 행 × 템플릿)로 인덱스 생성
+def build_substitution_index(results_paths) -> SubstitutionIndex:
+    if isinstance(results_paths, str):
+        results_paths = [results_paths]
+    index = SubstitutionIndex()
+    for path in results_paths:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                item = json.loads(line)
+                if item.get("target") and is_scorable(item):
+                    index.add_row(item["template_id"], item["input"], item["target"], item["prediction"])
+    return index
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--results", type=str, nargs="+", default=["data/results.jsonl"])
+    parser.add_argument("--out", type=str, default="data/substitution_index.jsonl")
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--kind", type=str, default=MISSED, choices=[MISSED, WRONG])
+    parser.add_argument("--type", type=str, default=None, choices=[SPACING, PUNCTUATION, JAMO, LEXICAL])
+    args = parser.parse_args()
+
+    index = build_substitution_index(args.results)
+    index.save(args.out)
+
+    print(f"📊 유형별 합계 ({args.kind}): {dict(index.type_totals(args.kind))}")
+    for r in index.top(args.top, args.kind, args.type):
+        print(f"- [{r['error_type']}] '{r['orig']}' → '{r['corr']}' × {r['count']}")
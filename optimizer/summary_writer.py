@@ -1,12 +1,11 @@
 import csv
-import json
+from optimizer.records import MemoryRecord, read_records
 
 def write_summary_csv(input_path="data/memory.jsonl", output_path="data/summary.csv"):
-    with open(input_path, encoding="utf-8") as f:
-        memory = [json.loads(line) for line in f]
+    memory = read_records(input_path, MemoryRecord)
 
     with open(output_path, "w", encoding="utf-8", newline="") as f:
-        writer = csv.DictWriter(f, fieldnames=memory[0].keys())
+        writer = csv.DictWriter(f, fieldnames=MemoryRecord.__slots__)
         writer.writeheader()
         for row in memory:
-            writer.writerow(row)
+            writer.writerow(row.to_dict())
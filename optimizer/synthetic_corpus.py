@@ -0,0 +1,83 @@
+# optimizer/synthetic_corpus.py
+
+import random
+from optimizer.hangul import compose, decompose
+
+# 🧪 평가기 벤치마크용 합성 한국어 교정 말뭉치 생성기
+# - cor_sentence: 어휘 목록에서 뽑은 정답 문장
+# - err_sentence: 띄어쓰기 제거 / 자모 오타 / 문장부호 누락을 주입한 문장
+# - prediction : 주입된 오류를 일부만 고치고, 가끔 불필요한 수정을 하는 가상의 모델 출력
+WORDS = [
+    "오늘", "수업", "시간에", "선생님이", "문제를", "설명해", "주셨는데", "정말", "이해가", "잘",
+    "됐어요", "내일", "시험", "기간이라", "공부를", "열심히", "해야", "할", "것", "같아요",
+    "학교", "생활이", "조금", "힘들지만", "친구들과", "함께", "있어서", "좋아요", "그런데", "왜",
+    "이렇게", "어려운", "걸까요", "수학", "학원에", "다녀왔는데", "숙제가", "너무", "많아요", "혹시",
+    "이", "방법이", "맞는지", "알려주실", "수", "있나요", "저는", "국어", "문학을", "좋아해서",
+    "매일", "책을", "읽어요", "다음", "주에", "발표가", "있는데", "준비를", "못", "했어요",
+]
+TERMINALS = [".", "?", "!"]
+
+# 자주 혼동하는 중성 (ㅐ↔ㅔ, ㅓ↔ㅗ, ㅜ↔ㅗ, ㅡ↔ㅜ)
+JUNG_CONFUSIONS = {1: 5, 5: 1, 4: 8, 8: 4, 13: 8, 18: 13}
+
+def jamo_typo(word: str, rng: random.Random) -> str:
+    positions = [i for i, ch in enumerate(word) if decompose(ch)]
+    if not positions:
+        return word
+    i = rng.choice(positions)
+    cho, jung, jong = decompose(word[i])
+    if jung in JUNG_CONFUSIONS and rng.random() < 0.6:
+        jung = JUNG_CONFUSIONS[jung]
+    else:
+        jong = 0 if jong else rng.choice([4, 8, 19, 21])  # 받침 탈락/추가 (ㄴ, ㄹ, ㅅ, ㅇ)
+    return word[:i] + compose(cho, jung, jong) + word[i + 1:]
+
+def make_sentence(n_tokens: int, rng: random.Random) -> list:
+    tokens = [rng.choice(WORDS) for _ in range(n_tokens)]
+    tokens[-1] += rng.choice(TERMINALS)
+    return tokens
+
+# 🔧 오류 주입: density = 토큰당 오류 확률
+def inject_errors(tokens: list, density: float, rng: random.Random) -> list:
+    out = []
+    i = 0
+    while i < len(tokens):
+        tok = tokens[i]
+        r = rng.random()
+        if r < density / 3 and i + 1 < len(tokens):
+            out.append(tok + tokens[i + 1])  # 띄어쓰기 제거
+            i += 2
+            continue
+        if r < 2 * density / 3:
+            tok = jamo_typo(tok, rng)  # 자모 오타
+        elif r < density and tok[-1] in TERMINALS:
+            tok = tok[:-1]  # 문장부호 누락
+        out.append(tok)
+        i += 1
+    return out
+
+def make_prediction(err_tokens: list, cor_tokens: list, fix_rate: float, noise: float, rng: random.Random) -> list:
+    if rng.random() < fix_rate:
+        pred = list(cor_tokens)
+    else:
+        pred = list(err_tokens)
+    if pred and rng.random() < noise:
+        j = rng.randrange(len(pred))
+        pred[j] = jamo_typo(pred[j], rng)  # 불필요한 수정 (false redundant)
+    return pred
+
+def generate_corpus(n_rows: int, min_len: int = 5, max_len: int = 20, density: float = 0.2,
+                    fix_rate: float = 0.7, noise: float = 0.1, seed: int = 42) -> list:
+    rng = random.Random(seed)
+    rows = []
+    for i in range(n_rows):
+        cor = make_sentence(rng.randint(min_len, max_len), rng)
+        err = inject_errors(cor, density, rng)
+        pred = make_prediction(err, cor, fix_rate, noise, rng)
+        rows.append({
+            "id": f"syn{i:07d}",
+            "err_sentence": " ".join(err),
+            "cor_sentence": " ".join(cor),
+            "prediction": " ".join(pred),
+        })
+    return rows
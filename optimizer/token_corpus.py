@@ -0,0 +1,140 @@
+# optimizer/token_corpus.py
+
+import hashlib
+import json
+import mmap
+import struct
+import sys
+from array import array
+
+# 🔢 정수 토큰 말뭉치
+# - 데이터셋의 모든 토큰을 정수 ID로 인터닝, 문장은 연속된 int32 버퍼로 저장
+# - 파일은 mmap으로 열어 여러 워커 프로세스가 같은 페이지를 공유
+# 파일 구조: MAGIC | header_len(u64) | header(JSON) | keys(u64 × n) | offsets(i64 × n+1) | tokens(i32 × m)
+MAGIC = b"MXTOKEN1"
+
+def sentence_key(text: str) -> int:
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little")
+
+class TokenCorpus:
+    def __init__(self, vocab: list, keys, offsets, tokens, mm=None):
+        self.vocab = vocab
+        self.keys = keys
+        self.offsets = offsets
+        self.tokens = tokens
+        self._mm = mm
+        self._sid_by_key = {k: i for i, k in enumerate(keys)}
+        self._vocab_index = None
+
+    # 🏗️ 문장 목록으로부터 말뭉치 생성 (중복 문장은 한 번만 저장)
+    @classmethod
+    def build(cls, sentences):
+        vocab_index, vocab = {}, []
+        keys, offsets, tokens = array("Q"), array("q", [0]), array("i")
+        seen = set()
+        for text in sentences:
+            if not text:
+                continue
+            key = sentence_key(text)
+            if key in seen:
+                continue
+            seen.add(key)
+            for tok in text.split():
+                tid = vocab_index.get(tok)
+                if tid is None:
+                    tid = vocab_index[tok] = len(vocab)
+                    vocab.append(tok)
+                tokens.append(tid)
+            keys.append(key)
+            offsets.append(len(tokens))
+        corpus = cls(vocab, keys, offsets, tokens)
+        corpus._vocab_index = vocab_index
+        return corpus
+
+    def save(self, path: str):
+        header = json.dumps({
+            "byteorder": sys.byteorder,
+            "n_sentences": len(self.keys),
+            "n_tokens": len(self.tokens),
+            "vocab": self.vocab,
+        }, ensure_ascii=False).encode("utf-8")
+        header += b" " * (-len(header) % 8)  # 이후 배열들을 8바이트 정렬
+        with open(path, "wb") as f:
+            f.write(MAGIC)
+            f.write(struct.pack("<Q", len(header)))
+            f.write(header)
+            f.write(self.keys.tobytes())
+            f.write(self.offsets.tobytes())
+            f.write(self.tokens.tobytes())
+
+    # 📂 mmap으로 열기 (토큰 배열은 복사 없이 memoryview로 참조)
+    @classmethod
+    def open(cls, path: str):
+        with open(path, "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if mm[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"Not a token corpus file: {path}")
+        (header_len,) = struct.unpack_from("<Q", mm, len(MAGIC))
+        pos = len(MAGIC) + 8
+        header = json.loads(bytes(mm[pos:pos + header_len]))
+        if header["byteorder"] != sys.byteorder:
+            raise ValueError(f"Token corpus was built on a {header['byteorder']}-endian machine: {path}")
+        pos += header_len
+
+        n, m = header["n_sentences"], header["n_tokens"]
+        view = memoryview(mm)
+        keys = view[pos:pos + 8 * n].cast("Q")
+        pos += 8 * n
+        offsets = view[pos:pos + 8 * (n + 1)].cast("q")
+        pos += 8 * (n + 1)
+        tokens = view[pos:pos + 4 * m].cast("i")
+        return cls(header["vocab"], keys, offsets, tokens, mm)
+
+    def __len__(self):
+        return len(self.keys)
+
+    # 문장 → 정수 토큰 리스트 (말뭉치에 없는 문장은 즉석에서 인터닝)
+    def tokens_of(self, text) -> list:
+        if not text:
+            return []
+        sid = self._sid_by_key.get(sentence_key(text))
+        if sid is not None:
+            return self.tokens[self.offsets[sid]:self.offsets[sid + 1]].tolist()
+        if self._vocab_index is None:
+            self._vocab_index = {tok: i for i, tok in enumerate(self.vocab)}
+        return [self._intern(tok) for tok in str(text).split()]
+
+    def _intern(self, tok: str) -> int:
+        tid = self._vocab_index.get(tok)
+        if tid is None:
+            tid = self._vocab_index[tok] = len(self.vocab)
+            self.vocab.append(tok)
+        return tid
+
+    def decode(self, token_ids) -> str:
+        return " ".join(self.vocab[t] for t in token_ids)
+
+# 📦 결과 파일(results.jsonl)의 input/target/prediction 문장을 모두 인터닝해 저장
+def build_token_corpus(results_path: str, corpus_path: str) -> TokenCorpus:
+    def sentences():
+        with open(results_path, encoding="utf-8") as f:
+            for line in f:
+                item = json.loads(line)
+                yield item.get("input")
+                yield item.get("target")
+                yield item.get("prediction")
+
+    corpus = TokenCorpus.build(sentences())
+    corpus.save(corpus_path)
+    return corpus
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--results", type=str, default="data/results.jsonl")
+    parser.add_argument("--out", type=str, default="data/token_corpus.bin")
+    args = parser.parse_args()
+
+    corpus = build_token_corpus(args.results, args.out)
+    print(f"✅ 문장 {len(corpus)}개 / 토큰 {len(corpus.tokens)}개 / 어휘 {len(corpus.vocab)}개 → {args.out}")
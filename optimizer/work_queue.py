@@ -0,0 +1,190 @@
+# optimizer/work_queue.py
+
+import asyncio
+import hashlib
+import json
+import os
+import socket
+import sqlite3
+import time
+import uuid
+from optimizer.retry_queue import write_dead_letters
+
+# 🗃️ SQLite 기반 내구성 작업 큐
+# - (job_id, template_id, row_id) 단위 작업을 여러 러너(머신/컨테이너)가 나눠 가져감
+#   · job_id는 실행 대상 행 집합으로 정함 (job_key) → 같은 큐 파일에 남은 이전 작업(다른 샘플/부분집합)과 섞이지 않음
+# - lease → ack 방식, lease 만료 시 자동으로 큐에 복귀
+# - 실패 결과는 retry_delay 후 다시 가져갈 수 있도록 반환, max_attempts회 시도 후에야 실패로 완료 처리
+#   (완료 처리한 러너 한 곳만 dead-letter에 기록 → 큐 모드에서는 이 시도 횟수가 유일한 재시도 계층)
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    job_id        TEXT NOT NULL DEFAULT '',
+    template_id   TEXT NOT NULL,
+    row_id        TEXT NOT NULL,
+    payload       TEXT NOT NULL,
+    state         TEXT NOT NULL DEFAULT 'pending',
+    lease_owner   TEXT,
+    lease_expires REAL,
+    attempts      INTEGER NOT NULL DEFAULT 0,
+    result        TEXT,
+    PRIMARY KEY (job_id, template_id, row_id)
+);
+CREATE INDEX IF NOT EXISTS idx_tasks_state ON tasks(job_id, state, lease_expires);
+"""
+
+def default_owner() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+# 같은 행 집합을 처리하는 러너끼리는 같은 job_id (순서 무관)
+def job_key(row_ids) -> str:
+    body = "\n".join(sorted(str(row_id) for row_id in row_ids))
+    return hashlib.sha256(body.encode("utf-8")).hexdigest()[:16]
+
+class WorkQueue:
+    def __init__(self, path: str, lease_seconds: float = 120.0, job_id: str = ""):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.job_id = job_id
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(tasks)")}
+        if columns and "job_id" not in columns:
+            self.conn.close()
+            raise RuntimeError(f"{path}: job_id가 없는 이전 형식의 큐 파일입니다 (새 경로를 사용하세요)")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    # ➕ 작업 등록 (이미 있는 작업은 무시 → 여러 러너가 동시에 등록해도 안전)
+    def enqueue(self, tasks):
+        rows = [
+            (self.job_id, template_id, str(row_id), json.dumps(payload, ensure_ascii=False))
+            for template_id, row_id, payload in tasks
+        ]
+        self.conn.execute("BEGIN IMMEDIATE")
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO tasks (job_id, template_id, row_id, payload) VALUES (?, ?, ?, ?)",
+            rows
+        )
+        self.conn.execute("COMMIT")
+
+    # ♻️ 만료된 lease는 다시 pending으로
+    def requeue_expired(self, now: float = None) -> int:
+        cur = self.conn.execute(
+            "UPDATE tasks SET state='pending', lease_owner=NULL, lease_expires=NULL "
+            "WHERE job_id=? AND state='leased' AND lease_expires < ?",
+            (self.job_id, now or time.time())
+        )
+        return cur.rowcount
+
+    # 📥 최대 n개의 작업을 원자적으로 lease
+    # template_ids가 주어지면 이 러너가 아는 템플릿의 작업만 가져감
+    # 재시도 대기 중인 작업(pending + lease_expires가 미래)은 대기 시간이 지나야 가져감
+    def lease(self, owner: str, n: int = 32, template_ids=None) -> list:
+        now = time.time()
+        where, params = self._template_filter(template_ids)
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            self.requeue_expired(now)
+            picked = self.conn.execute(
+                f"SELECT template_id, row_id, payload FROM tasks WHERE job_id=? AND state='pending' "
+                f"AND (lease_expires IS NULL OR lease_expires <= ?){where} LIMIT ?",
+                (self.job_id, now, *params, n)
+            ).fetchall()
+            self.conn.executemany(
+                "UPDATE tasks SET state='leased', lease_owner=?, lease_expires=?, attempts=attempts+1 "
+                "WHERE job_id=? AND template_id=? AND row_id=?",
+                [(owner, now + self.lease_seconds, self.job_id, t, r) for t, r, _ in picked]
+            )
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+        return [(t, r, json.loads(p)) for t, r, p in picked]
+
+    # ✅ 결과 보고 (자기 lease일 때만 반영, 만료 후 남이 가져간 작업은 무시)
+    def ack(self, owner: str, template_id: str, row_id, result: dict) -> bool:
+        cur = self.conn.execute(
+            "UPDATE tasks SET state='done', result=?, lease_owner=NULL, lease_expires=NULL "
+            "WHERE job_id=? AND template_id=? AND row_id=? AND state='leased' AND lease_owner=?",
+            (json.dumps(result, ensure_ascii=False), self.job_id, template_id, str(row_id), owner)
+        )
+        return cur.rowcount == 1
+
+    # ↩️ 처리 포기 → 큐로 반환 (delay초 동안은 누구도 다시 가져가지 않음)
+    def release(self, owner: str, template_id: str, row_id, delay: float = 0.0):
+        self.conn.execute(
+            "UPDATE tasks SET state='pending', lease_owner=NULL, lease_expires=? "
+            "WHERE job_id=? AND template_id=? AND row_id=? AND state='leased' AND lease_owner=?",
+            (time.time() + delay if delay else None, self.job_id, template_id, str(row_id), owner)
+        )
+
+    def attempts(self, template_id: str, row_id) -> int:
+        row = self.conn.execute(
+            "SELECT attempts FROM tasks WHERE job_id=? AND template_id=? AND row_id=?",
+            (self.job_id, template_id, str(row_id))
+        ).fetchone()
+        return row[0] if row else 0
+
+    def remaining(self, template_ids=None) -> int:
+        where, params = self._template_filter(template_ids)
+        return self.conn.execute(
+            f"SELECT COUNT(*) FROM tasks WHERE job_id=? AND state != 'done'{where}", (self.job_id, *params)
+        ).fetchone()[0]
+
+    @staticmethod
+    def _template_filter(template_ids):
+        if not template_ids:
+            return "", ()
+        template_ids = tuple(template_ids)
+        return f" AND template_id IN ({', '.join('?' * len(template_ids))})", template_ids
+
+    def results(self, template_ids=None) -> list:
+        rows = self.conn.execute(
+            "SELECT template_id, result FROM tasks WHERE job_id=? AND state='done' ORDER BY rowid", (self.job_id,)
+        ).fetchall()
+        return [
+            json.loads(result) for template_id, result in rows
+            if template_ids is None or template_id in template_ids
+        ]
+
+# 🔄 큐가 빌 때까지 lease → 처리 → ack 반복
+# handler(template_id, row_id, payload) → 결과 dict (None이면 release)
+# is_ok(result)가 거짓이면 retry_delay 후 다른 러너도 다시 가져갈 수 있게 반환, max_attempts번째 실패는 그대로 완료 처리
+# dead_letter_path가 주어지면 최종 실패를 ack한 러너가 한 번만 기록
+async def drain_queue(queue: WorkQueue, handler, owner: str = None, batch_size: int = 32, poll: float = 2.0,
+                      template_ids=None, is_ok=None, max_attempts: int = 3, retry_delay: float = 5.0,
+                      dead_letter_path: str = None) -> int:
+    owner = owner or default_owner()
+    is_ok = is_ok or (lambda result: result.get("status", "ok") == "ok")
+    dead = 0
+
+    async def process(template_id, row_id, payload):
+        nonlocal dead
+        try:
+            result = await handler(template_id, row_id, payload)
+        except Exception:
+            queue.release(owner, template_id, row_id)
+            raise
+        if result is None:
+            queue.release(owner, template_id, row_id)
+        elif not is_ok(result) and queue.attempts(template_id, row_id) < max_attempts:
+            queue.release(owner, template_id, row_id, retry_delay)
+        elif queue.ack(owner, template_id, row_id, result) and not is_ok(result):
+            dead += 1
+            if dead_letter_path:
+                write_dead_letters([result], dead_letter_path)
+
+    while True:
+        batch = queue.lease(owner, batch_size, template_ids)
+        if not batch:
+            if queue.remaining(template_ids) == 0:
+                break
+            await asyncio.sleep(poll)  # 다른 러너가 잡고 있거나 재시도 대기 중인 작업 → 완료/만료 대기
+            continue
+        await asyncio.gather(*(process(t, r, p) for t, r, p in batch))
+
+    if dead and dead_letter_path:
+        print(f"☠️ {max_attempts}회 시도 후에도 실패한 {dead}건 → {dead_letter_path}")
+    return dead
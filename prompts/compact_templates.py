@@ -0,0 +1,30 @@
+# compact_templates.py
+
+# ⚡ 캐스케이드 1단계용 짧은 템플릿 (대부분의 쉬운 문장은 여기서 끝남)
+COMPACT_SYSTEM_PROMPT = (
+    "너는 한국어 문장 교정기야. 오탈자, 띄어쓰기, 문장부호 오류만 고치고 의미·어투·어순은 그대로 둬.\n"
+    "- 원문에 없는 쉼표, 따옴표, 괄호는 넣지 마.\n"
+    "- 종결 부호가 없으면 문장 유형에 맞게 . ? ! 중 하나를 붙여.\n"
+    "- 설명이나 접두어 없이 교정된 문장 한 줄만 출력해."
+)
+
+COMPACT_TEMPLATES = [
+    {
+        "id": "compact_01",
+        "type": "multi-turn",
+        "template": [
+            {"role": "system", "content": COMPACT_SYSTEM_PROMPT},
+            {"role": "user", "content": "입력문장: {text}"}
+        ],
+        "description": "캐스케이드 1단계용 최소 규칙 템플릿"
+    },
+]
+
+# 🪜 캐스케이드: 짧은 템플릿 → 의심스러운 출력만 긴 템플릿으로 재요청
+def make_cascade(short_template: dict, full_template: dict) -> dict:
+    return {
+        "id": f"cascade__{short_template['id']}__{full_template['id']}",
+        "type": "cascade",
+        "stages": [short_template, full_template],
+        "description": f"{short_template['id']} 우선 실행, 의심 출력만 {full_template['id']}로 재교정"
+    }
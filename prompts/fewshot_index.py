@@ -0,0 +1,147 @@
+# prompts/fewshot_index.py
+
+import heapq
+import math
+import os
+import pickle
+import re
+from collections import Counter, defaultdict
+from functools import lru_cache
+
+# 🔎 문자 n-gram TF-IDF 기반 few-shot 예시 검색
+# - 학습 데이터의 (err_sentence, cor_sentence) 쌍을 색인
+# - 입력 문장과 가장 비슷한 k개 교정 예시만 프롬프트에 주입 → 고정 예시 목록 대비 프롬프트 단축
+FEWSHOT_INDEX_PATH = "data/fewshot_index.pkl"
+NGRAM_SIZES = (2, 3)
+EXAMPLE_LINE = re.compile(r"^- '[^']*' → '[^']*'\s*$")
+
+def char_ngrams(text: str, sizes=NGRAM_SIZES) -> Counter:
+    text = f" {text} "
+    grams = Counter()
+    for n in sizes:
+        for i in range(len(text) - n + 1):
+            grams[text[i:i + n]] += 1
+    return grams
+
+class FewShotIndex:
+    def __init__(self, examples: list, postings: dict, idf: dict, source: dict = None):
+        self.examples = examples  # [(err_sentence, cor_sentence), ...]
+        self.postings = postings  # gram → [(doc, weight), ...]
+        self.idf = idf
+        self.source = source or {}  # 색인을 만든 train.csv의 sha256/크기/수정 시각
+
+    # 🏗️ 색인 생성 (교정이 없는 쌍은 예시로 쓸 가치가 없어 제외)
+    @classmethod
+    def build(cls, pairs, max_df_ratio: float = 0.05):
+        examples = [(err, cor) for err, cor in pairs if err and cor and err != cor]
+        doc_grams = [char_ngrams(err) for err, _ in examples]
+
+        df = Counter()
+        for grams in doc_grams:
+            df.update(grams.keys())
+        n_docs = len(examples)
+        max_df = max(1, int(n_docs * max_df_ratio))
+        # 너무 흔한 n-gram은 변별력이 없고 조회만 느리게 하므로 제외
+        idf = {g: math.log((n_docs + 1) / (c + 1)) + 1 for g, c in df.items() if c <= max_df}
+
+        postings = defaultdict(list)
+        for doc, grams in enumerate(doc_grams):
+            weights = {g: tf * idf[g] for g, tf in grams.items() if g in idf}
+            norm = math.sqrt(sum(w * w for w in weights.values())) or 1.0
+            for g, w in weights.items():
+                postings[g].append((doc, w / norm))
+        return cls(examples, dict(postings), idf)
+
+    # 📥 입력과 코사인 유사도가 높은 k개 예시
+    # max_grams: 가중치가 큰(희귀한) n-gram만 사용해 조회 시간을 행당 수 ms로 제한
+    def query(self, text: str, k: int = 5, max_grams: int = 32) -> list:
+        grams = char_ngrams(text)
+        weights = {g: tf * self.idf[g] for g, tf in grams.items() if g in self.idf}
+        norm = math.sqrt(sum(w * w for w in weights.values())) or 1.0
+
+        scores = defaultdict(float)
+        for g, w in heapq.nlargest(max_grams, weights.items(), key=lambda x: x[1]):
+            qw = w / norm
+            for doc, dw in self.postings[g]:
+                scores[doc] += qw * dw
+
+        best = heapq.nlargest(k + 1, scores.items(), key=lambda x: x[1])
+        # 입력과 완전히 같은 오류 문장(정답 유출)은 제외
+        return [self.examples[doc] for doc, _ in best if self.examples[doc][0] != text][:k]
+
+    def save(self, path: str = FEWSHOT_INDEX_PATH):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "wb") as f:
+            pickle.dump((self.source, self.examples, self.postings, self.idf), f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, path: str = FEWSHOT_INDEX_PATH):
+        with open(path, "rb") as f:
+            data = pickle.load(f)
+        if len(data) == 3:  # 원본 정보가 없는 이전 형식
+            return cls(*data)
+        source, examples, postings, idf = data
+        return cls(examples, postings, idf, source)
+
+    # ✅ 색인을 만든 원본과 지금 train.csv가 같은지 (크기/수정 시각이 같으면 해시 계산 생략)
+    def matches_source(self, train_path: str) -> bool:
+        from optimizer.dataset_cache import file_sha256
+
+        if "sha256" not in self.source:
+            return False
+        stat = os.stat(train_path)
+        if self.source.get("size") == stat.st_size and self.source.get("mtime") == stat.st_mtime:
+            return True
+        return self.source["sha256"] == file_sha256(train_path)
+
+def build_fewshot_index(train_path: str = "data/train.csv", index_path: str = FEWSHOT_INDEX_PATH) -> FewShotIndex:
+    from optimizer.dataset_cache import file_sha256, load_dataset
+
+    stat = os.stat(train_path)
+    source = {"sha256": file_sha256(train_path), "size": stat.st_size, "mtime": stat.st_mtime}
+    view = load_dataset(train_path).view()
+    index = FewShotIndex.build(zip(view.column("err_sentence"), view.column("cor_sentence")))
+    index.source = source
+    index.save(index_path)
+    return index
+
+# 프로세스당 한 번만 로딩 (없거나 train.csv가 바뀌었으면 다시 생성)
+@lru_cache(maxsize=None)
+def get_fewshot_index(index_path: str = FEWSHOT_INDEX_PATH, train_path: str = "data/train.csv") -> FewShotIndex:
+    if os.path.exists(index_path):
+        index = FewShotIndex.load(index_path)
+        # train.csv 없이 색인만 배포된 경우는 그대로 사용
+        if not os.path.exists(train_path) or index.matches_source(train_path):
+            return index
+    return build_fewshot_index(train_path, index_path)
+
+# ✂️ 프롬프트에 고정으로 박힌 "- 'A' → 'B'" 예시 줄 제거
+def strip_fixed_examples(text: str) -> str:
+    return "\n".join(line for line in text.split("\n") if not EXAMPLE_LINE.match(line.strip()))
+
+def format_examples(examples: list, header: str = "📌 **참고 교정 예시**") -> str:
+    lines = [header] + [f"- '{err}' → '{cor}'" for err, cor in examples]
+    return "\n".join(lines) + "\n"
+
+# 💉 검색한 예시를 system 메시지 끝에 주입 (system이 없으면 첫 메시지 앞에 추가)
+def inject_examples(messages: list, examples: list) -> list:
+    if not examples:
+        return messages
+    block = format_examples(examples)
+    messages = [dict(m) for m in messages]
+    for m in messages:
+        if m["role"] == "system":
+            m["content"] = m["content"].rstrip("\n") + "\n\n" + block
+            return messages
+    return [{"role": "system", "content": block}] + messages
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--train", type=str, default="data/train.csv")
+    parser.add_argument("--out", type=str, default=FEWSHOT_INDEX_PATH)
+    args = parser.parse_args()
+
+    index = build_fewshot_index(args.train, args.out)
+    print(f"✅ 교정 예시 {len(index.examples)}개 / n-gram {len(index.idf)}개 색인 → {args.out}")
@@ -2,12 +2,30 @@
 
 from config import MAX_CHAR_LENGTH, FORBIDDEN_PHRASES, ALLOWED_ROLES
 from typing import Union, List, Dict
+import hashlib
+import json
 import re
 
-FORBIDDEN_PHRASES = [
-    "정답은", "수정된 문장", "→", "다음은", "수동", "참고자료", "위키백과", "설명드리자면"
-]
-ALLOWED_ROLES = {"system", "user"}
+# 🛑 거절 사유 코드
+TOO_LONG = "too_long"
+FORBIDDEN = "forbidden_phrase"
+BAD_ROLE = "bad_role"
+NO_USER = "no_user_turn"
+NO_PLACEHOLDER = "missing_placeholder"
+DUPLICATE = "duplicate"
+
+# validate_template(verbose=True) 출력용 라벨
+REASON_LABELS = {
+    TOO_LONG: "길이 초과",
+    FORBIDDEN: "금지 표현",
+    BAD_ROLE: "역할 오류",
+    NO_USER: "구성 오류",
+    NO_PLACEHOLDER: "자리표시자 누락",
+    DUPLICATE: "중복",
+}
+
+# 검증/중복 판단에 영향이 없는 필드
+IGNORED_FIELDS = ("id", "description")
 
 def extract_prompt_string(template: Union[str, List[Dict]]) -> str:
     if isinstance(template, str):
@@ -16,38 +34,158 @@ def extract_prompt_string(template: Union[str, List[Dict]]) -> str:
         return " ".join(turn.get("content", "") for turn in template)
     return ""
 
-def validate_template(template: Union[str, List[Dict]], verbose: bool = False) -> bool:
-    prompt_str = extract_prompt_string(template)
+# 금지 표현 전체를 하나의 정규식(리터럴 alternation)으로 한 번만 컴파일 → 한 번의 스캔으로 모든 일치 위치
+# - 빈 문자열은 모든 위치에 일치하므로 제외, 남는 표현이 없으면 None (금지 표현 검사 생략)
+def compile_phrases(phrases: List[str]):
+    phrases = sorted({p for p in phrases if p}, key=len, reverse=True)
+    if not phrases:
+        return None
+    return re.compile("|".join(re.escape(p) for p in phrases))
 
-    if len(prompt_str) > MAX_CHAR_LENGTH:
-        if verbose:
-            print("❌ [길이 초과] 템플릿이 2000자를 초과했습니다.")
-        return False
-
-    if any(phrase in prompt_str for phrase in FORBIDDEN_PHRASES):
-        if verbose:
-            print("❌ [금지 표현] 템플릿에 금지된 문구가 포함되어 있습니다.")
-        return False
+# 검사 순서대로 (코드, 메시지)를 하나씩 생성: 길이 → 금지 표현 → role → user 턴 → {text} 자리표시자
+# - 첫 사유만 필요하면 next()로 바로 중단, 일치한 금지 표현 목록(전체 스캔)은 detail일 때만 찾음
+def iter_reasons(template: Union[str, List[Dict]], prompt_str: str, pattern, max_chars: int = MAX_CHAR_LENGTH,
+                 allowed_roles=ALLOWED_ROLES, detail: bool = True):
+    if len(prompt_str) > max_chars:
+        yield TOO_LONG, f"템플릿이 {max_chars}자를 초과했습니다 ({len(prompt_str)}자)."
+    if pattern is not None and pattern.search(prompt_str):
+        found = f": {sorted(set(pattern.findall(prompt_str)))}" if detail else "."
+        yield FORBIDDEN, f"템플릿에 금지된 문구가 포함되어 있습니다{found}"
 
     if isinstance(template, list):  # ✅ multi-turn
-        roles = [t.get("role") for t in template]
-        if not set(roles).issubset(ALLOWED_ROLES):
-            if verbose:
-                print(f"❌ [역할 오류] 허용되지 않은 role이 포함됨: {set(roles) - ALLOWED_ROLES}")
-            return False
+        roles = {t.get("role") for t in template}
+        if not roles.issubset(allowed_roles):
+            yield BAD_ROLE, f"허용되지 않은 role이 포함됨: {roles - set(allowed_roles)}"
         if "user" not in roles:
-            if verbose:
-                print("❌ [구성 오류] user 역할이 포함되어 있지 않습니다.")
-            return False
+            yield NO_USER, "user 역할이 포함되어 있지 않습니다."
         if not any("{text}" in t.get("content", "") for t in template):  # ✅ 역할별로 검사
-            if verbose:
-                print("❌ [자리표시자 누락] 멀티턴 템플릿에 {{text}}가 포함되어 있지 않습니다.")
-            return False
-    else:  # ✅ single-turn
-        if "{text}" not in prompt_str:
-            if verbose:
-                print("❌ [자리표시자 누락] 템플릿에 {{text}}가 포함되어 있지 않습니다.")
-            return False
+            yield NO_PLACEHOLDER, "멀티턴 템플릿에 {text}가 포함되어 있지 않습니다."
+    elif "{text}" not in prompt_str:  # ✅ single-turn
+        yield NO_PLACEHOLDER, "템플릿에 {text}가 포함되어 있지 않습니다."
+
+_DEFAULT_PATTERN = compile_phrases(FORBIDDEN_PHRASES)
+
+try:
+    import orjson
+
+    def _raw_key(obj) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_SORT_KEYS)
+except ImportError:
+    def _raw_key(obj) -> bytes:
+        return json.dumps(obj, ensure_ascii=False, sort_keys=True).encode("utf-8")
+
+def validate_template(template: Union[str, List[Dict]], verbose: bool = False) -> bool:
+    reasons = iter_reasons(template, extract_prompt_string(template), _DEFAULT_PATTERN, detail=verbose)
+    reason = next(reasons, None)
+    if reason and verbose:
+        code, message = reason
+        print(f"❌ [{REASON_LABELS[code]}] {message}")
+    return reason is None
+
+# 🧬 세대 단위 일괄 검증 (자동 템플릿 탐색용)
+# - 후보는 템플릿 객체({"id", "template", ...}, 캐스케이드는 "stages") 또는 str/list 템플릿
+# - 내용 해시(id/설명 제외)로 중복 제거 → 같은 내용은 처음 것만 통과
+# - 금지 표현은 미리 컴파일한 정규식 하나로 후보당 한 번만 스캔 (일치한 표현 전부를 거절 사유로)
+# - 검증 결과는 내용 해시로 캐시 → 다음 세대에 살아남은 후보는 다시 검사하지 않음
+class PopulationValidator:
+    def __init__(self, max_chars: int = MAX_CHAR_LENGTH, forbidden: List[str] = FORBIDDEN_PHRASES,
+                 allowed_roles=ALLOWED_ROLES):
+        self.max_chars = max_chars
+        self.allowed_roles = set(allowed_roles)
+        self.pattern = compile_phrases(forbidden)
+        self.cache = {}
+        self.stats = {"checked": 0, "cached": 0, "duplicates": 0, "rejected": 0}
+
+    # id/설명을 뺀 내용 그대로의 해시 (공백/유니코드 정규화까지 같은 후보는 registry 플래너가 한 번만 호출)
+    @staticmethod
+    def content_hash(candidate) -> str:
+        if isinstance(candidate, dict):
+            candidate = {k: v for k, v in candidate.items() if k not in IGNORED_FIELDS}
+        return hashlib.sha256(_raw_key(candidate)).hexdigest()[:16]
+
+    @staticmethod
+    def _templates_of(candidate) -> list:
+        if isinstance(candidate, dict):
+            if "stages" in candidate:
+                return [stage["template"] for stage in candidate["stages"]]
+            return [candidate.get("template")]
+        return [candidate]
+
+    def _check(self, pending: dict) -> dict:
+        # pending: {content_hash: candidate} → {content_hash: [(코드, 메시지), ...]}
+        reasons = {}
+        for h, candidate in pending.items():
+            reasons[h] = []
+            for template in self._templates_of(candidate):
+                prompt_str = extract_prompt_string(template)  # 후보(단계)마다 한 번만
+                reasons[h].extend(iter_reasons(template, prompt_str, self.pattern, self.max_chars, self.allowed_roles))
+        return reasons
+
+    # → 입력 순서대로 {"index", "id", "hash", "ok", "reasons": [{"code", "message"}], "duplicate_of"}
+    def validate(self, candidates: list) -> list:
+        first_index, pending = {}, {}
+        hashes = [self.content_hash(c) for c in candidates]
+        for i, h in enumerate(hashes):
+            if h in first_index:
+                continue
+            first_index[h] = i
+            if h in self.cache:
+                self.stats["cached"] += 1
+            else:
+                pending[h] = candidates[i]
+        self.stats["checked"] += len(pending)
+        self.cache.update(self._check(pending))
+
+        report = []
+        for i, (candidate, h) in enumerate(zip(candidates, hashes)):
+            duplicate_of = first_index[h] if first_index[h] != i else None
+            if duplicate_of is not None:
+                self.stats["duplicates"] += 1
+                reasons = [(DUPLICATE, f"{duplicate_of}번 후보와 내용이 같습니다.")]
+            else:
+                reasons = self.cache[h]
+            if reasons:
+                self.stats["rejected"] += 1
+            report.append({
+                "index": i,
+                "id": candidate.get("id") if isinstance(candidate, dict) else None,
+                "hash": h,
+                "ok": not reasons,
+                "reasons": [{"code": code, "message": message} for code, message in reasons],
+                "duplicate_of": duplicate_of,
+            })
+        return report
+
+    # 통과한(중복 제거된) 후보만 → API로 보낼 목록
+    def accepted(self, candidates: list) -> list:
+        return [candidates[r["index"]] for r in self.validate(candidates) if r["ok"]]
+
+_default_validator = None
+
+def validate_population(candidates: list) -> list:
+    global _default_validator
+    if _default_validator is None:
+        _default_validator = PopulationValidator()
+    return _default_validator.validate(candidates)
+
+if __name__ == "__main__":
+    import argparse
+    from collections import Counter
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("path", type=str, help="후보 템플릿 JSON 배열 또는 jsonl 파일")
+    parser.add_argument("--verbose", action="store_true", help="거절된 후보별 사유 출력")
+    args = parser.parse_args()
 
-    return True
+    with open(args.path, encoding="utf-8") as f:
+        text = f.read()
+    candidates = json.loads(text) if text.lstrip().startswith("[") else [json.loads(l) for l in text.splitlines() if l.strip()]
 
+    report = validate_population(candidates)
+    accepted = sum(r["ok"] for r in report)
+    codes = Counter(reason["code"] for r in report for reason in r["reasons"])
+    print(f"🧬 후보 {len(report)}개 중 {accepted}개 통과 | 거절 사유: {dict(codes)}")
+    if args.verbose:
+        for r in report:
+            if not r["ok"]:
+                print(f"- #{r['index']} {r['id'] or r['hash']}: " + "; ".join(x["message"] for x in r["reasons"]))
@@ -0,0 +1,8 @@
+# tests/conftest.py
+# 실행: python -m pytest -q (저장소 루트에서)
+
+import os
+import sys
+
+# 모듈은 저장소 루트 기준으로 import (config, engine.*, optimizer.*, prompts.*)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
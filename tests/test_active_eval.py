@@ -0,0 +1,68 @@
+# tests/test_active_eval.py
+
+import random
+
+from optimizer.active_eval import ActiveEvaluator, full_ranking, simulate
+
+def _rows(n, seed=0):
+    rng = random.Random(seed)
+    rows = []
+    for i in range(n):
+        if i % 3 == 0:  # 무오류 문장
+            text = f"오늘 날씨가 좋습니다 {i}"
+            rows.append({"id": f"r{i}", "input": text, "target": text})
+        else:
+            words = ["저는", "학교에", "갔어요", "어제", "친구랑"][: rng.randint(3, 5)]
+            cor = " ".join(words) + f" {i}"
+            rows.append({"id": f"r{i}", "input": cor.replace("갔어요", "갓어요").replace("학교에", "학교애"),
+                         "target": cor})
+    return rows
+
+def _results(rows, template_id, correct_every):
+    # correct_every행마다 한 번 정답, 나머지는 입력 그대로
+    return [
+        {"template_id": template_id, "id": row["id"], "input": row["input"], "target": row["target"],
+         "prediction": row["target"] if i % correct_every == 0 else row["input"], "status": "ok"}
+        for i, row in enumerate(rows)
+    ]
+
+def test_seed_batch_is_stratified_and_unique():
+    rows = _rows(60)
+    evaluator = ActiveEvaluator(rows, ["a", "b"], seed_size=20)
+    batch = evaluator.next_batch()
+    assert len(batch) == 20 and len({r["id"] for r in batch}) == 20
+    assert len(evaluator.next_batch(limit=5)) == 5  # 관측 전 두 번째 호출도 시드 규칙
+    assert sum(len(ids) for ids in evaluator.pending.values()) == 35
+
+def test_observe_requeues_rows_with_missing_templates_once():
+    rows = _rows(10)
+    evaluator = ActiveEvaluator(rows, ["a", "b"], seed_size=10)
+    batch = evaluator.next_batch()
+    results = _results(batch, "a", 1) + _results(batch[1:], "b", 1)
+    evaluator.observe(results, len(results))
+    missing = batch[0]["id"]
+    assert missing not in evaluator.scores
+    assert missing in evaluator.pending[evaluator.cluster_of[missing]]
+
+    # 다시 실패하면 더 이상 대기열에 넣지 않음
+    evaluator.pending[evaluator.cluster_of[missing]].remove(missing)
+    evaluator.observe(_results([batch[0]], "a", 1), 1)
+    assert missing not in evaluator.pending[evaluator.cluster_of[missing]]
+    assert len(evaluator.scores) == 9
+
+def test_ranking_keeps_frozen_templates_at_their_rank():
+    evaluator = ActiveEvaluator(_rows(3), ["a", "b", "c", "d"])
+    evaluator.frozen = {"b": {"rank": 1}, "d": {"rank": 4}}
+    estimates = {"a": {"f1": 0.2}, "b": {"f1": 0.0}, "c": {"f1": 0.9}, "d": {"f1": 1.0}}
+    assert evaluator.ranking(estimates) == ["b", "c", "a", "d"]
+    assert evaluator.live() == ["a", "c"]
+
+def test_simulate_matches_full_ranking_with_fewer_calls():
+    rows = _rows(300)
+    results = _results(rows, "good", 1) + _results(rows, "mid", 2) + _results(rows, "bad", 7)
+    truth = full_ranking(results)
+    assert truth == ["good", "mid", "bad"]
+
+    evaluator = simulate(results, seed_size=30, batch_size=30, patience=2)
+    assert evaluator.history[-1]["ranking"] == truth
+    assert evaluator.calls < len(rows) * 3
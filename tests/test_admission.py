@@ -0,0 +1,103 @@
+# tests/test_admission.py
+
+import asyncio
+import sqlite3
+
+import pytest
+
+from engine.admission import AdmissionController, allocate, SUBMISSION, EXPERIMENT
+
+def test_allocate_gives_submission_most_of_capacity_under_contention():
+    assert allocate(10, {SUBMISSION: 20, EXPERIMENT: 20}) == {SUBMISSION: 9, EXPERIMENT: 1}
+
+def test_allocate_hands_unused_share_to_other_class():
+    assert allocate(10, {SUBMISSION: 0, EXPERIMENT: 20}) == {SUBMISSION: 0, EXPERIMENT: 10}
+    assert allocate(10, {SUBMISSION: 3, EXPERIMENT: 20}) == {SUBMISSION: 3, EXPERIMENT: 7}
+
+def test_allocate_never_exceeds_capacity_or_demand():
+    for capacity in range(1, 12):
+        for s in range(0, 12):
+            for e in range(0, 12):
+                limits = allocate(capacity, {SUBMISSION: s, EXPERIMENT: e})
+                assert sum(limits.values()) <= capacity
+                assert limits[SUBMISSION] <= s and limits[EXPERIMENT] <= e
+
+def test_cancelled_waiters_do_not_leak_slots(tmp_path):
+    async def main():
+        ac = AdmissionController(SUBMISSION, 4, str(tmp_path / "admission.sqlite"), poll=0.01)
+
+        async def use():
+            async with ac:
+                await asyncio.sleep(0.01)
+
+        try:
+            # 승인 전/승인 직후/사용 중 등 여러 시점에서 취소
+            for delay in (0, 0.001, 0.005, 0.01, 0.02):
+                tasks = [asyncio.create_task(use()) for _ in range(10)]
+                await asyncio.sleep(delay)
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+            await asyncio.sleep(0.05)
+            assert ac.inflight == 0
+            await asyncio.wait_for(ac.acquire(), 1.0)
+            ac.release()
+        finally:
+            ac.close()
+
+    asyncio.run(main())
+
+def test_cancel_after_grant_returns_slot(tmp_path):
+    async def main():
+        ac = AdmissionController(SUBMISSION, 1, str(tmp_path / "admission.sqlite"), poll=0.01)
+        try:
+            task = asyncio.create_task(ac.acquire())
+            # 입장 루프가 승인(set_result)까지 하도록 기다린 뒤 태스크가 재개되기 전에 취소
+            while ac.inflight == 0:
+                await asyncio.sleep(0)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+            assert ac.inflight == 0
+        finally:
+            ac.close()
+
+    asyncio.run(main())
+
+def test_database_errors_fail_waiters_instead_of_hanging(tmp_path, monkeypatch):
+    async def main():
+        ac = AdmissionController(SUBMISSION, 2, str(tmp_path / "admission.sqlite"), poll=0.01)
+
+        def broken(wanted):
+            raise sqlite3.DatabaseError("file is not a database")
+
+        monkeypatch.setattr(ac, "_admit", broken)
+        try:
+            with pytest.raises(sqlite3.DatabaseError):
+                await asyncio.wait_for(ac.acquire(), 1.0)
+        finally:
+            monkeypatch.undo()
+            ac.close()
+
+    asyncio.run(main())
+
+def test_locked_database_is_retried(tmp_path, monkeypatch):
+    async def main():
+        ac = AdmissionController(SUBMISSION, 2, str(tmp_path / "admission.sqlite"), poll=0.01)
+        admit = ac._admit
+        failures = [sqlite3.OperationalError("database is locked")] * 3
+
+        def flaky(wanted):
+            if failures:
+                raise failures.pop()
+            return admit(wanted)
+
+        monkeypatch.setattr(ac, "_admit", flaky)
+        try:
+            await asyncio.wait_for(ac.acquire(), 1.0)
+            ac.release()
+        finally:
+            monkeypatch.undo()
+            ac.close()
+
+    asyncio.run(main())
@@ -0,0 +1,83 @@
+# tests/test_async_runner.py
+
+import asyncio
+import random
+from collections import Counter
+
+import engine.api_client
+from engine.api_client import STATUS_OK
+from optimizer import async_runner
+from optimizer.deadline import DeadlinePlanner, STATUS_DEADLINE
+
+def _result(i, status):
+    return {"template_id": "t", "id": i, "input": "x", "prediction": "x", "target": "x", "status": status}
+
+class ListSink:
+    def __init__(self):
+        self.items = []
+
+    def put(self, item):
+        self.items.append(item)
+
+    def put_many(self, items):
+        self.items.extend(items)
+
+def test_retry_failed_orders_ok_rows_first_when_deadline_expired():
+    results = [_result(0, "failed"), _result(1, STATUS_OK), _result(2, STATUS_DEADLINE), _result(3, STATUS_OK)]
+    planner = DeadlinePlanner(0, reserve=0)
+    final = asyncio.run(async_runner.retry_failed(results, [], planner))
+    assert [r["id"] for r in final] == [1, 3, 2, 0]
+
+def test_retry_failed_without_failures_keeps_same_order():
+    results = [_result(0, STATUS_DEADLINE), _result(1, STATUS_OK)]
+    final = asyncio.run(async_runner.retry_failed(results, []))
+    assert [r["id"] for r in final] == [1, 0]
+
+def test_run_rows_sink_gets_every_cell_once_under_deadline(monkeypatch):
+    rng = random.Random(0)
+
+    async def fake_run_single(template, row):
+        await asyncio.sleep(rng.uniform(0, 0.02))
+        status = "failed" if rng.random() < 0.3 else STATUS_OK
+        return {**_result(row["id"], status), "template_id": template["id"]}
+
+    monkeypatch.setattr(async_runner, "run_single", fake_run_single)
+    monkeypatch.setattr(engine.api_client, "get_api_keys", lambda: ["k"])
+
+    data = [{"id": i, "input": "x", "target": "x"} for i in range(200)]
+    templates = [{"id": "a"}, {"id": "b"}]
+    sink = ListSink()
+    planner = DeadlinePlanner(0.3, reserve=0)
+    final = asyncio.run(async_runner.run_rows(data, templates, sink=sink, planner=planner))
+
+    cells = Counter((r["template_id"], r["id"]) for r in sink.items)
+    assert len(cells) == len(data) * len(templates)
+    assert set(cells.values()) == {1}
+    assert len(final) == len(sink.items)
+    assert any(r["status"] == STATUS_DEADLINE for r in final)  # 마감이 실제로 걸린 실행인지
+
+def test_queue_mode_relies_on_queue_attempts_only(tmp_path, monkeypatch):
+    import optimizer.work_queue as work_queue
+
+    monkeypatch.chdir(tmp_path)
+    calls = Counter()
+
+    async def failing_run_single(template, row):
+        calls[row["id"]] += 1
+        return {**_result(row["id"], "failed"), "template_id": template["id"]}
+
+    async def no_second_layer(*args, **kwargs):
+        raise AssertionError("queue mode must not run retry_failed")
+
+    drain_queue = work_queue.drain_queue
+    monkeypatch.setattr(work_queue, "drain_queue", lambda *a, **k: drain_queue(*a, **k, poll=0.01, retry_delay=0))
+    monkeypatch.setattr(async_runner, "run_single", failing_run_single)
+    monkeypatch.setattr(async_runner, "retry_failed", no_second_layer)
+
+    data = [{"id": f"r{i}", "input": "x", "target": "x"} for i in range(4)]
+    results = asyncio.run(async_runner.run_from_queue(str(tmp_path / "q.sqlite"), data, [{"id": "a"}]))
+    assert sorted(r["id"] for r in results) == [f"r{i}" for i in range(4)]
+    assert all(r["status"] == "failed" for r in results)
+    assert set(calls.values()) == {3}
+    with open("data/dead_letter.jsonl", encoding="utf-8") as f:
+        assert len(f.readlines()) == 4
@@ -0,0 +1,65 @@
+# tests/test_cassette.py
+
+import asyncio
+
+import pytest
+
+from engine import api_client
+from engine.cassette import Cassette, CassetteMiss, ReplayedError, RECORD, REPLAY
+
+PAYLOAD = {"model": "m", "messages": [{"role": "user", "content": "안녕"}]}
+
+class RateLimited(Exception):
+    status_code = 429
+
+def _record(path):
+    async def main():
+        cassette = Cassette(path, RECORD, meta={"keys": 2})
+        outcomes = [RateLimited("Error code: 429 - rate limited"), ("교정 결과", {"x-request-id": "1"})]
+
+        async def send():
+            outcome = outcomes.pop(0)
+            if isinstance(outcome, Exception):
+                raise outcome
+            return outcome
+
+        with pytest.raises(RateLimited):
+            await cassette.call(PAYLOAD, send)
+        assert await cassette.call(PAYLOAD, send) == "교정 결과"
+        cassette.close()
+
+    asyncio.run(main())
+
+def test_replay_reproduces_recorded_errors_then_responses(tmp_path):
+    path = str(tmp_path / "calls.jsonl")
+    _record(path)
+
+    async def main():
+        cassette = Cassette(path, REPLAY, speed=0)
+        assert cassette.header["keys"] == 2
+        with pytest.raises(ReplayedError, match="429"):
+            await cassette.call(PAYLOAD, None)
+        assert await cassette.call(PAYLOAD, None) == "교정 결과"
+        # 기록보다 많이 오면 마지막 성공 응답 재사용
+        assert await cassette.call(PAYLOAD, None) == "교정 결과"
+        with pytest.raises(CassetteMiss):
+            await cassette.call({**PAYLOAD, "model": "other"}, None)
+        return cassette.summary()
+
+    summary = asyncio.run(main())
+    assert summary["reused"] == 1 and summary["misses"] == 1 and summary["errors"] == 1
+
+def test_cassette_replaying_flag(tmp_path, monkeypatch):
+    path = str(tmp_path / "calls.jsonl")
+    _record(path)
+    # 재생 설정이 바꾸는 모듈 전역(키/클라이언트/스트리밍)은 테스트 후 원래대로
+    for name in ("_api_keys", "_concurrency", "_clients", "_client_cycle", "_streaming"):
+        monkeypatch.setattr(api_client, name, getattr(api_client, name))
+    try:
+        assert not api_client.cassette_replaying()
+        api_client.configure_cassette(path, REPLAY, 0)
+        assert api_client.cassette_replaying()
+        assert api_client.get_api_keys() == ["replay-key-0", "replay-key-1"]
+    finally:
+        api_client.close_cassette()
+    assert not api_client.cassette_replaying()
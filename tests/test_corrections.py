@@ -0,0 +1,82 @@
+# tests/test_corrections.py
+
+import asyncio
+import os
+from collections import Counter
+
+import pytest
+
+from engine.api_client import STATUS_OK
+from optimizer import corrections
+from optimizer.corrections import correct_all, stream_corrections
+
+TEMPLATE = {"id": "t", "template": "교정: {text}"}
+
+@pytest.fixture
+def calls(monkeypatch):
+    state = {"calls": Counter(), "active": 0, "fail": set(), "slow_from": None}
+
+    async def fake_run_single(template_obj, row):
+        state["calls"][row["input"]] += 1
+        state["active"] += 1
+        try:
+            slow = state["slow_from"] is not None and row["id"] >= state["slow_from"]
+            await asyncio.sleep(10 if slow else 0.01)
+        finally:
+            state["active"] -= 1
+        failed = row["input"] in state["fail"]
+        return {"template_id": template_obj["id"], "id": row["id"], "input": row["input"],
+                "prediction": None if failed else row["input"] + ".", "status": "failed" if failed else STATUS_OK}
+
+    monkeypatch.setattr(corrections, "run_single", fake_run_single)
+    monkeypatch.setattr(corrections, "get_api_keys", lambda: ["k"])
+    return state
+
+def test_duplicates_are_coalesced_and_cached(calls):
+    rows = ["가", "가", "나", "가"]
+    assert asyncio.run(correct_all(rows, TEMPLATE, concurrency=4)) == {0: "가.", 1: "가.", 2: "나.", 3: "가."}
+    assert calls["calls"] == {"가": 1, "나": 1}  # 처리 중인 같은 문장은 결과를 기다림
+
+    calls["calls"].clear()
+    asyncio.run(correct_all([("a", "다"), ("b", "라"), ("c", "다")], TEMPLATE, concurrency=1))
+    assert calls["calls"] == {"다": 1, "라": 1}  # 끝난 문장은 캐시에서
+
+def test_failures_fall_back_to_input_quietly(calls, tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    calls["fail"] = {"나"}
+    results = asyncio.run(correct_all(["가", "나"], TEMPLATE, with_status=True, retry_delay=0.01))
+    assert results == {0: ("가.", STATUS_OK), 1: ("나", "failed")}
+    assert calls["calls"]["나"] == 3  # 첫 호출 + 기본 재시도 2회
+    assert capsys.readouterr().out == ""
+    assert not os.path.exists("data")  # dead-letter 경로를 주지 않으면 파일을 만들지 않음
+
+    dead_letter = str(tmp_path / "dead.jsonl")
+    asyncio.run(correct_all(["나"], TEMPLATE, retry_rounds=1, retry_delay=0, dead_letter_path=dead_letter))
+    with open(dead_letter, encoding="utf-8") as f:
+        assert len(f.readlines()) == 1
+
+def test_backpressure_and_cancellation_on_break(calls):
+    calls["slow_from"] = 3  # 3번째 행부터는 break 시점에 아직 호출 중
+    fed = []
+
+    def endless():
+        i = 0
+        while True:
+            fed.append(i)
+            yield f"문장 {i}"
+            i += 1
+
+    async def main():
+        seen = 0
+        async for _ in stream_corrections(endless(), TEMPLATE, concurrency=2, buffer=2):
+            seen += 1
+            if seen == 3:
+                break
+        await asyncio.sleep(0.05)  # 버려진 async generator 정리(aclose) 대기
+        return len(fed)
+
+    fed_after_break = asyncio.run(main())
+    # 읽은 행 ≤ 소비 3 + 출력 큐 2 + 작업 중 2 + 입력 큐 2 + 넣는 중 1
+    assert fed_after_break <= 10
+    assert calls["active"] == 0  # 진행 중이던 호출은 취소됨
+    assert sum(calls["calls"].values()) <= 8
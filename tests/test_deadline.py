@@ -0,0 +1,54 @@
+# tests/test_deadline.py
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from optimizer.deadline import DeadlinePlanner, deadline_end, parse_deadline
+
+NOW = datetime(2026, 10, 20, 8, 0, tzinfo=timezone(timedelta(hours=9)))
+
+@pytest.mark.parametrize("value, seconds", [
+    ("5400", 5400), ("90m", 5400), ("1h30m", 5400), ("45s", 45), ("1.5h", 5400),
+])
+def test_durations(value, seconds):
+    assert parse_deadline(value, NOW) == seconds
+
+def test_clock_time_today_and_tomorrow():
+    assert parse_deadline("09:30", NOW) == 90 * 60
+    assert parse_deadline("07:00", NOW) == 23 * 3600  # 이미 지난 시각 → 다음 날
+
+def test_iso_with_and_without_offset():
+    assert parse_deadline("2026-10-20T09:00+09:00", NOW) == 3600
+    assert parse_deadline("2026-10-20T00:00+00:00", NOW) == 3600
+    naive = datetime.now() + timedelta(hours=2)
+    assert parse_deadline(naive.isoformat(timespec="seconds")) == pytest.approx(7200, abs=5)
+
+@pytest.mark.parametrize("value", ["2026-10-20T07:00+09:00", "2026-10-20T08:00+09:00", "0", "0m", "soon", "25:00"])
+def test_invalid_or_past_deadlines_raise_value_error(value):
+    with pytest.raises(ValueError):
+        parse_deadline(value, NOW)
+
+def test_planner_switches_down_the_ladder_when_behind(monkeypatch):
+    clock = [0.0]
+    monkeypatch.setattr("optimizer.deadline.time.monotonic", lambda: clock[0])
+    planner = DeadlinePlanner(100, total=1000, ladder=["full", "compact"], reserve=0, min_samples=10)
+    assert planner.current() == "full"
+    for _ in range(20):  # 초당 1행 → 남은 980행에 980초 필요, 남은 시간은 80초
+        clock[0] += 1
+        planner.observe()
+    assert planner.current() == "compact"
+    assert planner.switches[0]["from"] == "full"
+    clock[0] = 100
+    assert planner.expired()
+
+def test_deadline_end_includes_setup_time(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr("optimizer.deadline.time.monotonic", lambda: clock[0])
+    end = deadline_end("09:00", NOW)  # 파싱 시점 기준 3600초 뒤
+    assert end == 4600.0
+    clock[0] += 600  # 데이터 로딩/토큰 수 확인 등 준비 시간
+    planner = DeadlinePlanner(end=end, reserve=0)
+    assert planner.time_left() == 3000.0
+    clock[0] = end
+    assert planner.expired()
@@ -0,0 +1,52 @@
+# tests/test_fewshot_index.py
+
+import os
+import pickle
+
+from prompts.fewshot_index import FewShotIndex, get_fewshot_index
+
+def _write_train(path, pairs, mtime):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("id,err_sentence,cor_sentence\n")
+        for i, (err, cor) in enumerate(pairs):
+            f.write(f"r{i},{err},{cor}\n")
+    os.utime(path, (mtime, mtime))
+
+def _load(index_path, train_path):
+    get_fewshot_index.cache_clear()
+    try:
+        return get_fewshot_index(index_path, train_path)
+    finally:
+        get_fewshot_index.cache_clear()
+
+def test_index_is_rebuilt_when_train_csv_changes(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # 데이터셋 캐시(data/.cache)도 임시 폴더에
+    train, index_path = "train.csv", "index.pkl"
+    _write_train(train, [("안녕하세여", "안녕하세요")], mtime=1_000_000)
+    first = _load(index_path, train)
+    assert first.examples == [("안녕하세여", "안녕하세요")]
+    assert first.source["size"] == os.path.getsize(train)
+
+    # 같은 파일 → 저장된 색인 재사용
+    assert _load(index_path, train).examples == first.examples
+
+    # 내용이 바뀌면 해시 불일치로 다시 생성
+    _write_train(train, [("감사함니다", "감사합니다")], mtime=1_500_000)
+    assert _load(index_path, train).examples == [("감사함니다", "감사합니다")]
+
+    # 수정 시각만 바뀌고 내용이 같으면 해시가 같으므로 재생성하지 않음
+    before = os.path.getmtime(index_path)
+    os.utime(train, (2_000_000, 2_000_000))
+    assert _load(index_path, train).examples == [("감사함니다", "감사합니다")]
+    assert os.path.getmtime(index_path) == before
+
+def test_legacy_index_without_source_is_rebuilt(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    _write_train("train.csv", [("되요", "돼요")], mtime=1_000_000)
+    with open("index.pkl", "wb") as f:
+        pickle.dump(([("옛날", "예시")], {}, {}), f)
+    assert FewShotIndex.load("index.pkl").source == {}
+    assert _load("index.pkl", "train.csv").examples == [("되요", "돼요")]
+    # train.csv 없이 색인만 있으면 그대로 사용
+    os.remove("train.csv")
+    assert _load("index.pkl", "train.csv").examples == [("되요", "돼요")]
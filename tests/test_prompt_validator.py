@@ -0,0 +1,46 @@
+# tests/test_prompt_validator.py
+
+import pytest
+
+from prompts.prompt_validator import (
+    DUPLICATE, FORBIDDEN, NO_PLACEHOLDER, NO_USER, TOO_LONG,
+    PopulationValidator, compile_phrases, validate_template,
+)
+
+@pytest.mark.parametrize("template, label", [
+    ("가" * 2001 + "{text}", "길이 초과"),
+    ("정답은 {text}", "금지 표현"),
+    ([{"role": "assistant", "content": "{text}"}, {"role": "user", "content": "x"}], "역할 오류"),
+    ([{"role": "system", "content": "{text}"}], "구성 오류"),
+    ([{"role": "user", "content": "교정하세요"}], "자리표시자 누락"),
+    ("교정하세요", "자리표시자 누락"),
+])
+def test_validate_template_prints_korean_labels(template, label, capsys):
+    assert not validate_template(template, verbose=True)
+    assert capsys.readouterr().out.startswith(f"❌ [{label}] ")
+
+def test_validate_template_accepts_valid_template(capsys):
+    assert validate_template([{"role": "system", "content": "교정"}, {"role": "user", "content": "{text}"}], verbose=True)
+    assert capsys.readouterr().out == ""
+
+def test_empty_phrase_list_matches_nothing():
+    assert compile_phrases([]) is None
+    assert compile_phrases([""]) is None
+    validator = PopulationValidator(forbidden=[])
+    assert validator.validate(["아무 문장 {text}"])[0]["ok"]
+
+def test_population_reports_all_reasons_and_duplicates():
+    validator = PopulationValidator(max_chars=20)
+    report = validator.validate([
+        {"id": "a", "template": "정답은 다음은 아주 긴 템플릿입니다 교정"},
+        {"id": "b", "template": "{text} 교정"},
+        {"id": "c", "description": "복사본", "template": "{text} 교정"},
+        {"id": "d", "type": "cascade", "stages": [{"template": "{text}"}, {"template": [{"role": "system", "content": "{text}"}]}]},
+    ])
+    codes = [[reason["code"] for reason in r["reasons"]] for r in report]
+    assert codes == [[TOO_LONG, FORBIDDEN, NO_PLACEHOLDER], [], [DUPLICATE], [NO_USER]]
+    assert "다음은" in report[0]["reasons"][1]["message"]
+    assert report[2]["duplicate_of"] == 1
+
+    validator.validate([{"id": "b2", "template": "{text} 교정"}])
+    assert validator.stats["cached"] == 1
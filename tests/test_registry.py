@@ -0,0 +1,50 @@
+# tests/test_registry.py
+
+from engine.api_client import STATUS_OK
+from optimizer.registry import ExperimentRegistry, template_hash
+
+DATA = [{"id": f"r{i}", "input": f"문장 {i}", "target": f"문장 {i}."} for i in range(4)]
+
+def _run(cells, failed_rows=()):
+    return [
+        {"template_id": t["id"], "id": row["id"], "input": row["input"], "prediction": row["target"],
+         "target": row["target"], "status": "failed" if row["id"] in failed_rows else STATUS_OK}
+        for t, row in cells
+    ]
+
+def test_plan_only_returns_missing_cells_and_retries_failures(tmp_path):
+    registry = ExperimentRegistry(str(tmp_path / "registry.sqlite"))
+    try:
+        templates = [{"id": "a", "template": "A {text}"}, {"id": "b", "template": "B {text}"}]
+        cells = registry.plan(templates, "ds", DATA)
+        assert len(cells) == 8
+        assert {t["id"] for t, _ in cells} == {template_hash(t) for t in templates}
+
+        registry.record("ds", _run(cells, failed_rows={"r3"}))
+        missing = registry.plan(templates, "ds", DATA)
+        assert sorted((t["id"], row["id"]) for t, row in missing) == sorted(
+            (template_hash(t), "r3") for t in templates
+        )
+        # 다른 데이터셋 해시는 별개
+        assert len(registry.plan(templates, "other", DATA)) == 8
+    finally:
+        registry.close()
+
+def test_plan_dedupes_normalized_content_and_collect_uses_current_ids(tmp_path):
+    registry = ExperimentRegistry(str(tmp_path / "registry.sqlite"))
+    try:
+        original = {"id": "old", "template": "교정: {text}"}
+        registry.record("ds", _run(registry.plan([original], "ds", DATA)))
+
+        # id/설명/줄끝 공백만 다른 템플릿 → 새 호출 없음, 결과는 새 id로
+        renamed = {"id": "new", "description": "x", "template": "교정: {text}   \r\n"}
+        duplicate = {"id": "copy", "template": "교정: {text}"}
+        assert registry.plan([renamed, duplicate], "ds", DATA) == []
+        collected = registry.collect([renamed], "ds", DATA[:2])
+        assert [(r["template_id"], r["id"]) for r in collected] == [("new", "r0"), ("new", "r1")]
+
+        # 한 글자라도 바뀌면 새 템플릿
+        changed = {"id": "new", "template": "교정:  {text}"}
+        assert len(registry.plan([changed], "ds", DATA)) == 4
+    finally:
+        registry.close()
@@ -0,0 +1,90 @@
+# tests/test_service.py
+
+import asyncio
+import gc
+
+from engine.api_client import STATUS_OK
+from engine.service import CorrectionService
+
+TEMPLATES = {"t": {"id": "t", "template": "교정: {text}"}}
+
+def _service(call_fn, **kwargs):
+    return CorrectionService(templates=TEMPLATES, default_template="t", call_fn=call_fn, **kwargs)
+
+def test_coalesces_duplicates_and_keeps_resolve_tasks_alive():
+    calls = []
+
+    async def call_fn(messages):
+        calls.append(messages)
+        await asyncio.sleep(0.01)
+        gc.collect()  # 참조 없는 태스크였다면 여기서 사라질 수 있음
+        return "교정됨", STATUS_OK
+
+    async def main():
+        service = _service(call_fn)
+        try:
+            results = await service.correct_many(["a", "a", "b"])
+            assert not service._tasks  # 끝난 태스크는 집합에서 빠짐
+            return results, service.snapshot()
+        finally:
+            await service.stop()
+
+    results, snapshot = asyncio.run(main())
+    assert [r["corrected"] for r in results] == ["교정됨"] * 3
+    assert [r["coalesced"] for r in results] == [False, True, False]
+    assert len(calls) == 2 and snapshot["upstream_calls"] == 2
+
+def test_idle_tenants_are_evicted():
+    async def call_fn(messages):
+        await asyncio.sleep(0)
+        return "ok", STATUS_OK
+
+    async def main():
+        service = _service(call_fn, tenant_concurrency=1)
+        try:
+            await asyncio.gather(*(service.correct(f"문장 {i}", tenant=f"tenant-{i}") for i in range(50)))
+            return service.snapshot()
+        finally:
+            await service.stop()
+
+    snapshot = asyncio.run(main())
+    assert snapshot["tenants"] == 0
+    assert snapshot["requests"] == 50
+
+def test_tenant_limit_is_shared_while_requests_are_active():
+    active = {"now": 0, "peak": 0}
+
+    async def call_fn(messages):
+        active["now"] += 1
+        active["peak"] = max(active["peak"], active["now"])
+        await asyncio.sleep(0.01)
+        active["now"] -= 1
+        return "ok", STATUS_OK
+
+    async def main():
+        service = _service(call_fn, tenant_concurrency=2)
+        try:
+            await asyncio.gather(*(service.correct(f"문장 {i}", tenant="x") for i in range(6)))
+        finally:
+            await service.stop()
+
+    asyncio.run(main())
+    assert active["peak"] == 2
+
+def test_stop_cancels_pending_upstream_calls():
+    async def call_fn(messages):
+        await asyncio.sleep(10)
+        return "늦음", STATUS_OK
+
+    async def main():
+        service = _service(call_fn)
+        request = asyncio.create_task(service.correct("a"))
+        await asyncio.sleep(0.05)
+        assert len(service._tasks) == 1
+        await service.stop()
+        await asyncio.gather(request, return_exceptions=True)
+        return request, service
+
+    request, service = asyncio.run(main())
+    assert request.cancelled()
+    assert not service._tasks and not service._inflight and not service._tenants
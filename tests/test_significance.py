@@ -0,0 +1,45 @@
+# tests/test_significance.py
+
+import numpy as np
+import pytest
+
+from optimizer.significance import SequentialStopper, obrien_fleming_spent
+
+def _feed(stopper, probs, rows, seed):
+    # 템플릿별 (recall, precision) 성공 확률로 행 점수를 만들어 observe와 같은 시점에 check
+    rng = np.random.default_rng(seed)
+    for n in range(1, rows + 1):
+        for tid, p in probs.items():
+            stopper.scores[tid].append({"id": n, "recall": float(rng.random() < p), "precision": float(rng.random() < p)})
+        if n >= stopper.min_rows and n % stopper.check_every == 0:
+            stopper.check()
+
+def test_obrien_fleming_spending_is_monotone_and_ends_at_alpha():
+    spent = [obrien_fleming_spent(t, 0.05) for t in (0, 0.25, 0.5, 0.75, 1.0, 1.5)]
+    assert spent[0] == 0.0
+    assert spent == sorted(spent)
+    assert spent[1] < 0.001  # 초반 확인에는 거의 쓰지 않음
+    assert spent[4] == pytest.approx(0.05)
+    assert spent[5] == spent[4]
+
+def test_equal_templates_are_not_dropped(capsys):
+    dropped = 0
+    for seed in range(10):
+        stopper = SequentialStopper(max_rows=300, n_boot=300, seed=seed)
+        _feed(stopper, {"a": 0.5, "b": 0.5, "c": 0.5}, 300, seed)
+        dropped += bool(stopper.dominated)
+        assert stopper.spent == pytest.approx(0.05)
+        assert len(stopper.looks) == 5  # 100, 150, ..., 300행
+    assert dropped == 0
+
+def test_clearly_worse_template_is_dropped_early(capsys):
+    stopper = SequentialStopper(max_rows=1000, n_boot=500)
+    _feed(stopper, {"good": 0.6, "also_good": 0.6, "bad": 0.2}, 400, seed=0)
+    assert set(stopper.dominated) == {"bad"}
+    assert stopper.dominated["bad"]["n"] < 400
+    assert "bad 조기 종료" in capsys.readouterr().out
+
+def test_no_more_looks_after_max_rows(capsys):
+    stopper = SequentialStopper(max_rows=100, n_boot=200)
+    _feed(stopper, {"a": 0.5, "b": 0.5}, 300, seed=1)
+    assert len(stopper.looks) == 1 and stopper.looks[0]["t"] == 1.0
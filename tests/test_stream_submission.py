@@ -0,0 +1,39 @@
+# tests/test_stream_submission.py
+
+import asyncio
+import csv
+import importlib
+
+import pandas as pd
+import pytest
+
+from engine.api_client import STATUS_OK
+from optimizer.deadline import DeadlinePlanner, STATUS_DEADLINE
+
+runner = importlib.import_module("123")
+
+def test_fallback_ids_survive_resume(tmp_path, monkeypatch):
+    monkeypatch.setattr(runner, "get_api_keys", lambda: ["k"])
+    monkeypatch.setattr(runner, "DEFAULT_CONCURRENCY", 1)  # 워커 1개 → 중단 위치가 정해짐
+    df = pd.DataFrame({"id": [f"r{i}" for i in range(20)], "err_sentence": [f"문장 {i}" for i in range(20)]})
+    output_path = str(tmp_path / "submission.csv")
+    crash_at = ["r10"]
+
+    async def fake_correct(planner, row_id, text):
+        if row_id in crash_at:
+            raise RuntimeError("interrupted")
+        i = int(row_id[1:])
+        return (None, STATUS_DEADLINE) if i % 3 == 0 else (text + ".", STATUS_OK)
+
+    monkeypatch.setattr(runner, "correct_by_deadline", fake_correct)
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(runner.stream_submission(df, "T", output_path, "key", planner=DeadlinePlanner(1000)))
+    crash_at.clear()
+    assert asyncio.run(runner.stream_submission(df, "T", output_path, "key", planner=DeadlinePlanner(1000))) == 20
+
+    with open(str(tmp_path / "submission_fallback.csv"), encoding="utf-8", newline="") as f:
+        ids = [row["id"] for row in csv.DictReader(f)]
+    assert sorted(ids) == sorted(f"r{i}" for i in range(0, 20, 3))
+    with open(output_path, encoding="utf-8", newline="") as f:
+        assert [row["id"] for row in csv.DictReader(f)] == [f"r{i}" for i in range(20)]
@@ -0,0 +1,50 @@
+# tests/test_streaming.py
+
+import asyncio
+
+import pytest
+
+from engine import api_client
+from engine.api_client import CUT_NEWLINE, LENGTH_FALLBACK, STATUS_FAILED, STATUS_OK, call_llm_streaming
+
+MESSAGES = [{"role": "user", "content": "교정: 안녕하세여"}]
+
+@pytest.fixture
+def transport(monkeypatch):
+    state = {"stream": None, "chat": None, "calls": []}
+
+    async def send_stream(client, messages, extra, start):
+        state["calls"].append(("stream", extra))
+        return state["stream"]
+
+    async def send_chat(client, messages):
+        state["calls"].append(("chat", None))
+        if isinstance(state["chat"], Exception):
+            raise state["chat"]
+        return state["chat"]
+
+    monkeypatch.setattr(api_client, "next_client", lambda: (None, asyncio.Semaphore(1)))
+    monkeypatch.setattr(api_client, "_send_stream", send_stream)
+    monkeypatch.setattr(api_client, "_send_chat", send_chat)
+    return state
+
+def test_first_line_is_returned_when_cut_at_newline(transport):
+    transport["stream"] = {"text": "\n안녕하세요.\n", "ttft": 0.1, "finish_reason": CUT_NEWLINE}
+    text, status, meta = asyncio.run(call_llm_streaming(MESSAGES, max_tokens=40))
+    assert (text, status, meta["finish_reason"]) == ("안녕하세요.", STATUS_OK, CUT_NEWLINE)
+    assert [kind for kind, _ in transport["calls"]] == ["stream"]
+
+def test_length_cut_falls_back_to_uncapped_call(transport):
+    transport["stream"] = {"text": "안녕하", "ttft": 0.1, "finish_reason": "length"}
+    transport["chat"] = "안녕하세요. 반갑습니다.\n(설명)"
+    text, status, meta = asyncio.run(call_llm_streaming(MESSAGES, max_tokens=5))
+    assert (text, status) == ("안녕하세요. 반갑습니다.", STATUS_OK)
+    assert meta["finish_reason"] == LENGTH_FALLBACK and meta["max_tokens"] == 5
+    assert [kind for kind, _ in transport["calls"]] == ["stream", "chat"]
+
+def test_length_cut_is_never_ok_when_fallback_fails(transport):
+    transport["stream"] = {"text": "안녕하", "ttft": 0.1, "finish_reason": "length"}
+    transport["chat"] = RuntimeError("boom")
+    text, status, meta = asyncio.run(call_llm_streaming(MESSAGES, max_tokens=5))
+    assert text is None and status == STATUS_FAILED
+    assert meta["finish_reason"] == LENGTH_FALLBACK
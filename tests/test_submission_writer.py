@@ -0,0 +1,52 @@
+# tests/test_submission_writer.py
+
+import csv
+import os
+
+from optimizer.submission_writer import StreamingSubmissionWriter
+
+FIELDS = ["id", "cor_sentence"]
+
+def _row(i):
+    return {"id": f"r{i}", "cor_sentence": f"문장 {i}", "extra": "무시"}
+
+def _read(path):
+    with open(path, encoding="utf-8", newline="") as f:
+        return [row["id"] for row in csv.DictReader(f)]
+
+def test_out_of_order_puts_are_written_in_input_order(tmp_path):
+    path = str(tmp_path / "submission.csv")
+    with StreamingSubmissionWriter(path, FIELDS) as writer:
+        for i in [2, 0, 3, 1]:
+            writer.put(i, _row(i))
+        assert writer.next_index == 4 and not writer.pending
+        writer.close(complete=True)
+    assert _read(path) == ["r0", "r1", "r2", "r3"]
+    assert not os.path.exists(path + ".ckpt.json")
+
+def test_resume_truncates_unsaved_tail_and_skips_written_rows(tmp_path):
+    path = str(tmp_path / "submission.csv")
+    writer = StreamingSubmissionWriter(path, FIELDS, run_key="k", checkpoint_every=2, checkpoint_seconds=1e9)
+    for i in range(5):
+        writer.put(i, _row(i))  # r0~r3까지 체크포인트, r4는 파일에만
+    writer._file.write("r5,쓰다 만".encode("utf-8"))
+    writer._file.close()  # 체크포인트 없이 중단된 상황
+
+    resumed = StreamingSubmissionWriter(path, FIELDS, run_key="k", checkpoint_every=2, checkpoint_seconds=1e9)
+    assert resumed.resumed_from == 4
+    for i in range(6):  # 이미 기록된 행을 다시 넣어도 무시
+        resumed.put(i, _row(i))
+    resumed.close(complete=True)
+    assert _read(path) == [f"r{i}" for i in range(6)]
+
+def test_different_run_key_starts_over(tmp_path):
+    path = str(tmp_path / "submission.csv")
+    writer = StreamingSubmissionWriter(path, FIELDS, run_key="old")
+    writer.put(0, _row(0))
+    writer.close()
+
+    fresh = StreamingSubmissionWriter(path, FIELDS, run_key="new")
+    assert fresh.resumed_from == 0
+    fresh.put(0, _row(9))
+    fresh.close(complete=True)
+    assert _read(path) == ["r9"]
@@ -0,0 +1,126 @@
+# tests/test_work_queue.py
+
+import asyncio
+import sqlite3
+
+import pytest
+
+from optimizer.work_queue import WorkQueue, drain_queue, job_key
+
+def _tasks(n, template="t"):
+    return [(template, f"r{i}", {"text": f"문장 {i}"}) for i in range(n)]
+
+def test_lease_ack_and_results(tmp_path):
+    queue = WorkQueue(str(tmp_path / "q.sqlite"))
+    try:
+        queue.enqueue(_tasks(3))
+        queue.enqueue(_tasks(3))  # 중복 등록 무시
+        batch = queue.lease("a", 10)
+        assert [r for _, r, _ in batch] == ["r0", "r1", "r2"]
+        assert queue.lease("b", 10) == []
+        for t, r, p in batch:
+            assert queue.ack("a", t, r, {"id": r, "status": "ok"})
+        assert queue.remaining() == 0
+        assert [r["id"] for r in queue.results({"t"})] == ["r0", "r1", "r2"]
+    finally:
+        queue.close()
+
+def test_expired_lease_is_requeued_and_stale_ack_ignored(tmp_path):
+    queue = WorkQueue(str(tmp_path / "q.sqlite"), lease_seconds=-1)  # 가져가자마자 만료
+    try:
+        queue.enqueue(_tasks(1))
+        assert len(queue.lease("a", 1)) == 1
+        assert len(queue.lease("b", 1)) == 1  # a의 lease 만료 → b가 가져감
+        assert not queue.ack("a", "t", "r0", {"id": "r0"})
+        assert queue.ack("b", "t", "r0", {"id": "r0"})
+        assert queue.attempts("t", "r0") == 2
+    finally:
+        queue.close()
+
+def test_jobs_in_same_file_do_not_mix(tmp_path):
+    path = str(tmp_path / "q.sqlite")
+    old = WorkQueue(path, job_id=job_key(["r0", "r1"]))
+    new = WorkQueue(path, job_id=job_key(["r1", "r2"]))
+    try:
+        old.enqueue(_tasks(2))
+        for t, r, _ in old.lease("a", 10):
+            old.ack("a", t, r, {"id": r})
+        new.enqueue([("t", "r1", {}), ("t", "r2", {})])
+        assert new.remaining() == 2  # 같은 (template, row)라도 다른 작업
+        for t, r, _ in new.lease("b", 10):
+            new.ack("b", t, r, {"id": r})
+        assert sorted(r["id"] for r in new.results({"t"})) == ["r1", "r2"]
+        assert job_key(["r1", "r0"]) == job_key(["r0", "r1"])
+    finally:
+        old.close()
+        new.close()
+
+def test_legacy_queue_file_is_rejected(tmp_path):
+    path = str(tmp_path / "q.sqlite")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE tasks (template_id TEXT, row_id TEXT, payload TEXT)")
+    conn.close()
+    with pytest.raises(RuntimeError):
+        WorkQueue(path)
+
+def test_failed_results_are_retried_then_kept_after_max_attempts(tmp_path):
+    queue = WorkQueue(str(tmp_path / "q.sqlite"))
+    calls = {}
+
+    async def handler(template_id, row_id, payload):
+        calls[row_id] = calls.get(row_id, 0) + 1
+        # r0은 두 번째 시도에 성공, r1은 계속 실패
+        ok = row_id == "r0" and calls[row_id] >= 2
+        return {"id": row_id, "status": "ok" if ok else "failed"}
+
+    try:
+        queue.enqueue(_tasks(2))
+        asyncio.run(drain_queue(queue, handler, poll=0.01, max_attempts=3, retry_delay=0.02))
+        by_id = {r["id"]: r["status"] for r in queue.results()}
+        assert by_id == {"r0": "ok", "r1": "failed"}
+        assert calls == {"r0": 2, "r1": 3}
+    finally:
+        queue.close()
+
+def test_retry_delay_hides_task_from_lease(tmp_path):
+    queue = WorkQueue(str(tmp_path / "q.sqlite"))
+    try:
+        queue.enqueue(_tasks(1))
+        queue.lease("a", 1)
+        queue.release("a", "t", "r0", delay=60)
+        assert queue.lease("b", 1) == []
+        assert queue.remaining() == 1
+    finally:
+        queue.close()
+
+def test_terminal_failures_are_dead_lettered_once_across_runners(tmp_path):
+    path = str(tmp_path / "q.sqlite")
+    dead_letter = str(tmp_path / "dead.jsonl")
+    calls = []
+
+    async def handler(template_id, row_id, payload):
+        calls.append(row_id)
+        await asyncio.sleep(0.001)
+        return {"id": row_id, "status": "failed"}
+
+    async def main():
+        queues = [WorkQueue(path, job_id="job") for _ in range(2)]
+        try:
+            queues[0].enqueue(_tasks(5))
+            dead = await asyncio.gather(*(
+                drain_queue(q, handler, owner=f"runner-{i}", batch_size=2, poll=0.01, max_attempts=2,
+                            retry_delay=0.01, dead_letter_path=dead_letter)
+                for i, q in enumerate(queues)
+            ))
+            return dead, queues[0].results()
+        finally:
+            for q in queues:
+                q.close()
+
+    dead, results = asyncio.run(main())
+    assert sum(dead) == 5
+    assert len(calls) == 10  # 셀당 max_attempts번만 호출
+    assert sorted(r["id"] for r in results) == [f"r{i}" for i in range(5)]
+    assert all(r["status"] == "failed" for r in results)
+    with open(dead_letter, encoding="utf-8") as f:
+        assert len(f.readlines()) == 5